@@ -0,0 +1,39 @@
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.storage import retention, runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and delete old runs per the retention policies (CLARITY_ARCHIVE_AFTER_DAYS, CLARITY_DELETE_*_AFTER_DAYS).")
+    parser.add_argument("--data-dir", default=str(runs.DATA_DIR), help=f"Run directories and indexes (default: {runs.DATA_DIR})")
+    parser.add_argument("--archive-after-days", type=float, default=retention.ARCHIVE_AFTER_DAYS, help="Archive finished runs older than this; 0 disables (default: %(default)s)")
+    parser.add_argument("--delete-completed-after-days", type=float, default=retention.DELETE_COMPLETED_AFTER_DAYS, help="Delete completed runs older than this; 0 keeps them (default: %(default)s)")
+    parser.add_argument("--delete-failed-after-days", type=float, default=retention.DELETE_FAILED_AFTER_DAYS, help="Delete failed runs older than this; 0 keeps them (default: %(default)s)")
+    parser.add_argument("--delete-unfinished-after-days", type=float, default=retention.DELETE_UNFINISHED_AFTER_DAYS, help="Delete unfinished runs older than this; 0 keeps them (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the runs that would be deleted")
+    args = parser.parse_args()
+
+    runs.DATA_DIR = Path(args.data_dir)
+    print(f"Compacting runs in {runs._store().location}...")
+    counts = retention.compact_runs(
+        archive_after_days=args.archive_after_days,
+        delete_completed_after_days=args.delete_completed_after_days,
+        delete_failed_after_days=args.delete_failed_after_days,
+        delete_unfinished_after_days=args.delete_unfinished_after_days,
+        dry_run=args.dry_run,
+    )
+    if counts is None:
+        print("ERROR: Another process is compacting these runs.")
+        return False
+    if args.dry_run:
+        print(f"Would delete {counts['deleted']} runs.")
+    else:
+        print(f"Archived {counts['archived']} runs, deleted {counts['deleted']}.")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,33 @@
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.storage import runs
+from src.storage.sqlite_store import SqliteRunStore, migrate_runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Import run directories into the SQLite run store (CLARITY_RUN_STORE=sqlite).")
+    parser.add_argument("--from", dest="source", default="data/runs", help="Run directories to import (default: data/runs)")
+    parser.add_argument("--to", dest="target", default="data/runs.sqlite", help="SQLite database to import into (default: data/runs.sqlite)")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    if not source.is_dir():
+        print(f"ERROR: {source} is not a directory.")
+        return False
+
+    print(f"Migrating runs from {source} to {args.target}...")
+    imported, skipped = migrate_runs(source, SqliteRunStore(Path(args.target)))
+    print(f"Imported {imported} runs, skipped {skipped}.")
+
+    # The database's listing and search indexes must match the runs now in it
+    runs.RUN_STORE, runs.RUN_DB_PATH = "sqlite", Path(args.target)
+    runs.rebuild_indexes()
+    print("Rebuilt run indexes.")
+    return skipped == 0
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,26 +1,29 @@
 import sys
 import os
+from typing import Optional
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.tools.hackernews import HackerNewsTools
 from agno.tools.newspaper4k import Newspaper4kTools
 from agno.tools.googlesearch import GoogleSearchTools
 from src.prompts.agent_prompts import AgentPrompts
+from src.agents.registry import run_session_id, shared_model
+from utils.telemetry.tracing import trace_tool_call, traced_run
 
 class AudienceInsightAgent():
     def __init__(self):
         self.agent = Agent(
             name="Audience Insight Agent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.5),
+            model=shared_model("gpt-4o", temperature=0.5),
             tools=[HackerNewsTools(), Newspaper4kTools(), GoogleSearchTools()],
+            tool_hooks=[trace_tool_call],
             instructions=AgentPrompts.AUDIENCE_INSIGHT_AGENT_INSTRUCTIONS,
             markdown=True,
         )
 
-    def run(self, topic: str, stream: bool = False):
-        return self.agent.run(f"Write a detailed report on the topic: {topic}", stream=stream)
+    def run(self, topic: str, stream: bool = False, session_id: Optional[str] = None):
+        return traced_run(f"agent {self.agent.name}", lambda: self.agent.run(f"Write a detailed report on the topic: {topic}", stream=stream, session_id=run_session_id(session_id)), topic=topic, stream=stream)
     
 if __name__ == "__main__":
     audience_insight_agent = AudienceInsightAgent()
@@ -1,25 +1,28 @@
 import sys
 import os
+from typing import Optional
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.tools.hackernews import HackerNewsTools
 from agno.tools.newspaper4k import Newspaper4kTools
 from agno.tools.googlesearch import GoogleSearchTools
 from src.prompts.agent_prompts import AgentPrompts
+from src.agents.registry import run_session_id, shared_model
+from utils.telemetry.tracing import trace_tool_call, traced_run
 
 class ContentPlanAgent():
     def __init__(self):
         self.agent = Agent(
             name="Content Plan Agent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.7),  # Higher temperature for creativity
+            model=shared_model("gpt-4o", temperature=0.7),  # Higher temperature for creativity
             tools=[HackerNewsTools(), Newspaper4kTools(), GoogleSearchTools()],
+            tool_hooks=[trace_tool_call],
             instructions=AgentPrompts.CONTENT_PLAN_AGENT_INSTRUCTIONS,
             markdown=True,
         )
 
-    def run(self, topic: str, audience_insights: str = "", channel_strategy: str = "", brand_messaging: str = "", stream: bool = False):
+    def run(self, topic: str, audience_insights: str = "", channel_strategy: str = "", brand_messaging: str = "", stream: bool = False, session_id: Optional[str] = None):
         context = f"Product/Idea: {topic}"
         if audience_insights:
             context += f"\n\nAudience Insights: {audience_insights}"
@@ -28,7 +31,7 @@ class ContentPlanAgent():
         if brand_messaging:
             context += f"\n\nBrand Messaging: {brand_messaging}"
         
-        return self.agent.run(f"Create a comprehensive content strategy and calendar for: {context}", stream=stream)
+        return traced_run(f"agent {self.agent.name}", lambda: self.agent.run(f"Create a comprehensive content strategy and calendar for: {context}", stream=stream, session_id=run_session_id(session_id)), topic=topic, stream=stream)
     
 if __name__ == "__main__":
     content_plan_agent = ContentPlanAgent()
@@ -0,0 +1,242 @@
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from src.agents.http_client import httpx
+from src.contracts.clarity_report import (
+    Audience, Execution, Idea, InterviewEvaluation, Market, Recommendation, Risks
+)
+from src.prompts.agent_prompts import AgentPrompts
+
+# Distributions are "constant:x", "uniform:a,b", "normal:mu,sigma", "lognormal:mu,sigma" or
+# "exponential:mean"; samples are clamped at zero
+FAKE_LATENCY = os.getenv("CLARITY_FAKE_LATENCY", "constant:0")
+FAKE_OUTPUT_TOKENS = os.getenv("CLARITY_FAKE_OUTPUT_TOKENS", "uniform:150,600")
+# Fraction of requests answered with CLARITY_FAKE_FAILURE_STATUS instead of a completion
+FAKE_FAILURE_RATE = float(os.getenv("CLARITY_FAKE_FAILURE_RATE", "0"))
+FAKE_FAILURE_STATUS = int(os.getenv("CLARITY_FAKE_FAILURE_STATUS", "500"))
+FAKE_SEED = int(os.getenv("CLARITY_FAKE_SEED", "0"))
+
+# Contracts the pipeline asks for through structured outputs, by schema name
+SCHEMAS: Dict[str, Type[BaseModel]] = {
+    model.__name__: model for model in (Idea, Risks, Execution, Recommendation, InterviewEvaluation)
+}
+
+WORDS = (
+    "market users platform growth pricing remote teams pilot launch retention channel "
+    "demand feature partner revenue onboarding workflow segment scale insight"
+).split()
+
+class Distribution:
+    """
+    A named, parameterised distribution parsed from a "kind:param,param" spec.
+    """
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        if self.kind not in ("constant", "uniform", "normal", "lognormal", "exponential"):
+            raise ValueError(f"Unknown distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "constant":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(p[0], p[1])
+        else:
+            value = rng.expovariate(1 / p[0]) if p[0] else 0.0
+        return max(0.0, value)
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(max(1, count)))
+
+def fake_value(schema: Dict[str, Any], rng: random.Random, defs: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Generates a value satisfying a (pydantic-generated) JSON schema.
+    """
+    defs = schema.get("$defs", defs or {})
+    if "$ref" in schema:
+        return fake_value(defs[schema["$ref"].split("/")[-1]], rng, defs)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return fake_value(options[0], rng, defs)
+
+    kind = schema.get("type", "object")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        if not properties:
+            return {"name": _words(rng, 2)}
+        return {name: fake_value(prop, rng, defs) for name, prop in properties.items()}
+    if kind == "array":
+        low = schema.get("minItems", 2)
+        count = rng.randint(low, max(low, schema.get("maxItems", 4)))
+        return [fake_value(schema.get("items", {"type": "string"}), rng, defs) for _ in range(count)]
+    if kind in ("number", "integer"):
+        low = schema.get("minimum", schema.get("exclusiveMinimum", 0))
+        high = schema.get("maximum", schema.get("exclusiveMaximum", low + 10))
+        value = rng.uniform(low, high)
+        return int(value) if kind == "integer" else round(value, 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return _words(rng, rng.randint(3, 12)).capitalize()
+
+def _model_value(model: Type[BaseModel], rng: random.Random) -> Dict[str, Any]:
+    # Round-trip through the model so the payload is guaranteed to validate
+    return model.model_validate(fake_value(model.model_json_schema(), rng)).model_dump(mode="json")
+
+def _instructions_match(system: str, instructions: str) -> bool:
+    return instructions.strip()[:120] in system
+
+def fake_content(body: Dict[str, Any], rng: random.Random, output_tokens: int) -> str:
+    """
+    The assistant message for a chat completion request: a schema-valid JSON document when
+    the request asks for a known contract (or is from the Market/Interviewer agents, which
+    return JSON by prompt), otherwise plain text of roughly `output_tokens` tokens.
+    """
+    response_format = body.get("response_format") or {}
+    json_schema = response_format.get("json_schema") if isinstance(response_format, dict) else None
+    if json_schema:
+        model = SCHEMAS.get(json_schema.get("name"))
+        value = _model_value(model, rng) if model else fake_value(json_schema.get("schema", {}), rng)
+        return json.dumps(value)
+
+    system = "\n".join(
+        m.get("content") or "" for m in body.get("messages", [])
+        if m.get("role") in ("system", "developer") and isinstance(m.get("content"), str)
+    )
+    if _instructions_match(system, AgentPrompts.MARKET_AGENT_INSTRUCTIONS):
+        return json.dumps({"audience": _model_value(Audience, rng), "market": _model_value(Market, rng)})
+    if _instructions_match(system, AgentPrompts.INTERVIEWER_AGENT_INSTRUCTIONS):
+        questions = [{"text": _words(rng, 8).capitalize() + "?", "guidance": _words(rng, 10)} for _ in range(3)]
+        return json.dumps({"questions": questions})
+    return _words(rng, output_tokens * 3 // 4)
+
+class FakeModelBackend:
+    """
+    Deterministic stand-in for the OpenAI chat completions API.
+
+    Message content is derived from a hash of the request, so identical requests always get
+    identical answers. Latency, injected failures and token counts are drawn from the
+    configured distributions using a seeded generator.
+    """
+
+    def __init__(
+        self,
+        latency: str = FAKE_LATENCY,
+        output_tokens: str = FAKE_OUTPUT_TOKENS,
+        failure_rate: float = FAKE_FAILURE_RATE,
+        failure_status: int = FAKE_FAILURE_STATUS,
+        seed: int = FAKE_SEED,
+    ):
+        self.latency = Distribution(latency)
+        self.output_tokens = Distribution(output_tokens)
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def plan(self, request: httpx.Request) -> Tuple[float, httpx.Response]:
+        """
+        Returns how long to wait and the response to send for a request.
+        """
+        with self._lock:
+            self.requests += 1
+            delay = self.latency.sample(self._rng)
+            failed = self._rng.random() < self.failure_rate
+            output_tokens = int(self.output_tokens.sample(self._rng))
+
+        if not request.url.path.endswith("/chat/completions"):
+            return 0.0, httpx.Response(404, json={"error": {"message": f"Fake backend does not serve {request.url.path}"}})
+        if failed:
+            return delay, httpx.Response(
+                self.failure_status,
+                json={"error": {"message": "Injected failure from the fake model backend", "type": "server_error"}},
+            )
+
+        body = json.loads(request.content or b"{}")
+        digest = hashlib.sha256(request.content or b"").hexdigest()
+        content = fake_content(body, random.Random(digest), output_tokens)
+        usage = {
+            "prompt_tokens": math.ceil(len(request.content or b"") / 4),
+            "completion_tokens": output_tokens,
+            "total_tokens": math.ceil(len(request.content or b"") / 4) + output_tokens,
+        }
+        completion_id = f"chatcmpl-fake-{digest[:24]}"
+        model = body.get("model", "fake")
+        if body.get("stream"):
+            return delay, self._stream_response(completion_id, model, content, usage, body)
+        return delay, httpx.Response(200, json={
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": usage,
+        })
+
+    @staticmethod
+    def _stream_response(completion_id: str, model: str, content: str, usage: Dict[str, int], body: Dict[str, Any]) -> httpx.Response:
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, chunk_usage: Any = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                "usage": chunk_usage,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        pieces = [content[i:i + 32] for i in range(0, len(content), 32)] or [""]
+        events: List[str] = [chunk({"role": "assistant", "content": ""})]
+        events += [chunk({"content": piece}) for piece in pieces]
+        events.append(chunk({}, finish_reason="stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(chunk(None, chunk_usage=usage))
+        events.append("data: [DONE]\n\n")
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content="".join(events).encode())
+
+class FakeOpenAITransport(httpx.BaseTransport):
+    def __init__(self, backend: Optional[FakeModelBackend] = None):
+        self.backend = backend or FakeModelBackend()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        delay, response = self.backend.plan(request)
+        if delay:
+            time.sleep(delay)
+        return response
+
+class AsyncFakeOpenAITransport(httpx.AsyncBaseTransport):
+    def __init__(self, backend: Optional[FakeModelBackend] = None):
+        self.backend = backend or FakeModelBackend()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        delay, response = self.backend.plan(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import asyncio
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from src.storage.runs import recent_agent_durations
+
+# Per-stage deadline in seconds (0 disables); CLARITY_STAGE_DEADLINES overrides it per agent,
+# e.g. {"MarketAgent": 90, "RiskAgent": 60}
+STAGE_DEADLINE = float(os.getenv("CLARITY_STAGE_DEADLINE", "0"))
+STAGE_DEADLINES: Dict[str, float] = json.loads(os.getenv("CLARITY_STAGE_DEADLINES", "{}"))
+
+# Opt-in: once a call has run longer than HEDGE_PERCENTILE of the agent's observed latency,
+# issue a duplicate request and take whichever finishes first
+HEDGE_ENABLED = os.getenv("CLARITY_HEDGE", "0") in ("1", "true", "True")
+HEDGE_PERCENTILE = float(os.getenv("CLARITY_HEDGE_PERCENTILE", "95"))
+# At most this fraction of calls may be hedged, bounding the extra model spend
+HEDGE_BUDGET = float(os.getenv("CLARITY_HEDGE_BUDGET", "0.1"))
+# Hedging waits until an agent has this many recorded timings
+HEDGE_MIN_SAMPLES = int(os.getenv("CLARITY_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("CLARITY_HEDGE_WINDOW", "200"))
+
+class LatencyTracker:
+    """
+    Sliding window of recent call durations per agent.
+
+    Each window is seeded from the timings of the agent's saved artifacts the first time
+    the agent is seen, then kept current as stages finish.
+    """
+
+    def __init__(self, window: int = HEDGE_WINDOW, loader: Callable[[str, int], List[float]] = recent_agent_durations):
+        self.window = window
+        self.loader = loader
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _samples_for(self, agent_name: str) -> Deque[float]:
+        with self._lock:
+            samples = self._samples.get(agent_name)
+        if samples is None:
+            # Load outside the lock; a concurrent loader only duplicates a read
+            loaded = deque(reversed(self.loader(agent_name, self.window)), maxlen=self.window)
+            with self._lock:
+                samples = self._samples.setdefault(agent_name, loaded)
+        return samples
+
+    def record(self, agent_name: str, seconds: float) -> None:
+        samples = self._samples_for(agent_name)
+        with self._lock:
+            samples.append(seconds)
+
+    def percentile(self, agent_name: str, pct: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """
+        Nearest-rank percentile of the agent's recent durations, or None with too few samples.
+        """
+        samples = self._samples_for(agent_name)
+        with self._lock:
+            ordered = sorted(samples)
+        if not ordered or len(ordered) < min_samples:
+            return None
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+class HedgeBudget:
+    """
+    Admits a hedge only while hedged calls stay within `fraction` of all calls.
+    """
+
+    def __init__(self, fraction: float = HEDGE_BUDGET):
+        self.fraction = fraction
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.fraction * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+latencies = LatencyTracker()
+budget = HedgeBudget()
+
+# Sync calls run here so the caller can stop waiting at the deadline. Python threads cannot
+# be interrupted, so a call that misses its deadline (or loses a hedge) finishes in the
+# background and its result is dropped.
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CLARITY_HEDGE_THREADS", "32")), thread_name_prefix="clarity-hedge")
+
+def stage_deadline(agent_name: str) -> Optional[float]:
+    return STAGE_DEADLINES.get(agent_name, STAGE_DEADLINE) or None
+
+def hedge_delay(agent_name: str) -> Optional[float]:
+    """
+    How long to wait before hedging a call to `agent_name`, or None to never hedge it.
+    """
+    if not HEDGE_ENABLED:
+        return None
+    return latencies.percentile(agent_name, HEDGE_PERCENTILE)
+
+def observe(agent_name: str, seconds: float) -> None:
+    """
+    Records a finished call's duration for future hedge delays.
+    """
+    if HEDGE_ENABLED:
+        latencies.record(agent_name, seconds)
+
+def _timeout(start: float, hedge_after: Optional[float], deadline: Optional[float]) -> Optional[float]:
+    elapsed = time.monotonic() - start
+    timeouts = [limit - elapsed for limit in (hedge_after, deadline) if limit is not None]
+    return max(0.0, min(timeouts)) if timeouts else None
+
+def call_with_hedge(
+    agent_name: str,
+    fn: Callable[[], Any],
+    hedge_after: Optional[float] = None,
+    deadline: Optional[float] = None,
+    on_hedge: Optional[Callable[[], Any]] = None,
+) -> Any:
+    """
+    Calls `fn()`, issuing a second identical call if the first is still running after
+    `hedge_after` seconds (and the hedge budget allows), and returns the first successful
+    result. Raises TimeoutError once `deadline` seconds have passed without one.
+    """
+    budget.call()
+    if hedge_after is None and deadline is None:
+        return fn()
+
+    start = time.monotonic()
+    futures: List[Future] = [_pool.submit(contextvars.copy_context().run, fn)]
+    error: Optional[BaseException] = None
+    while futures:
+        done, _ = wait(futures, timeout=_timeout(start, hedge_after, deadline), return_when=FIRST_COMPLETED)
+        for future in done:
+            futures.remove(future)
+            if future.exception() is None:
+                for loser in futures:
+                    loser.cancel()
+                return future.result()
+            error = error or future.exception()
+        elapsed = time.monotonic() - start
+        if deadline is not None and elapsed >= deadline and futures:
+            raise TimeoutError(f"{agent_name} exceeded its {deadline:g}s deadline")
+        if hedge_after is not None and elapsed >= hedge_after and futures:
+            if budget.try_hedge():
+                futures.append(_pool.submit(contextvars.copy_context().run, fn))
+                if on_hedge is not None:
+                    on_hedge()
+            hedge_after = None
+    raise error
+
+async def acall_with_hedge(
+    agent_name: str,
+    fn: Callable[[], Awaitable[Any]],
+    hedge_after: Optional[float] = None,
+    deadline: Optional[float] = None,
+    on_hedge: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> Any:
+    """
+    Async counterpart of `call_with_hedge`. Losing and timed-out calls are cancelled, which
+    also closes their HTTP requests.
+    """
+    budget.call()
+    if hedge_after is None and deadline is None:
+        return await fn()
+
+    start = time.monotonic()
+    tasks: List[asyncio.Future] = [asyncio.ensure_future(fn())]
+    error: Optional[BaseException] = None
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, timeout=_timeout(start, hedge_after, deadline), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+            elapsed = time.monotonic() - start
+            if deadline is not None and elapsed >= deadline and tasks:
+                raise TimeoutError(f"{agent_name} exceeded its {deadline:g}s deadline")
+            if hedge_after is not None and elapsed >= hedge_after and tasks:
+                if budget.try_hedge():
+                    tasks.append(asyncio.ensure_future(fn()))
+                    if on_hedge is not None:
+                        await on_hedge()
+                hedge_after = None
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,7 @@
+import importlib
+
+from openai import DefaultHttpxClient
+
+# The OpenAI SDK builds on httpx up to 2.x and on its httpx2 fork afterwards. Transports,
+# limits, requests and responses handed to the SDK's client must come from that same package.
+httpx = importlib.import_module(DefaultHttpxClient.__mro__[1].__module__.split(".")[0])
@@ -1,57 +1,286 @@
+import os
 import json
+import asyncio
+import hashlib
+import inspect
+import logging
+import sqlite3
+import time
 import traceback
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from functools import cached_property, partial
+from typing import Dict, Any, Optional, List, Callable, Sequence, Tuple
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
+from agno.run.agent import IntermediateRunContentEvent, RunContentEvent, RunErrorEvent, RunOutput
+from agno.run.base import RunStatus
+from pydantic import BaseModel
+from src.agents.hedging import acall_with_hedge, call_with_hedge, hedge_delay, observe, stage_deadline
+from src.agents.registry import get_agent, run_session_id, shared_model
+from src.agents.routing import low_certainty, model_route
+from src.agents.tokens import RunBudgetExceeded, TokenUsage, as_text, check_run_budget, count_tokens, estimate_cost, fit_context
 from src.prompts.agent_prompts import AgentPrompts
 from src.contracts.clarity_report import (
     ClarityReport, AgentArtifact, Meta, Idea, Audience, Market, Risks, Execution, Recommendation, Source,
     Interview, Question, InterviewEvaluation
 )
+from src.storage.llm_cache import get_response_cache, make_cache_key
 from src.storage.runs import (
-    create_run, append_event, save_artifact, save_report, get_run, save_interview, get_interview, update_run_status
+    create_run, append_event, save_artifact, get_artifact, save_report, get_run, save_interview, get_interview,
+    update_run_status, save_speculation, get_speculation, clear_speculation, get_usage, record_usage,
+    get_related_findings
 )
+from utils.graph import Stage, StageGraph
+from utils.telemetry.metrics import AGENT_LATENCY, AGENT_TOKENS, RUN_OUTCOMES
+from utils.telemetry.tracing import current_span, tracer
+
+# Upper bound on agents running at once within a single run
+MAX_STAGE_CONCURRENCY = int(os.getenv("CLARITY_STAGE_CONCURRENCY", "4"))
+
+# Opt-in: run Planner and Market on the raw idea while the run waits for interview answers
+SPECULATIVE_ENABLED = os.getenv("CLARITY_SPECULATIVE", "0") in ("1", "true", "True")
+# On resume, reuse speculative results "always", "never", or when the answers leave the idea
+# "similar" (token overlap >= CLARITY_SPECULATIVE_MIN_SIMILARITY) to what was speculated on
+SPECULATIVE_POLICY = os.getenv("CLARITY_SPECULATIVE_POLICY", "similar")
+SPECULATIVE_MIN_SIMILARITY = float(os.getenv("CLARITY_SPECULATIVE_MIN_SIMILARITY", "0.8"))
+
+# Opt-in: stream agent output into the run's events as AGENT_OUTPUT_DELTA events. Chunks are
+# coalesced and flushed every STREAM_FLUSH_INTERVAL seconds or STREAM_FLUSH_CHARS characters;
+# agents with an output schema stream their JSON as it is generated.
+STREAM_AGENT_OUTPUT = os.getenv("CLARITY_STREAM_AGENT_OUTPUT", "0") in ("1", "true", "True")
+STREAM_FLUSH_INTERVAL = float(os.getenv("CLARITY_STREAM_FLUSH_INTERVAL", "0.25"))
+STREAM_FLUSH_CHARS = int(os.getenv("CLARITY_STREAM_FLUSH_CHARS", "400"))
+
+logger = logging.getLogger(__name__)
+
+# Introduces findings retrieved from earlier reports (see src.storage.report_index)
+RELATED_FINDINGS_HEADER = "Findings from analyses of related ideas (reuse what still applies instead of researching it again):"
 
 # --- Agent Definitions ---
 
-class InterviewEvaluatorAgent:
-    def __init__(self):
+class PipelineAgent:
+    """
+    Base wrapper for the pipeline agents.
+
+    Subclasses build `self.agent` and implement `prompt` (turns run arguments into the agent
+    input) and optionally `parse` (turns the response content into the stage output).
+    `run` and `arun` share both, so the sync and async pipelines issue identical calls.
+
+    Calls to temperature-0 models are deterministic, so their raw content is served from
+    and written to the persistent response cache.
+
+    Subclasses take the model id as their only constructor argument, so the registry can
+    hold one shared instance per (agent, model) for model routing.
+    """
+    agent: Agent
+
+    @property
+    def model_id(self) -> str:
+        return self.agent.model.id
+
+    @cached_property
+    def streaming_agent(self) -> Agent:
+        """
+        The agno agent streamed calls run on. agno does not stream a response it has to parse
+        itself, so agents with an output schema stream from a copy that returns the JSON text
+        as it is generated; `_content` validates it into the schema. The copy shares the model.
+        """
+        if self.agent.output_schema is None:
+            return self.agent
+        return self.agent.deep_copy(update={"parse_response": False})
+
+    def with_model(self, model_id: str) -> "PipelineAgent":
+        """
+        Returns the shared instance of this agent configured to use `model_id`.
+        """
+        if model_id == self.model_id:
+            return self
+        cls = type(self)
+        return get_agent(partial(cls, model_id), key=(cls, model_id))
+
+    def prompt(self, *args: Any) -> str:
+        raise NotImplementedError
+
+    def parse(self, content: Any) -> Any:
+        return content
+
+    def _prompt(self, *args: Any) -> str:
+        # The prompt as sent: truncated to the agent's context budget
+        return fit_context(self.agent.name, self.prompt(*args), self.model_id)
+
+    def usage(self, args: Tuple[Any, ...], output: Any = None) -> TokenUsage:
+        """
+        Estimated token usage of a call with `args`: instructions plus prompt in, serialised
+        output out. Counted locally, so it is known before the call is sent, but it misses
+        the injected output schema, tool definitions and tool-call round trips.
+        """
+        input_tokens = count_tokens(as_text(self.agent.instructions), self.model_id) + count_tokens(self._prompt(*args), self.model_id)
+        output_tokens = count_tokens(as_text(output), self.model_id)
+        return TokenUsage(input_tokens, output_tokens, estimate_cost(self.model_id, input_tokens, output_tokens))
+
+    def _reported_usage(self, response: Any) -> Optional[TokenUsage]:
+        # The usage the provider reported for the run, across all of its model requests
+        metrics = getattr(response, "metrics", None)
+        input_tokens = getattr(metrics, "input_tokens", None)
+        output_tokens = getattr(metrics, "output_tokens", None)
+        if not isinstance(input_tokens, int) or not isinstance(output_tokens, int) or not input_tokens + output_tokens:
+            return None
+        return TokenUsage(input_tokens, output_tokens, estimate_cost(self.model_id, input_tokens, output_tokens))
+
+    def _content(self, response: Any) -> Any:
+        if response.content is None:
+            raise ValueError(f"{self.agent.name} returned None")
+        # agno reports model/provider failures as an errored run rather than raising
+        if getattr(response, "status", None) == RunStatus.error:
+            raise ValueError(f"{self.agent.name} failed: {response.content}")
+        schema = self.agent.output_schema
+        if schema is not None and isinstance(response.content, str):
+            return schema.model_validate_json(response.content)
+        return response.content
+
+    def _cache_key(self, prompt: str) -> Optional[str]:
+        model = self.agent.model
+        if get_response_cache() is None or getattr(model, "temperature", None) != 0.0:
+            return None
+        return make_cache_key(model.id, self.agent.instructions, self.agent.output_schema, prompt)
+
+    def _cached(self, key: Optional[str]) -> Any:
+        cached = get_response_cache().get(key) if key else None
+        if cached is not None and self.agent.output_schema is not None:
+            return self.agent.output_schema.model_validate(cached)
+        return cached
+
+    def _store(self, key: Optional[str], content: Any) -> None:
+        schema = self.agent.output_schema
+        if key is None:
+            return
+        if isinstance(content, BaseModel):
+            get_response_cache().put(key, content.model_dump(mode="json"))
+        elif schema is None:
+            get_response_cache().put(key, content)
+
+    @staticmethod
+    def _delta(item: Any) -> Optional[str]:
+        if isinstance(item, RunErrorEvent):
+            raise ValueError(f"{item.agent_name} failed: {item.content}")
+        if isinstance(item, (RunContentEvent, IntermediateRunContentEvent)) and isinstance(item.content, str):
+            return item.content or None
+        return None
+
+    def _stream(self, prompt: str, on_delta: Callable[[str], Any]) -> Any:
+        response = None
+        for item in self.streaming_agent.run(prompt, stream=True, yield_run_output=True, session_id=run_session_id()):
+            if isinstance(item, RunOutput):
+                response = item
+            elif (delta := self._delta(item)) is not None:
+                on_delta(delta)
+        if response is None:
+            raise ValueError(f"{self.agent.name} returned None")
+        return response
+
+    async def _astream(self, prompt: str, on_delta: Callable[[str], Any]) -> Any:
+        response = None
+        async for item in self.streaming_agent.arun(prompt, stream=True, yield_run_output=True, session_id=run_session_id()):
+            if isinstance(item, RunOutput):
+                response = item
+            elif (delta := self._delta(item)) is not None:
+                result = on_delta(delta)
+                if inspect.isawaitable(result):
+                    await result
+        if response is None:
+            raise ValueError(f"{self.agent.name} returned None")
+        return response
+
+    def run(
+        self,
+        *args: Any,
+        on_delta: Optional[Callable[[str], Any]] = None,
+        on_cache_hit: Optional[Callable[[], Any]] = None,
+        on_usage: Optional[Callable[[TokenUsage], Any]] = None,
+    ) -> Any:
+        """
+        Runs the agent. With `on_delta`, the response is streamed and every chunk of
+        content is passed to the callback as it arrives; the return value is unchanged.
+        `on_cache_hit` is called when the response is served from the cache instead of the
+        model, and `on_usage` with the token usage the provider reported for a model call.
+        """
+        with tracer.span(f"agent {self.agent.name}", agent=self.agent.name, model=self.model_id) as span:
+            prompt = self._prompt(*args)
+            key = self._cache_key(prompt)
+            content = self._cached(key)
+            span.set_attribute("cached", content is not None)
+            if content is not None and on_cache_hit is not None:
+                on_cache_hit()
+            if content is None:
+                if on_delta is not None:
+                    response = self._stream(prompt, on_delta)
+                else:
+                    response = self.agent.run(prompt, session_id=run_session_id())
+                content = self._content(response)
+                if on_usage is not None and (usage := self._reported_usage(response)) is not None:
+                    on_usage(usage)
+                self._store(key, content)
+            return self.parse(content)
+
+    async def arun(
+        self,
+        *args: Any,
+        on_delta: Optional[Callable[[str], Any]] = None,
+        on_cache_hit: Optional[Callable[[], Any]] = None,
+        on_usage: Optional[Callable[[TokenUsage], Any]] = None,
+    ) -> Any:
+        """
+        Async counterpart of `run`; `on_delta` may also be a coroutine function.
+        """
+        with tracer.span(f"agent {self.agent.name}", agent=self.agent.name, model=self.model_id) as span:
+            prompt = self._prompt(*args)
+            key = self._cache_key(prompt)
+            content = await asyncio.to_thread(self._cached, key)
+            span.set_attribute("cached", content is not None)
+            if content is not None and on_cache_hit is not None:
+                on_cache_hit()
+            if content is None:
+                if on_delta is not None:
+                    response = await self._astream(prompt, on_delta)
+                else:
+                    response = await self.agent.arun(prompt, session_id=run_session_id())
+                content = self._content(response)
+                if on_usage is not None and (usage := self._reported_usage(response)) is not None:
+                    on_usage(usage)
+                await asyncio.to_thread(self._store, key, content)
+            return self.parse(content)
+
+class InterviewEvaluatorAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o-mini"):
         self.agent = Agent(
             name="InterviewEvaluatorAgent",
-            model=OpenAIChat(id="gpt-4o-mini", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.INTERVIEW_EVALUATOR_AGENT_INSTRUCTIONS,
             output_schema=InterviewEvaluation,
         )
 
-    def run(self, interview: Interview) -> InterviewEvaluation:
+    def prompt(self, interview: Interview) -> str:
         # Format interview for the agent
         interview_text = "Questions and Answers:\n"
         for q in interview.questions:
             ans = interview.answers.get(q.id, "No answer provided")
             interview_text += f"Q: {q.text}\nA: {ans}\n\n"
-            
-        response = self.agent.run(f"Evaluate this interview:\n{interview_text}")
-        if response.content is None:
-            raise ValueError("InterviewEvaluatorAgent returned None")
-        return response.content
+        return f"Evaluate this interview:\n{interview_text}"
 
-class InterviewerAgent:
-    def __init__(self):
+class InterviewerAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o"):
         self.agent = Agent(
             name="InterviewerAgent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.INTERVIEWER_AGENT_INSTRUCTIONS,
             # We expect a JSON with "questions" list
         )
 
-    def run(self, idea_text: str) -> List[Dict[str, Any]]:
-        response = self.agent.run(f"Analyze this idea and generate questions: {idea_text}")
-        content = response.content
-        if content is None:
-            raise ValueError("InterviewerAgent returned None")
-        
+    def prompt(self, idea_text: str) -> str:
+        return f"Analyze this idea and generate questions: {idea_text}"
+
+    def parse(self, content: Any) -> List[Dict[str, Any]]:
         if isinstance(content, str):
             # Clean up markdown code blocks if present
             cleaned_content = content.replace("```json", "").replace("```", "").strip()
@@ -64,327 +293,894 @@ class InterviewerAgent:
                 return [{"text": line.strip("- ").strip(), "guidance": None} for line in content.split("\n") if "?" in line]
         return []
 
-class PlannerAgent:
-    def __init__(self):
+class PlannerAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o"):
         self.agent = Agent(
             name="PlannerAgent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.PLANNER_AGENT_INSTRUCTIONS,
             output_schema=Idea,
         )
 
-    def run(self, idea_text: str) -> Idea:
-        response = self.agent.run(f"Analyze this idea: {idea_text}")
-        if response.content is None:
-            raise ValueError("PlannerAgent returned None")
-        return response.content
+    def prompt(self, idea_text: str) -> str:
+        return f"Analyze this idea: {idea_text}"
 
-class MarketAgent:
-    def __init__(self):
+class MarketAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o"):
         self.agent = Agent(
             name="MarketAgent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.MARKET_AGENT_INSTRUCTIONS,
-            # We need a combined model for response, or we can parse a dict.
-            # For simplicity in this MVP pipeline, let's ask for a dict and parse it into Audience and Market models.
-            # Or define a wrapper model. Let's use a dict for flexibility here and validate later.
-            # Actually, agno supports Pydantic models. Let's define a wrapper.
+            # No output_schema: the prompt asks for a JSON dict with 'audience' and 'market' keys,
+            # which the pipeline validates into Audience and Market models.
         )
 
-    def run(self, idea_context: str) -> Dict[str, Any]:
+    def prompt(self, idea_context: str, related: Optional[str] = None) -> str:
+        prompt = f"Analyze market for: {idea_context}"
+        if related:
+            prompt += f"\n\n{RELATED_FINDINGS_HEADER}\n{related}"
+        return prompt
+
+    def parse(self, content: Any) -> Dict[str, Any]:
         # We expect JSON output as defined in instructions.
-        response = self.agent.run(f"Analyze market for: {idea_context}")
-        # Assuming the agent returns a dict-like structure or we parse the content if it's a string.
-        # If response_model is not set, content is a string (or Message).
-        # Let's try to parse the JSON from the string if not using response_model.
-        # But using response_model is safer.
-        # Let's define a temporary Pydantic model for the combined output if needed, 
-        # or just rely on the LLM to return valid JSON string and parse it.
-        # For "simple, deterministic", let's try to force JSON mode.
-        content = response.content
-        if content is None:
-             raise ValueError("MarketAgent returned None")
-        
         if isinstance(content, str):
             # Clean up markdown code blocks if present
             cleaned_content = content.replace("```json", "").replace("```", "").strip()
             return json.loads(cleaned_content)
         return content
 
-class RiskAgent:
-    def __init__(self):
+class RiskAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o"):
         self.agent = Agent(
             name="RiskAgent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.RISK_AGENT_INSTRUCTIONS,
             output_schema=Risks,
         )
 
-    def run(self, idea_context: str, market_context: str) -> Risks:
-        response = self.agent.run(f"Analyze risks for: {idea_context}\n\nMarket Context: {market_context}")
-        if response.content is None:
-            raise ValueError("RiskAgent returned None")
-        return response.content
+    def prompt(self, idea_context: str, market_context: str, related: Optional[str] = None) -> str:
+        prompt = f"Analyze risks for: {idea_context}\n\nMarket Context: {market_context}"
+        if related:
+            prompt += f"\n\n{RELATED_FINDINGS_HEADER}\n{related}"
+        return prompt
 
-class ExecutionAgent:
-    def __init__(self):
+class ExecutionAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o"):
         self.agent = Agent(
             name="ExecutionAgent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.EXECUTION_AGENT_INSTRUCTIONS,
             output_schema=Execution,
         )
 
-    def run(self, idea_context: str, risks_context: str) -> Execution:
-        response = self.agent.run(f"Create execution plan for: {idea_context}\n\nRisks: {risks_context}")
-        if response.content is None:
-            raise ValueError("ExecutionAgent returned None")
-        return response.content
+    def prompt(self, idea_context: str, risks_context: str) -> str:
+        return f"Create execution plan for: {idea_context}\n\nRisks: {risks_context}"
 
-class JudgeAgent:
-    def __init__(self):
+class JudgeAgent(PipelineAgent):
+    def __init__(self, model_id: str = "gpt-4o-mini"):
         self.agent = Agent(
             name="JudgeAgent",
-            model=OpenAIChat(id="gpt-4o-mini", temperature=0.0),
+            model=shared_model(model_id, temperature=0.0),
             instructions=AgentPrompts.JUDGE_AGENT_INSTRUCTIONS,
             output_schema=Recommendation,
         )
 
-    def run(self, summary_context: str) -> Recommendation:
-        response = self.agent.run(f"Final verdict based on: {summary_context}")
-        if response.content is None:
-            raise ValueError("JudgeAgent returned None")
-        return response.content
+    def prompt(self, summary_context: str) -> str:
+        return f"Final verdict based on: {summary_context}"
 
-# --- Pipeline Orchestration ---
+# --- Pipeline Stages ---
 
-def run_analysis(run_id: str, idea_text: str) -> Optional[ClarityReport]:
+@dataclass(frozen=True)
+class PipelineStage:
     """
-    Executes the multi-agent pipeline for a given run_id.
+    Declares one agent step of the analysis.
+
+    - `inputs` names the graph values the stage consumes (seeds or other stage outputs).
+    - `prepare(**inputs)` returns the agent wrapper and the positional args for its `run`.
+    - `describe(output, **inputs)` returns the AgentArtifact fields for the raw agent output.
+    - `publish(output)` returns the value exposed to downstream stages under `output`.
+    - `restore(output_json)` rebuilds the raw agent output from a saved artifact, letting a
+      resumed run skip the agent when its inputs are unchanged.
+    """
+    output: str
+    agent_name: str
+    inputs: Tuple[str, ...]
+    prepare: Callable[..., Tuple[Any, Tuple[Any, ...]]]
+    describe: Callable[..., Dict[str, Any]]
+    publish: Callable[[Any], Any] = lambda output: output
+    restore: Callable[[Dict[str, Any]], Any] = lambda output_json: output_json
+
+def _planner_input(idea_text: str, interview: Optional[Interview]) -> str:
+    # Enrich idea with interview answers if available
+    planner_input = idea_text
+    if interview and interview.answers:
+        qa_text = "\n\nAdditional Context from Interview:\n"
+        for q in interview.questions:
+            ans = interview.answers.get(q.id)
+            if ans:
+                qa_text += f"Q: {q.text}\nA: {ans}\n"
+        planner_input += qa_text
+    return planner_input
+
+def _parse_market(market_raw: Dict[str, Any]) -> Tuple[Audience, Market]:
+    # Market agent output is a dict with 'audience' and 'market' keys based on prompt
+    return Audience(**market_raw.get("audience", {})), Market(**market_raw.get("market", {}))
+
+def _market_markdown(market_raw: Dict[str, Any]) -> str:
+    audience_obj, market_obj = _parse_market(market_raw)
+    return f"**Positioning:** {market_obj.positioning}\n\n**Target Audience:** {', '.join(audience_obj.primary_users)}"
+
+def _bullets(items: List[str]) -> str:
+    return "\n".join(f"- {item}" for item in items)
+
+def _with_findings(args: Tuple[Any, ...], findings: Optional[Dict[str, Any]], section: str) -> Tuple[Any, ...]:
+    # Related findings go last and only when there are some, so runs without any send (and
+    # fingerprint) exactly what they did before retrieval existed
+    lines = []
+    for hit in (findings or {}).get(section, []):
+        details = "; ".join(
+            f"{field.replace('_', ' ')}: {', '.join(items)}"
+            for field, items in hit.items()
+            if isinstance(items, list) and items
+        )
+        if details:
+            lines.append(f"- {hit.get('title', 'Untitled')}: {details}")
+    return args + ("\n".join(lines),) if lines else args
+
+def _judge_context(idea: Idea, market: Tuple[Audience, Market], risks: Risks, execution: Execution) -> str:
+    return (
+        f"Idea: {idea.expanded_summary}\n"
+        f"Market Positioning: {market[1].positioning}\n"
+        f"Top Risks:\n{_bullets(risks.top_risks)}\n"
+        f"MVP Scope:\n{_bullets(execution.mvp_scope)}"
+    )
+
+def _judge_markdown(recommendation: Recommendation) -> str:
+    scores_md = ""
+    if recommendation.scores:
+        scores_md = "\n\n**Scores:**\n"
+        scores_md += f"- Market Demand: {recommendation.scores.market_demand.score}/10 ({recommendation.scores.market_demand.reasoning})\n"
+        scores_md += f"- Competitive Advantage: {recommendation.scores.competitive_advantage.score}/10 ({recommendation.scores.competitive_advantage.reasoning})\n"
+        scores_md += f"- Technical Feasibility: {recommendation.scores.technical_feasibility.score}/10 ({recommendation.scores.technical_feasibility.reasoning})\n"
+        scores_md += f"- Business Viability: {recommendation.scores.business_viability.score}/10 ({recommendation.scores.business_viability.reasoning})\n"
+        scores_md += f"\n**Confidence:** {recommendation.confidence}"
+    return f"**Verdict:** {recommendation.verdict}{scores_md}\n\n**Rationale:** {recommendation.rationale}"
+
+PLANNER_STAGE = PipelineStage(
+    output="idea",
+    agent_name="PlannerAgent",
+    inputs=("idea_text", "interview"),
+    prepare=lambda idea_text, interview: (get_agent(PlannerAgent), (_planner_input(idea_text, interview),)),
+    describe=lambda idea_obj, idea_text, interview: {
+        "input_summary": idea_text[:200],
+        "output_markdown": f"**Title:** {idea_obj.title}\n\n**Summary:** {idea_obj.expanded_summary}",
+        "output_json": idea_obj.model_dump(),
+    },
+    restore=Idea.model_validate,
+)
+
+MARKET_STAGE = PipelineStage(
+    output="market",
+    agent_name="MarketAgent",
+    inputs=("idea", "findings"),
+    prepare=lambda idea, findings: (get_agent(MarketAgent), _with_findings((idea.expanded_summary,), findings, "market")),
+    describe=lambda market_raw, idea, findings: {
+        "input_summary": "Expanded Idea Summary",
+        "output_markdown": _market_markdown(market_raw),
+        "output_json": market_raw,
+    },
+    publish=_parse_market,
+)
+
+RISK_STAGE = PipelineStage(
+    output="risks",
+    agent_name="RiskAgent",
+    inputs=("idea", "market", "findings"),
+    prepare=lambda idea, market, findings: (
+        get_agent(RiskAgent), _with_findings((idea.expanded_summary, market[1].positioning), findings, "risks")
+    ),
+    describe=lambda risks_obj, idea, market, findings: {
+        "input_summary": "Idea + Market Positioning",
+        "output_markdown": "**Top Risks:**\n" + _bullets(risks_obj.top_risks),
+        "output_json": risks_obj.model_dump(),
+    },
+    restore=Risks.model_validate,
+)
+
+EXECUTION_STAGE = PipelineStage(
+    output="execution",
+    agent_name="ExecutionAgent",
+    inputs=("idea", "risks"),
+    prepare=lambda idea, risks: (get_agent(ExecutionAgent), (idea.expanded_summary, _bullets(risks.top_risks))),
+    describe=lambda execution_obj, idea, risks: {
+        "input_summary": "Idea + Risks",
+        "output_markdown": "**MVP Scope:**\n" + _bullets(execution_obj.mvp_scope),
+        "output_json": execution_obj.model_dump(),
+    },
+    restore=Execution.model_validate,
+)
+
+JUDGE_STAGE = PipelineStage(
+    output="recommendation",
+    agent_name="JudgeAgent",
+    inputs=("idea", "market", "risks", "execution"),
+    prepare=lambda idea, market, risks, execution: (
+        get_agent(JudgeAgent), (_judge_context(idea, market, risks, execution),)
+    ),
+    describe=lambda recommendation_obj, **_: {
+        "input_summary": "All Agent Outputs",
+        "output_markdown": _judge_markdown(recommendation_obj),
+        "output_json": recommendation_obj.model_dump(),
+    },
+    restore=Recommendation.model_validate,
+)
+
+# Only needs the interview, so the scheduler runs it alongside the whole Planner → Judge chain.
+INTERVIEW_EVALUATOR_STAGE = PipelineStage(
+    output="interview_evaluation",
+    agent_name="InterviewEvaluatorAgent",
+    inputs=("interview",),
+    prepare=lambda interview: (get_agent(InterviewEvaluatorAgent), (interview,)),
+    describe=lambda interview_evaluation, interview: {
+        "input_summary": "Interview Questions & Answers",
+        "output_markdown": interview_evaluation.summary,
+        "output_json": interview_evaluation.model_dump(),
+    },
+    restore=InterviewEvaluation.model_validate,
+)
+
+ANALYSIS_STAGES = [PLANNER_STAGE, MARKET_STAGE, RISK_STAGE, EXECUTION_STAGE, JUDGE_STAGE]
+
+# Stages that only need the raw idea, and so can run while the interview is unanswered
+SPECULATIVE_STAGES = [PLANNER_STAGE, MARKET_STAGE]
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+def stage_fingerprint(stage: PipelineStage, args: Tuple[Any, ...]) -> str:
+    """
+    Hash of exactly what a stage hands its agent, so a saved artifact is only reused when
+    the agent would be asked the same thing again.
+    """
+    payload = json.dumps({"agent": stage.agent_name, "args": _jsonable(args)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def input_hashes(inputs: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Short hash of each named input of a stage. The fingerprint alone decides reuse (it
+    covers only the parts of the inputs the agent is handed); these record which inputs
+    changed when a stage is recomputed.
     """
+    return {
+        name: hashlib.sha256(json.dumps(_jsonable(value), sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        for name, value in sorted(inputs.items())
+    }
+
+def _started_event(stage: PipelineStage, previous: Optional[AgentArtifact], inputs: Dict[str, Any]) -> Dict[str, Any]:
+    event = {"type": "AGENT_STARTED", "agent": stage.agent_name}
+    if previous is not None and previous.input_hashes is not None:
+        # A recomputation: name the inputs that differ from the ones the artifact came from
+        event["changed_inputs"] = [
+            name for name, value in input_hashes(inputs).items() if previous.input_hashes.get(name) != value
+        ]
+    return event
+
+def _from_checkpoint(stage: PipelineStage, artifact: Optional[AgentArtifact], fingerprint: str) -> Any:
+    if artifact is None or artifact.input_fingerprint != fingerprint or artifact.output_json is None:
+        return None
     try:
-        # 1. Start Run
-        append_event(run_id, {"type": "RUN_STARTED", "status": "RUNNING"})
-        
-        # --- Interviewer Agent ---
-        # Check if we already have an interview (resume mode) or need to start one
-        existing_interview = get_interview(run_id)
-        
-        if not existing_interview:
-            append_event(run_id, {"type": "AGENT_STARTED", "agent": "InterviewerAgent"})
-            interviewer = InterviewerAgent()
-            questions_data = interviewer.run(idea_text)
-            
-            if questions_data:
-                # Create Interview object
-                questions = []
-                for i, q_data in enumerate(questions_data):
-                    # Handle both string (legacy) and dict (new) formats just in case
-                    if isinstance(q_data, str):
-                        questions.append(Question(id=str(i+1), text=q_data, guidance=None))
-                    else:
-                        questions.append(Question(
-                            id=str(i+1), 
-                            text=q_data.get("text", ""), 
-                            guidance=q_data.get("guidance")
-                        ))
-                
-                interview = Interview(questions=questions, answers={})
-                save_interview(run_id, interview)
-                
-                append_event(run_id, {"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
-                append_event(run_id, {"type": "WAITING_FOR_INPUT", "status": "WAITING_FOR_INPUT"})
-                update_run_status(run_id, "WAITING_FOR_INPUT")
-                return None # Stop pipeline to wait for user input
-            
-            # If no questions, proceed directly (shouldn't happen with current prompt but good fallback)
-            append_event(run_id, {"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
+        return stage.restore(artifact.output_json)
+    except ValueError:
+        return None
 
-        # If we are here, either we have answers or no questions were asked.
-        # If we have an interview but no answers, we should stop (unless resuming logic handles this)
-        # But run_analysis is called initially. Resume logic will call a different function or this one with a flag?
-        # Let's assume resume_analysis calls this function again.
-        
-        if existing_interview and not existing_interview.answers:
-             # This case happens if we crash and restart, or if called incorrectly.
-             # But if we are "resuming", we expect answers.
-             # Let's just check if status is WAITING_FOR_INPUT.
-             # Actually, let's make a separate resume_analysis function to be clear.
-             pass
-
-        # --- Planner Agent ---
-        append_event(run_id, {"type": "AGENT_STARTED", "agent": "PlannerAgent"})
-        planner = PlannerAgent()
-        start_time = datetime.now(timezone.utc)
-        
-        # Enrich idea with interview answers if available
-        planner_input = idea_text
-        if existing_interview and existing_interview.answers:
-            qa_text = "\n\nAdditional Context from Interview:\n"
-            for q in existing_interview.questions:
-                ans = existing_interview.answers.get(q.id)
-                if ans:
-                    qa_text += f"Q: {q.text}\nA: {ans}\n"
-            planner_input += qa_text
-
-        idea_obj = planner.run(planner_input)
-        end_time = datetime.now(timezone.utc)
-        
-        planner_artifact = AgentArtifact(
-            agent_name="PlannerAgent",
-            started_at=start_time,
-            finished_at=end_time,
-            input_summary=idea_text[:200],
-            output_markdown=f"**Title:** {idea_obj.title}\n\n**Summary:** {idea_obj.expanded_summary}",
-            output_json=idea_obj.model_dump()
+class DeltaBuffer:
+    """
+    Coalesces streamed chunks of one agent's output into AGENT_OUTPUT_DELTA events, so a
+    token stream costs a handful of event writes per second rather than one per token.
+    """
+
+    def __init__(self, agent_name: str, interval: float = STREAM_FLUSH_INTERVAL, max_chars: int = STREAM_FLUSH_CHARS):
+        self.agent_name = agent_name
+        self.interval = interval
+        self.max_chars = max_chars
+        self.seq = 0
+        self._chunks: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Buffers a chunk and returns an event when one is due, else None.
+        """
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self.max_chars or time.monotonic() - self._last_flush >= self.interval:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        self._last_flush = time.monotonic()
+        if not self._chunks:
+            return None
+        event = {"type": "AGENT_OUTPUT_DELTA", "agent": self.agent_name, "seq": self.seq, "delta": "".join(self._chunks)}
+        self.seq += 1
+        self._chunks, self._size = [], 0
+        return event
+
+def _emit(run_id: str, event: Optional[Dict[str, Any]]) -> None:
+    if event is not None:
+        append_event(run_id, event)
+
+async def _aemit(run_id: str, event: Optional[Dict[str, Any]]) -> None:
+    if event is not None:
+        await asyncio.to_thread(append_event, run_id, event)
+
+@dataclass
+class StageCall:
+    """
+    Outcome of a stage's agent call(s): the output, the model and routing tier that served
+    it, and the tokens spent across every attempt.
+    """
+    output: Any
+    model: str
+    tier: Optional[int] = None
+    usage: TokenUsage = field(default_factory=TokenUsage)
+
+def _stage_artifact(
+    stage: PipelineStage,
+    call: StageCall,
+    start_time: datetime,
+    end_time: datetime,
+    inputs: Dict[str, Any],
+    fingerprint: str,
+) -> AgentArtifact:
+    return AgentArtifact(
+        agent_name=stage.agent_name,
+        started_at=start_time,
+        finished_at=end_time,
+        input_fingerprint=fingerprint,
+        input_hashes=input_hashes(inputs),
+        model=call.model,
+        tier=call.tier,
+        input_tokens=call.usage.input_tokens,
+        output_tokens=call.usage.output_tokens,
+        cost_usd=round(call.usage.cost_usd, 6),
+        **stage.describe(call.output, **inputs)
+    )
+
+def _escalation_reason(stage: PipelineStage, output: Any, inputs: Dict[str, Any]) -> Optional[str]:
+    """
+    Why a routed stage's output should be retried on the next tier, or None to accept it.
+    """
+    try:
+        stage.describe(output, **inputs)
+        stage.publish(output)
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        return f"invalid output: {e}"
+    return low_certainty(output)
+
+def _check_budget(run_id: str, agent: PipelineAgent, args: Tuple[Any, ...]) -> None:
+    # Refuse to send a call that would take the run over its ceiling
+    check_run_budget(get_usage(run_id), agent.usage(args).input_tokens)
+
+def _charge(
+    run_id: str, agent: PipelineAgent, args: Tuple[Any, ...], output: Any, cached: bool = False, reported: Sequence[TokenUsage] = ()
+) -> TokenUsage:
+    # Responses served from the response cache never reached the model and cost nothing
+    if cached:
+        return TokenUsage()
+    # The provider's count of the call that answered, falling back to the local estimate.
+    # When a hedged call reports twice, the first report is the winner's
+    usage = reported[0] if reported else agent.usage(args, output)
+    check_run_budget(record_usage(run_id, usage.input_tokens, usage.output_tokens, usage.cost_usd))
+    return usage
+
+def _charge_hedge(run_id: str, agent: PipelineAgent, args: Tuple[Any, ...]) -> TokenUsage:
+    # A hedged duplicate sends the whole prompt again, so its input is charged as it is
+    # issued. Only the winning attempt's output is charged: the loser is cancelled (async)
+    # or its result dropped (sync), so what it generated is never counted
+    input_tokens = agent.usage(args).input_tokens
+    usage = TokenUsage(input_tokens, 0, estimate_cost(agent.model_id, input_tokens, 0))
+    check_run_budget(record_usage(run_id, usage.input_tokens, 0, usage.cost_usd))
+    return usage
+
+def _call_agent(run_id: str, stage: PipelineStage, agent: PipelineAgent, args: Tuple[Any, ...]) -> StageCall:
+    _check_budget(run_id, agent, args)
+    deadline = stage_deadline(stage.agent_name)
+    cache_hits: List[bool] = []
+    reported: List[TokenUsage] = []
+    hedges: List[TokenUsage] = []
+
+    def hedged() -> None:
+        append_event(run_id, {"type": "AGENT_HEDGED", "agent": stage.agent_name})
+        hedges.append(_charge_hedge(run_id, agent, args))
+
+    if STREAM_AGENT_OUTPUT:
+        # Two interleaved streams would garble the deltas, so streamed calls are never hedged
+        deltas = DeltaBuffer(stage.agent_name)
+        output = call_with_hedge(
+            stage.agent_name,
+            lambda: agent.run(*args, on_delta=lambda text: _emit(run_id, deltas.add(text)), on_cache_hit=lambda: cache_hits.append(True), on_usage=reported.append),
+            deadline=deadline,
+        )
+        _emit(run_id, deltas.flush())
+    else:
+        output = call_with_hedge(
+            stage.agent_name,
+            lambda: agent.run(*args, on_cache_hit=lambda: cache_hits.append(True), on_usage=reported.append),
+            hedge_after=hedge_delay(stage.agent_name),
+            deadline=deadline,
+            on_hedge=hedged,
         )
-        save_artifact(run_id, planner_artifact)
-        append_event(run_id, {"type": "AGENT_FINISHED", "agent": "PlannerAgent"})
+    usage = _charge(run_id, agent, args, output, cached=bool(cache_hits), reported=reported)
+    return StageCall(output, agent.model_id, usage=sum(hedges, usage))
+
+async def _acall_agent(run_id: str, stage: PipelineStage, agent: PipelineAgent, args: Tuple[Any, ...]) -> StageCall:
+    await asyncio.to_thread(_check_budget, run_id, agent, args)
+    deadline = stage_deadline(stage.agent_name)
+    cache_hits: List[bool] = []
+    reported: List[TokenUsage] = []
+    hedges: List[TokenUsage] = []
+
+    async def hedged() -> None:
+        await _aemit(run_id, {"type": "AGENT_HEDGED", "agent": stage.agent_name})
+        hedges.append(await asyncio.to_thread(_charge_hedge, run_id, agent, args))
+
+    if STREAM_AGENT_OUTPUT:
+        deltas = DeltaBuffer(stage.agent_name)
+        output = await acall_with_hedge(
+            stage.agent_name,
+            lambda: agent.arun(*args, on_delta=lambda text: _aemit(run_id, deltas.add(text)), on_cache_hit=lambda: cache_hits.append(True), on_usage=reported.append),
+            deadline=deadline,
+        )
+        await _aemit(run_id, deltas.flush())
+    else:
+        output = await acall_with_hedge(
+            stage.agent_name,
+            lambda: agent.arun(*args, on_cache_hit=lambda: cache_hits.append(True), on_usage=reported.append),
+            hedge_after=await asyncio.to_thread(hedge_delay, stage.agent_name),
+            deadline=deadline,
+            on_hedge=hedged,
+        )
+    usage = await asyncio.to_thread(_charge, run_id, agent, args, output, bool(cache_hits), reported)
+    return StageCall(output, agent.model_id, usage=sum(hedges, usage))
+
+def _escalation_event(stage: PipelineStage, model_id: str, next_model_id: str, reason: str) -> Dict[str, Any]:
+    return {"type": "AGENT_ESCALATED", "agent": stage.agent_name, "from": model_id, "to": next_model_id, "reason": reason}
+
+def _routed_call(
+    run_id: str, stage: PipelineStage, agent: PipelineAgent, args: Tuple[Any, ...], inputs: Dict[str, Any]
+) -> StageCall:
+    """
+    Calls the stage's agent on the model(s) chosen by the router (see src.agents.routing).
+    In cascade mode each tier but the last is accepted only if its output validates and is
+    certain enough; otherwise an AGENT_ESCALATED event is written and the next tier runs.
+    """
+    route = model_route(stage.agent_name, args)
+    if route is None:
+        return _call_agent(run_id, stage, agent, args)
+
+    spent = TokenUsage()
+    for position, (tier, model_id) in enumerate(route):
+        last = position == len(route) - 1
+        tier_agent = agent.with_model(model_id)
+        try:
+            call = _call_agent(run_id, stage, tier_agent, args)
+        except ValueError as e:
+            if last or isinstance(e, RunBudgetExceeded):
+                raise
+            reason = f"invalid output: {e}"
+        else:
+            spent += call.usage
+            reason = None if last else _escalation_reason(stage, call.output, inputs)
+        if reason is None:
+            return StageCall(call.output, model_id, tier, spent)
+        append_event(run_id, _escalation_event(stage, model_id, route[position + 1][1], reason))
+
+async def _arouted_call(
+    run_id: str, stage: PipelineStage, agent: PipelineAgent, args: Tuple[Any, ...], inputs: Dict[str, Any]
+) -> StageCall:
+    """
+    Async counterpart of `_routed_call`.
+    """
+    route = model_route(stage.agent_name, args)
+    if route is None:
+        return await _acall_agent(run_id, stage, agent, args)
+
+    spent = TokenUsage()
+    for position, (tier, model_id) in enumerate(route):
+        last = position == len(route) - 1
+        tier_agent = agent.with_model(model_id)
+        try:
+            call = await _acall_agent(run_id, stage, tier_agent, args)
+        except ValueError as e:
+            if last or isinstance(e, RunBudgetExceeded):
+                raise
+            reason = f"invalid output: {e}"
+        else:
+            spent += call.usage
+            reason = None if last else _escalation_reason(stage, call.output, inputs)
+        if reason is None:
+            return StageCall(call.output, model_id, tier, spent)
+        await _aemit(run_id, _escalation_event(stage, model_id, route[position + 1][1], reason))
+
+def _observe_stage(stage: PipelineStage, call: StageCall, seconds: float) -> None:
+    observe(stage.agent_name, seconds)
+    AGENT_LATENCY.observe(seconds, agent=stage.agent_name, model=call.model)
+    AGENT_TOKENS.observe(call.usage.input_tokens, agent=stage.agent_name, direction="input")
+    AGENT_TOKENS.observe(call.usage.output_tokens, agent=stage.agent_name, direction="output")
+    span = current_span()
+    span.set_attribute("model", call.model)
+    span.set_attribute("tier", call.tier)
+    span.set_attribute("input_tokens", call.usage.input_tokens)
+    span.set_attribute("output_tokens", call.usage.output_tokens)
+
+def _record_outcome(status: str, error: Optional[BaseException] = None) -> None:
+    RUN_OUTCOMES.inc(status=status)
+    span = current_span()
+    span.set_attribute("status", status)
+    if error is not None:
+        span.record_error(error)
 
-        # --- Market Agent ---
-        append_event(run_id, {"type": "AGENT_STARTED", "agent": "MarketAgent"})
-        market_agent = MarketAgent()
+def _run_stage(run_id: str, stage: PipelineStage, **inputs: Any) -> Any:
+    """
+    Runs a single stage's agent, recording its events and artifact.
+
+    If the run already holds an artifact for this stage produced from identical inputs
+    (a retried or resumed run), it is reused instead of calling the agent again. The call
+    is bounded by the stage deadline and may be hedged (see src.agents.hedging).
+    """
+    with tracer.span(f"stage {stage.agent_name}", run_id=run_id, agent=stage.agent_name) as span:
+        agent, args = stage.prepare(**inputs)
+        fingerprint = stage_fingerprint(stage, args)
+        artifact = get_artifact(run_id, stage.agent_name)
+        output = _from_checkpoint(stage, artifact, fingerprint)
+        if output is not None:
+            span.set_attribute("checkpoint", True)
+            append_event(run_id, {"type": "AGENT_FINISHED", "agent": stage.agent_name, "checkpoint": True})
+            return stage.publish(output)
+
+        append_event(run_id, _started_event(stage, artifact, inputs))
         start_time = datetime.now(timezone.utc)
-        # Market agent output is a dict with 'audience' and 'market' keys based on prompt
-        # We need to handle the raw response since we didn't use a strict response_model class for the combined dict
-        # Ideally we should, but for now let's trust the prompt + json mode or parsing
-        # To make it robust, let's use the agent without response_model and parse JSON manually or use a generic dict
-        # Re-instantiating with response_format={"type": "json_object"} if supported, or just relying on prompt.
-        # Let's assume the run method handles it (we implemented it to return dict).
-        market_raw = market_agent.run(idea_obj.expanded_summary)
+        call = _routed_call(run_id, stage, agent, args, inputs)
         end_time = datetime.now(timezone.utc)
-        
-        # Parse into Pydantic models
-        audience_obj = Audience(**market_raw.get("audience", {}))
-        market_obj = Market(**market_raw.get("market", {}))
-        
-        market_artifact = AgentArtifact(
-            agent_name="MarketAgent",
-            started_at=start_time,
-            finished_at=end_time,
-            input_summary="Expanded Idea Summary",
-            output_markdown=f"**Positioning:** {market_obj.positioning}\n\n**Target Audience:** {', '.join(audience_obj.primary_users)}",
-            output_json=market_raw
-        )
-        save_artifact(run_id, market_artifact)
-        append_event(run_id, {"type": "AGENT_FINISHED", "agent": "MarketAgent"})
+        _observe_stage(stage, call, (end_time - start_time).total_seconds())
 
-        # --- Risk Agent ---
-        append_event(run_id, {"type": "AGENT_STARTED", "agent": "RiskAgent"})
-        risk_agent = RiskAgent()
+        save_artifact(run_id, _stage_artifact(stage, call, start_time, end_time, inputs, fingerprint))
+        append_event(run_id, {"type": "AGENT_FINISHED", "agent": stage.agent_name, "model": call.model})
+        return stage.publish(call.output)
+
+async def _arun_stage(run_id: str, stage: PipelineStage, **inputs: Any) -> Any:
+    """
+    Async counterpart of `_run_stage`. Storage calls are offloaded to threads so the event
+    loop only ever waits on the model.
+    """
+    with tracer.span(f"stage {stage.agent_name}", run_id=run_id, agent=stage.agent_name) as span:
+        agent, args = stage.prepare(**inputs)
+        fingerprint = stage_fingerprint(stage, args)
+        artifact = await asyncio.to_thread(get_artifact, run_id, stage.agent_name)
+        output = _from_checkpoint(stage, artifact, fingerprint)
+        if output is not None:
+            span.set_attribute("checkpoint", True)
+            await asyncio.to_thread(append_event, run_id, {"type": "AGENT_FINISHED", "agent": stage.agent_name, "checkpoint": True})
+            return stage.publish(output)
+
+        await asyncio.to_thread(append_event, run_id, _started_event(stage, artifact, inputs))
         start_time = datetime.now(timezone.utc)
-        risks_obj = risk_agent.run(idea_obj.expanded_summary, market_obj.positioning)
+        call = await _arouted_call(run_id, stage, agent, args, inputs)
         end_time = datetime.now(timezone.utc)
-        
-        risk_artifact = AgentArtifact(
-            agent_name="RiskAgent",
-            started_at=start_time,
-            finished_at=end_time,
-            input_summary="Idea + Market Positioning",
-            output_markdown=f"**Top Risks:**\n" + "\n".join([f"- {r}" for r in risks_obj.top_risks]),
-            output_json=risks_obj.model_dump()
-        )
-        save_artifact(run_id, risk_artifact)
-        append_event(run_id, {"type": "AGENT_FINISHED", "agent": "RiskAgent"})
+        _observe_stage(stage, call, (end_time - start_time).total_seconds())
+
+        await asyncio.to_thread(save_artifact, run_id, _stage_artifact(stage, call, start_time, end_time, inputs, fingerprint))
+        await asyncio.to_thread(append_event, run_id, {"type": "AGENT_FINISHED", "agent": stage.agent_name, "model": call.model})
+        return stage.publish(call.output)
 
-        # --- Execution Agent ---
-        append_event(run_id, {"type": "AGENT_STARTED", "agent": "ExecutionAgent"})
-        execution_agent = ExecutionAgent()
+def build_stage_graph(run_id: str, interview: Optional[Interview], runner: Callable[..., Any] = _run_stage) -> StageGraph:
+    """
+    Builds the analysis stage graph for a run. Pass `runner=_arun_stage` for a graph that
+    can be executed with `StageGraph.arun`.
+    """
+    stages = list(ANALYSIS_STAGES)
+    if interview and interview.answers:
+        stages.append(INTERVIEW_EVALUATOR_STAGE)
+    return StageGraph([
+        Stage(name=stage.output, fn=partial(runner, run_id, stage), inputs=list(stage.inputs))
+        for stage in stages
+    ])
+
+# --- Speculation ---
+
+def _speculate_stage(run_id: str, stage: PipelineStage, **inputs: Any) -> Any:
+    with tracer.span(f"stage {stage.agent_name}", run_id=run_id, agent=stage.agent_name, speculative=True):
+        agent, args = stage.prepare(**inputs)
+        _check_budget(run_id, agent, args)
         start_time = datetime.now(timezone.utc)
-        execution_obj = execution_agent.run(idea_obj.expanded_summary, str(risks_obj.top_risks))
+        cache_hits: List[bool] = []
+        reported: List[TokenUsage] = []
+        output = agent.run(*args, on_cache_hit=lambda: cache_hits.append(True), on_usage=reported.append)
         end_time = datetime.now(timezone.utc)
-        
-        execution_artifact = AgentArtifact(
-            agent_name="ExecutionAgent",
-            started_at=start_time,
-            finished_at=end_time,
-            input_summary="Idea + Risks",
-            output_markdown=f"**MVP Scope:**\n" + "\n".join([f"- {s}" for s in execution_obj.mvp_scope]),
-            output_json=execution_obj.model_dump()
-        )
-        save_artifact(run_id, execution_artifact)
-        append_event(run_id, {"type": "AGENT_FINISHED", "agent": "ExecutionAgent"})
+        call = StageCall(output, agent.model_id, usage=_charge(run_id, agent, args, output, cached=bool(cache_hits), reported=reported))
+        save_speculation(run_id, _stage_artifact(stage, call, start_time, end_time, inputs, stage_fingerprint(stage, args)))
+        return stage.publish(output)
 
-        # --- Judge Agent ---
-        append_event(run_id, {"type": "AGENT_STARTED", "agent": "JudgeAgent"})
-        judge_agent = JudgeAgent()
+async def _aspeculate_stage(run_id: str, stage: PipelineStage, **inputs: Any) -> Any:
+    with tracer.span(f"stage {stage.agent_name}", run_id=run_id, agent=stage.agent_name, speculative=True):
+        agent, args = stage.prepare(**inputs)
+        await asyncio.to_thread(_check_budget, run_id, agent, args)
         start_time = datetime.now(timezone.utc)
-        
-        # Compile context for Judge
-        summary_context = (
-            f"Idea: {idea_obj.expanded_summary}\n"
-            f"Market Positioning: {market_obj.positioning}\n"
-            f"Top Risks: {risks_obj.top_risks}\n"
-            f"MVP Scope: {execution_obj.mvp_scope}"
-        )
-        
-        recommendation_obj = judge_agent.run(summary_context)
+        cache_hits: List[bool] = []
+        reported: List[TokenUsage] = []
+        output = await agent.arun(*args, on_cache_hit=lambda: cache_hits.append(True), on_usage=reported.append)
         end_time = datetime.now(timezone.utc)
+        call = StageCall(output, agent.model_id, usage=await asyncio.to_thread(_charge, run_id, agent, args, output, bool(cache_hits), reported))
+        await asyncio.to_thread(save_speculation, run_id, _stage_artifact(stage, call, start_time, end_time, inputs, stage_fingerprint(stage, args)))
+        return stage.publish(output)
+
+def _related_findings(run_id: str, idea_text: str) -> Dict[str, Any]:
+    # Retrieval only grounds the Market and Risk agents; a failed lookup must not fail the run
+    try:
+        return get_related_findings(run_id, idea_text)
+    except (OSError, ValueError, sqlite3.Error):
+        logger.exception("Could not look up related findings for run %s", run_id)
+        return {}
+
+def _speculation_graph(run_id: str, runner: Callable[..., Any]) -> StageGraph:
+    return StageGraph([
+        Stage(name=stage.output, fn=partial(runner, run_id, stage), inputs=list(stage.inputs))
+        for stage in SPECULATIVE_STAGES
+    ])
+
+def speculate(run_id: str, idea_text: str) -> None:
+    """
+    Runs the speculative stages on the raw idea while the run waits for interview answers.
+    Results go to the run's speculative area; failures are logged and never fail the run.
+    """
+    try:
+        findings = _related_findings(run_id, idea_text)
+        _speculation_graph(run_id, _speculate_stage).run({"idea_text": idea_text, "interview": None, "findings": findings})
+    except Exception:
+        traceback.print_exc()
+
+async def aspeculate(run_id: str, idea_text: str) -> None:
+    """
+    Async counterpart of `speculate`.
+    """
+    try:
+        findings = await asyncio.to_thread(_related_findings, run_id, idea_text)
+        await _speculation_graph(run_id, _aspeculate_stage).arun({"idea_text": idea_text, "interview": None, "findings": findings})
+    except Exception:
+        traceback.print_exc()
+
+def _token_similarity(a: str, b: str) -> float:
+    tokens_a, tokens_b = set(a.lower().split()), set(b.lower().split())
+    if not tokens_a | tokens_b:
+        return 1.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+def promote_speculation(run_id: str, idea_text: str, interview: Interview) -> None:
+    """
+    Applies SPECULATIVE_POLICY to speculative results once interview answers arrive.
+
+    Reused results are saved as regular artifacts stamped with the fingerprint of the
+    answered inputs, so the normal checkpoint path picks them up instead of calling the
+    agents. Speculative results are cleared either way.
+    """
+    planner = get_speculation(run_id, PLANNER_STAGE.agent_name)
+    if planner is None:
+        return
+
+    planner_input = _planner_input(idea_text, interview)
+    # Compare against the answers themselves, not the Q/A scaffolding the planner input adds
+    similarity = _token_similarity(idea_text, " ".join([idea_text, *interview.answers.values()]))
+    reuse = SPECULATIVE_POLICY == "always" or (
+        SPECULATIVE_POLICY == "similar" and similarity >= SPECULATIVE_MIN_SIMILARITY
+    )
+    if reuse:
+        planner.input_fingerprint = stage_fingerprint(PLANNER_STAGE, (planner_input,))
+        save_artifact(run_id, planner)
+        # Market only saw the planner's output and the run's pinned findings, so its own
+        # fingerprint still holds
+        market = get_speculation(run_id, MARKET_STAGE.agent_name)
+        if market is not None:
+            save_artifact(run_id, market)
+
+    append_event(run_id, {
+        "type": "SPECULATION_REUSED" if reuse else "SPECULATION_DISCARDED",
+        "policy": SPECULATIVE_POLICY,
+        "similarity": round(similarity, 3),
+    })
+    clear_speculation(run_id)
+
+# --- Pipeline Orchestration ---
+
+def _build_interview(questions_data: List[Any]) -> Interview:
+    questions = []
+    for i, q_data in enumerate(questions_data):
+        # Handle both string (legacy) and dict (new) formats just in case
+        if isinstance(q_data, str):
+            questions.append(Question(id=str(i+1), text=q_data, guidance=None))
+        else:
+            questions.append(Question(
+                id=str(i+1), 
+                text=q_data.get("text", ""), 
+                guidance=q_data.get("guidance")
+            ))
+    return Interview(questions=questions, answers={})
+
+def _stage_models(run_id: str, results: Dict[str, Any]) -> List[str]:
+    """
+    The models that produced the run's stage outputs, in stage order, as recorded in the
+    stages' artifacts, so stages reused from checkpoints or speculation are included.
+    """
+    models: List[str] = []
+    for stage in ANALYSIS_STAGES + [INTERVIEW_EVALUATOR_STAGE]:
+        if stage.output not in results:
+            continue
+        artifact = get_artifact(run_id, stage.agent_name)
+        model = artifact.model if artifact is not None else None
+        if model and model not in models:
+            models.append(model)
+    return models
+
+def _assemble_report(run_id: str, results: Dict[str, Any], models: List[str]) -> ClarityReport:
+    audience_obj, market_obj = results["market"]
+    return ClarityReport(
+        meta=Meta(
+            run_id=run_id,
+            model=", ".join(models) or "unknown",
+            version="0.1"
+        ),
+        idea=results["idea"],
+        audience=audience_obj,
+        market=market_obj,
+        risks=results["risks"],
+        execution=results["execution"],
+        recommendation=results["recommendation"],
+        interview_evaluation=results.get("interview_evaluation"),
+        sources=[] # Sources could be gathered by agents if we added that capability
+    )
+
+def run_analysis(run_id: str, idea_text: str, max_concurrency: Optional[int] = None) -> Optional[ClarityReport]:
+    """
+    Executes the multi-agent pipeline for a given run_id.
+
+    Stages run as soon as their inputs are ready, with at most `max_concurrency` agents in
+    flight (defaults to CLARITY_STAGE_CONCURRENCY).
+    """
+    with tracer.span("run", run_id=run_id):
+        try:
+            # 1. Start Run
+            append_event(run_id, {"type": "RUN_STARTED", "status": "RUNNING"})
         
-        scores_md = ""
-        if recommendation_obj.scores:
-            scores_md = "\n\n**Scores:**\n"
-            scores_md += f"- Market Demand: {recommendation_obj.scores.market_demand.score}/10 ({recommendation_obj.scores.market_demand.reasoning})\n"
-            scores_md += f"- Competitive Advantage: {recommendation_obj.scores.competitive_advantage.score}/10 ({recommendation_obj.scores.competitive_advantage.reasoning})\n"
-            scores_md += f"- Technical Feasibility: {recommendation_obj.scores.technical_feasibility.score}/10 ({recommendation_obj.scores.technical_feasibility.reasoning})\n"
-            scores_md += f"- Business Viability: {recommendation_obj.scores.business_viability.score}/10 ({recommendation_obj.scores.business_viability.reasoning})\n"
-            scores_md += f"\n**Confidence:** {recommendation_obj.confidence}"
-
-        judge_artifact = AgentArtifact(
-            agent_name="JudgeAgent",
-            started_at=start_time,
-            finished_at=end_time,
-            input_summary="All Agent Outputs",
-            output_markdown=f"**Verdict:** {recommendation_obj.verdict}{scores_md}\n\n**Rationale:** {recommendation_obj.rationale}",
-            output_json=recommendation_obj.model_dump()
-        )
-        save_artifact(run_id, judge_artifact)
-        append_event(run_id, {"type": "AGENT_FINISHED", "agent": "JudgeAgent"})
-
-        # --- Interview Evaluator Agent ---
-        interview_evaluation = None
-        if existing_interview and existing_interview.answers:
-            append_event(run_id, {"type": "AGENT_STARTED", "agent": "InterviewEvaluatorAgent"})
-            evaluator_agent = InterviewEvaluatorAgent()
-            start_time = datetime.now(timezone.utc)
-            interview_evaluation = evaluator_agent.run(existing_interview)
-            end_time = datetime.now(timezone.utc)
+            # --- Interviewer Agent ---
+            # Check if we already have an interview (resume mode) or need to start one
+            existing_interview = get_interview(run_id)
+        
+            if not existing_interview:
+                append_event(run_id, {"type": "AGENT_STARTED", "agent": "InterviewerAgent"})
+                interviewer = get_agent(InterviewerAgent)
+                _check_budget(run_id, interviewer, (idea_text,))
+                cache_hits: List[bool] = []
+                reported: List[TokenUsage] = []
+                # Every run waits on the interviewer first, so its questions are streamed too
+                deltas = DeltaBuffer("InterviewerAgent") if STREAM_AGENT_OUTPUT else None
+                questions_data = interviewer.run(
+                    idea_text,
+                    on_delta=(lambda text: _emit(run_id, deltas.add(text))) if deltas else None,
+                    on_cache_hit=lambda: cache_hits.append(True),
+                    on_usage=reported.append,
+                )
+                if deltas:
+                    _emit(run_id, deltas.flush())
+                _charge(run_id, interviewer, (idea_text,), questions_data, cached=bool(cache_hits), reported=reported)
             
-            evaluator_artifact = AgentArtifact(
-                agent_name="InterviewEvaluatorAgent",
-                started_at=start_time,
-                finished_at=end_time,
-                input_summary="Interview Questions & Answers",
-                output_markdown=interview_evaluation.summary,
-                output_json=interview_evaluation.model_dump()
+                if questions_data:
+                    save_interview(run_id, _build_interview(questions_data))
+                
+                    append_event(run_id, {"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
+                    append_event(run_id, {"type": "WAITING_FOR_INPUT", "status": "WAITING_FOR_INPUT"})
+                    update_run_status(run_id, "WAITING_FOR_INPUT")
+                    _record_outcome("WAITING_FOR_INPUT")
+                    if SPECULATIVE_ENABLED:
+                        speculate(run_id, idea_text)
+                    return None # Stop pipeline to wait for user input
+            
+                # If no questions, proceed directly (shouldn't happen with current prompt but good fallback)
+                append_event(run_id, {"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
+
+            if existing_interview and existing_interview.answers:
+                promote_speculation(run_id, idea_text, existing_interview)
+
+            # --- Planner → Market → Risk → Execution → Judge, with InterviewEvaluator alongside ---
+            findings = _related_findings(run_id, idea_text)
+            graph = build_stage_graph(run_id, existing_interview)
+            results = graph.run(
+                {"idea_text": idea_text, "interview": existing_interview, "findings": findings},
+                max_concurrency=max_concurrency or MAX_STAGE_CONCURRENCY,
             )
-            save_artifact(run_id, evaluator_artifact)
-            append_event(run_id, {"type": "AGENT_FINISHED", "agent": "InterviewEvaluatorAgent"})
-
-        # --- Final Report Assembly ---
-        report = ClarityReport(
-            meta=Meta(
-                run_id=run_id,
-                model="gpt-4o",
-                version="0.1"
-            ),
-            idea=idea_obj,
-            audience=audience_obj,
-            market=market_obj,
-            risks=risks_obj,
-            execution=execution_obj,
-            recommendation=recommendation_obj,
-            interview_evaluation=interview_evaluation,
-            sources=[] # Sources could be gathered by agents if we added that capability
-        )
-        
-        save_report(run_id, report)
-        append_event(run_id, {"type": "RUN_COMPLETED", "status": "COMPLETED"})
+
+            # --- Final Report Assembly ---
+            report = _assemble_report(run_id, results, _stage_models(run_id, results))
+            save_report(run_id, report)
+            append_event(run_id, {"type": "RUN_COMPLETED", "status": "COMPLETED"})
+            _record_outcome("COMPLETED")
         
-        return report
+            return report
 
-    except Exception as e:
-        error_msg = str(e)
-        traceback.print_exc()
-        append_event(run_id, {"type": "RUN_FAILED", "error": error_msg, "status": "FAILED"})
-        return None
+        except Exception as e:
+            error_msg = str(e)
+            traceback.print_exc()
+            append_event(run_id, {"type": "RUN_FAILED", "error": error_msg, "status": "FAILED"})
+            update_run_status(run_id, "FAILED")
+            _record_outcome("FAILED", e)
+            return None
+
+async def arun_analysis(run_id: str, idea_text: str, max_concurrency: Optional[int] = None) -> Optional[ClarityReport]:
+    """
+    Async variant of `run_analysis` that drives the agents through agno's async run path,
+    so a single event loop can serve many concurrent runs without holding a thread per run.
+    """
+    with tracer.span("run", run_id=run_id):
+        try:
+            await asyncio.to_thread(append_event, run_id, {"type": "RUN_STARTED", "status": "RUNNING"})
+
+            existing_interview = await asyncio.to_thread(get_interview, run_id)
+
+            if not existing_interview:
+                await asyncio.to_thread(append_event, run_id, {"type": "AGENT_STARTED", "agent": "InterviewerAgent"})
+                interviewer = get_agent(InterviewerAgent)
+                await asyncio.to_thread(_check_budget, run_id, interviewer, (idea_text,))
+                cache_hits: List[bool] = []
+                reported: List[TokenUsage] = []
+                deltas = DeltaBuffer("InterviewerAgent") if STREAM_AGENT_OUTPUT else None
+                questions_data = await interviewer.arun(
+                    idea_text,
+                    on_delta=(lambda text: _aemit(run_id, deltas.add(text))) if deltas else None,
+                    on_cache_hit=lambda: cache_hits.append(True),
+                    on_usage=reported.append,
+                )
+                if deltas:
+                    await _aemit(run_id, deltas.flush())
+                await asyncio.to_thread(_charge, run_id, interviewer, (idea_text,), questions_data, bool(cache_hits), reported)
+
+                if questions_data:
+                    await asyncio.to_thread(save_interview, run_id, _build_interview(questions_data))
+
+                    await asyncio.to_thread(append_event, run_id, {"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
+                    await asyncio.to_thread(append_event, run_id, {"type": "WAITING_FOR_INPUT", "status": "WAITING_FOR_INPUT"})
+                    await asyncio.to_thread(update_run_status, run_id, "WAITING_FOR_INPUT")
+                    _record_outcome("WAITING_FOR_INPUT")
+                    if SPECULATIVE_ENABLED:
+                        await aspeculate(run_id, idea_text)
+                    return None
+
+                await asyncio.to_thread(append_event, run_id, {"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
+
+            if existing_interview and existing_interview.answers:
+                await asyncio.to_thread(promote_speculation, run_id, idea_text, existing_interview)
+
+            findings = await asyncio.to_thread(_related_findings, run_id, idea_text)
+            graph = build_stage_graph(run_id, existing_interview, runner=_arun_stage)
+            results = await graph.arun(
+                {"idea_text": idea_text, "interview": existing_interview, "findings": findings},
+                max_concurrency=max_concurrency or MAX_STAGE_CONCURRENCY,
+            )
+
+            report = _assemble_report(run_id, results, await asyncio.to_thread(_stage_models, run_id, results))
+            await asyncio.to_thread(save_report, run_id, report)
+            await asyncio.to_thread(append_event, run_id, {"type": "RUN_COMPLETED", "status": "COMPLETED"})
+            _record_outcome("COMPLETED")
+
+            return report
+
+        except Exception as e:
+            error_msg = str(e)
+            traceback.print_exc()
+            await asyncio.to_thread(append_event, run_id, {"type": "RUN_FAILED", "error": error_msg, "status": "FAILED"})
+            await asyncio.to_thread(update_run_status, run_id, "FAILED")
+            _record_outcome("FAILED", e)
+            return None
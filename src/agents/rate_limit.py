@@ -0,0 +1,447 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.agents.http_client import httpx
+from utils.telemetry.tracing import tracer
+
+# Per-model limits as JSON, e.g. {"gpt-4o": {"rpm": 500, "tpm": 30000, "concurrency": 16}}
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "gpt-4o": {"rpm": 500, "tpm": 30000, "concurrency": 16},
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200000, "concurrency": 32},
+}
+FALLBACK_LIMITS = {"rpm": 500, "tpm": 30000, "concurrency": 16}
+RATE_LIMITS: Dict[str, Dict[str, float]] = {
+    **DEFAULT_LIMITS,
+    **json.loads(os.getenv("CLARITY_RATE_LIMITS", "{}")),
+}
+# When set, request/token buckets live in this SQLite file and are shared by every process
+RATE_LIMIT_DB = os.getenv("CLARITY_RATE_LIMIT_DB")
+# How many times a throttled (429) request is retried before the response is surfaced
+RATE_LIMIT_RETRIES = int(os.getenv("CLARITY_RATE_LIMIT_RETRIES", "6"))
+# Completion size assumed when a request does not set max_tokens
+DEFAULT_OUTPUT_TOKENS = int(os.getenv("CLARITY_RATE_LIMIT_OUTPUT_TOKENS", "1024"))
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate` tokens per second, holding at
+    most `capacity` tokens. The level may go negative when actual usage is settled after
+    the fact, which simply delays later callers.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.level = capacity
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self, amount: float) -> float:
+        """
+        Takes `amount` tokens if available and returns 0, otherwise returns the number of
+        seconds until they will be.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.level >= amount:
+                self.level -= amount
+                return 0.0
+            return (amount - self.level) / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """
+        Unconditionally adds (or, if negative, removes) tokens.
+        """
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in a SQLite table, so every process pointing at the same
+    file draws from one budget. Each operation is a single IMMEDIATE transaction on a
+    connection kept per thread.
+    """
+
+    def __init__(self, path: Path, key: str, rate: float, capacity: float):
+        self.path = Path(path)
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)", (key, capacity, time.time()))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, amount: float, force: bool) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            level, updated_at = conn.execute(
+                "SELECT level, updated_at FROM buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            now = time.time()
+            level = min(self.capacity, level + (now - updated_at) * self.rate)
+            wait = 0.0
+            if force or level >= amount:
+                level -= amount
+            else:
+                wait = (amount - level) / self.rate
+            conn.execute("UPDATE buckets SET level = ?, updated_at = ? WHERE key = ?", (min(self.capacity, level), now, self.key))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return wait
+
+    def take(self, amount: float) -> float:
+        return self._update(min(amount, self.capacity), force=False)
+
+    def adjust(self, amount: float) -> None:
+        self._update(-amount, force=True)
+
+class ModelLimiter:
+    """
+    Request/minute and token/minute budgets plus an adaptive concurrency limit for a model.
+
+    Concurrency follows AIMD: every throttled (429) response halves the limit and pauses
+    new requests until the provider's Retry-After has passed, while every successful
+    response grows the limit back by roughly one slot per window of requests. Callers
+    waiting for a slot are woken by the release that frees one.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        rpm: float,
+        tpm: float,
+        concurrency: int,
+        shared_path: Optional[Path] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.model_id = model_id
+        self.max_concurrency = concurrency
+        self.limit = float(concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        # Coroutines waiting for a slot, woken on their own event loop
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+        if shared_path:
+            self.requests: Any = SharedTokenBucket(shared_path, f"{model_id}:requests", rpm / 60, rpm)
+            self.tokens: Any = SharedTokenBucket(shared_path, f"{model_id}:tokens", tpm / 60, tpm)
+        else:
+            self.requests = TokenBucket(rpm / 60, rpm, clock)
+            self.tokens = TokenBucket(tpm / 60, tpm, clock)
+
+    def try_acquire(self, tokens: float) -> float:
+        """
+        Claims a concurrency slot, one request and `tokens` tokens. Returns 0 on success,
+        otherwise the number of seconds to wait before trying again: infinite when every
+        slot is taken, as only a release can free one.
+        """
+        with self._lock:
+            now = self.clock()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if not self._slot_free():
+                return math.inf
+            # The slot is held while the buckets are drawn from, so callers cannot overshoot it
+            self.in_flight += 1
+        # Outside the lock: shared buckets wait on SQLite, which must not stall other callers
+        wait = self.requests.take(1)
+        if not wait:
+            wait = self.tokens.take(tokens)
+            if wait:
+                self.requests.adjust(1)
+        if wait:
+            with self._lock:
+                self.in_flight = max(0, self.in_flight - 1)
+        return wait
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None, token_delta: float = 0.0) -> None:
+        """
+        Returns a slot. `token_delta` settles the difference between actual and estimated
+        token usage once the response is known.
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.throttled += 1
+                self.limit = max(1.0, self.limit / 2)
+                self.blocked_until = max(self.blocked_until, self.clock() + (1.0 if retry_after is None else retry_after))
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._slot_freed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # the waiter's event loop has closed
+        if token_delta:
+            self.tokens.adjust(-token_delta)
+
+    def _slot_free(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _slot_released(self) -> "asyncio.Future[None]":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._slot_free():
+                future.set_result(None)
+            else:
+                self._async_waiters.append((loop, future))
+        return future
+
+    def acquire(self, tokens: float) -> None:
+        while (wait := self.try_acquire(tokens)) > 0:
+            if wait == math.inf:
+                with self._slot_freed:
+                    self._slot_freed.wait_for(self._slot_free)
+            else:
+                time.sleep(wait)
+
+    async def aacquire(self, tokens: float) -> None:
+        while (wait := self.try_acquire(tokens)) > 0:
+            if wait == math.inf:
+                await self._slot_released()
+            else:
+                await asyncio.sleep(wait)
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(model_id: str) -> ModelLimiter:
+    """
+    Returns the process-wide limiter for a model id.
+    """
+    limiter = _limiters.get(model_id)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(model_id)
+            if limiter is None:
+                limits = {**FALLBACK_LIMITS, **RATE_LIMITS.get(model_id, {})}
+                limiter = ModelLimiter(
+                    model_id,
+                    rpm=limits["rpm"],
+                    tpm=limits["tpm"],
+                    concurrency=int(limits["concurrency"]),
+                    shared_path=Path(RATE_LIMIT_DB) if RATE_LIMIT_DB else None,
+                )
+                _limiters[model_id] = limiter
+    return limiter
+
+def _request_budget(request: httpx.Request) -> Optional[tuple]:
+    """
+    Returns (model_id, estimated_tokens) for a model request, or None if the body does not
+    name a model (e.g. file uploads), in which case the request is not limited.
+    """
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return None
+    if not isinstance(body, dict) or "model" not in body:
+        return None
+    output_tokens = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_OUTPUT_TOKENS
+    # ~4 characters per token is close enough for budgeting; settled against usage later
+    return body["model"], len(request.content) / 4 + output_tokens
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    Parses Retry-After (seconds or HTTP date) or OpenAI's retry-after-ms header.
+    """
+    if "retry-after-ms" in response.headers:
+        try:
+            return float(response.headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def _backoff(response: httpx.Response, attempt: int) -> float:
+    retry_after = retry_after_seconds(response)
+    return 2.0 ** attempt if retry_after is None else retry_after
+
+def _token_delta(response: httpx.Response, estimate: float) -> float:
+    # Streaming responses report usage in-band; only settle plain JSON bodies
+    if "application/json" not in response.headers.get("content-type", ""):
+        return 0.0
+    try:
+        usage = response.json().get("usage") or {}
+    except ValueError:
+        return 0.0
+    total = usage.get("total_tokens")
+    return float(total) - estimate if total else 0.0
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """
+    Response body that returns the request's limiter slot once it is closed, so streamed
+    responses count against the concurrency limit until they are fully consumed.
+    """
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self.stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self.stream
+
+    def close(self) -> None:
+        release, self._release = self._release, None
+        try:
+            self.stream.close()
+        finally:
+            if release is not None:
+                release()
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    """
+    Async counterpart of _ReleasingStream.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self.stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        release, self._release = self._release, None
+        try:
+            await self.stream.aclose()
+        finally:
+            if release is not None:
+                release()
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    httpx transport that puts every model request through its model's limiter and retries
+    throttled requests after the provider's Retry-After instead of surfacing the 429.
+    """
+
+    def __init__(self, inner: httpx.BaseTransport, retries: int = RATE_LIMIT_RETRIES):
+        self.inner = inner
+        self.retries = retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        budget = _request_budget(request)
+        if budget is None:
+            return self.inner.handle_request(request)
+        limiter, estimate = get_limiter(budget[0]), budget[1]
+
+        with tracer.span("model request", kind="client", model=budget[0], estimated_tokens=estimate) as span:
+            for attempt in range(self.retries + 1):
+                limiter.acquire(estimate)
+                try:
+                    response = self.inner.handle_request(request)
+                except BaseException:
+                    limiter.release()
+                    raise
+                span.set_attribute("attempts", attempt + 1)
+                span.set_attribute("status_code", response.status_code)
+                if response.status_code == 429 and attempt < self.retries:
+                    limiter.release(throttled=True, retry_after=_backoff(response, attempt))
+                    response.close()
+                    continue
+                if response.status_code == 429:
+                    limiter.release(throttled=True, retry_after=retry_after_seconds(response))
+                    return response
+                if "application/json" not in response.headers.get("content-type", ""):
+                    # A streamed body keeps its slot until the caller closes the response
+                    response.stream = _ReleasingStream(response.stream, limiter.release)
+                    return response
+                response.read()
+                limiter.release(token_delta=_token_delta(response, estimate))
+                return response
+        raise RuntimeError("unreachable")
+
+    def close(self) -> None:
+        self.inner.close()
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of RateLimitedTransport. Waiting for budget never blocks the loop.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, retries: int = RATE_LIMIT_RETRIES):
+        self.inner = inner
+        self.retries = retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        budget = _request_budget(request)
+        if budget is None:
+            return await self.inner.handle_async_request(request)
+        limiter, estimate = get_limiter(budget[0]), budget[1]
+
+        with tracer.span("model request", kind="client", model=budget[0], estimated_tokens=estimate) as span:
+            for attempt in range(self.retries + 1):
+                await limiter.aacquire(estimate)
+                try:
+                    response = await self.inner.handle_async_request(request)
+                except BaseException:
+                    limiter.release()
+                    raise
+                span.set_attribute("attempts", attempt + 1)
+                span.set_attribute("status_code", response.status_code)
+                if response.status_code == 429 and attempt < self.retries:
+                    limiter.release(throttled=True, retry_after=_backoff(response, attempt))
+                    await response.aclose()
+                    continue
+                if response.status_code == 429:
+                    limiter.release(throttled=True, retry_after=retry_after_seconds(response))
+                    return response
+                if "application/json" not in response.headers.get("content-type", ""):
+                    response.stream = _AsyncReleasingStream(response.stream, limiter.release)
+                    return response
+                await response.aread()
+                limiter.release(token_delta=_token_delta(response, estimate))
+                return response
+        raise RuntimeError("unreachable")
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
@@ -0,0 +1,118 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from uuid import uuid4
+
+from agno.models.openai import OpenAIChat
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from src.agents.http_client import httpx
+
+from src.agents.fake_backend import AsyncFakeOpenAITransport, FakeModelBackend, FakeOpenAITransport
+from src.agents.rate_limit import AsyncRateLimitedTransport, RateLimitedTransport
+
+T = TypeVar("T")
+
+# Connection pool shared by every agent talking to the model provider
+HTTP_MAX_CONNECTIONS = int(os.getenv("CLARITY_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("CLARITY_HTTP_MAX_KEEPALIVE", "20"))
+
+# "openai" talks to the real API; "fake" answers every model call locally (see fake_backend)
+MODEL_BACKEND = os.getenv("CLARITY_MODEL_BACKEND", "openai")
+
+_clients_lock = threading.Lock()
+_clients: Optional[Tuple[OpenAI, AsyncOpenAI]] = None
+
+def _transports(limits: httpx.Limits) -> Tuple[httpx.BaseTransport, httpx.AsyncBaseTransport]:
+    if MODEL_BACKEND == "fake":
+        backend = FakeModelBackend()
+        return FakeOpenAITransport(backend), AsyncFakeOpenAITransport(backend)
+    return httpx.HTTPTransport(limits=limits), httpx.AsyncHTTPTransport(limits=limits)
+
+def shared_openai_clients() -> Optional[Tuple[OpenAI, AsyncOpenAI]]:
+    """
+    Returns the process-wide sync and async OpenAI clients, creating them on first use.
+    Returns None when no API key is configured, leaving agno to raise its usual error
+    at call time. The fake backend needs no key.
+    """
+    global _clients
+    if _clients is None:
+        if not os.getenv("OPENAI_API_KEY") and MODEL_BACKEND != "fake":
+            return None
+        with _clients_lock:
+            if _clients is None:
+                limits = httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                )
+                transport, async_transport = _transports(limits)
+                api_key = os.getenv("OPENAI_API_KEY") or "fake"
+                # Every model request passes through the per-model rate limiter
+                _clients = (
+                    OpenAI(api_key=api_key, http_client=DefaultHttpxClient(
+                        transport=RateLimitedTransport(transport),
+                    )),
+                    AsyncOpenAI(api_key=api_key, http_client=DefaultAsyncHttpxClient(
+                        transport=AsyncRateLimitedTransport(async_transport),
+                    )),
+                )
+    return _clients
+
+def shared_model(model_id: str, **kwargs: Any) -> OpenAIChat:
+    """
+    Builds an OpenAIChat model that reuses the shared OpenAI clients, so every agent in the
+    process goes through one pooled HTTP connection (and one rate limiter) instead of
+    opening its own.
+    """
+    model = OpenAIChat(id=model_id, **kwargs)
+    clients = shared_openai_clients()
+    if clients is not None:
+        model.client, model.async_client = clients
+    return model
+
+class AgentRegistry:
+    """
+    Process-wide cache of agent wrappers.
+
+    Each configuration is built once and then shared by every run and thread. The wrappers
+    hold no per-run state: pipeline agents start a fresh agno session on every call, so
+    sharing an instance never carries conversation history from one run into another.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[Hashable, Any] = {}
+
+    def get(self, factory: Callable[[], T], key: Optional[Hashable] = None) -> T:
+        """
+        Returns the agent registered under `key` (defaults to the factory itself),
+        building it with `factory()` on first use.
+        """
+        key = factory if key is None else key
+        agent = self._agents.get(key)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(key)
+                if agent is None:
+                    agent = factory()
+                    self._agents[key] = agent
+        return agent
+
+    def clear(self) -> None:
+        with self._lock:
+            self._agents.clear()
+
+registry = AgentRegistry()
+
+def get_agent(factory: Callable[[], T], key: Optional[Hashable] = None) -> T:
+    """
+    Returns the shared instance of an agent wrapper from the process-wide registry.
+    """
+    return registry.get(factory, key)
+
+def run_session_id(session_id: Optional[str] = None) -> str:
+    """
+    The agno session to run a shared agent or team in: `session_id` when the caller continues
+    a session, otherwise a new one. agno keeps the first session it sees on the instance, so
+    without a session per run every caller of a shared instance would share its history.
+    """
+    return session_id or str(uuid4())
@@ -0,0 +1,66 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# "fixed" keeps each agent's own model; "complexity" picks one tier from the size of the
+# agent's input; "cascade" starts at that tier and escalates to the next one when the output
+# fails validation or reports low certainty. CLARITY_ROUTING_MODES overrides it per agent.
+ROUTING_MODE = os.getenv("CLARITY_ROUTING_MODE", "fixed")
+ROUTING_MODES: Dict[str, str] = json.loads(os.getenv("CLARITY_ROUTING_MODES", "{}"))
+
+# Model tiers per agent, cheapest first. Agents without tiers always keep their own model.
+DEFAULT_MODEL_TIERS: Dict[str, List[str]] = {
+    "PlannerAgent": ["gpt-4o-mini", "gpt-4o"],
+    "MarketAgent": ["gpt-4o-mini", "gpt-4o"],
+    "RiskAgent": ["gpt-4o-mini", "gpt-4o"],
+    "ExecutionAgent": ["gpt-4o-mini", "gpt-4o"],
+    "JudgeAgent": ["gpt-4o-mini", "gpt-4o"],
+}
+MODEL_TIERS: Dict[str, List[str]] = {
+    **DEFAULT_MODEL_TIERS,
+    **json.loads(os.getenv("CLARITY_MODEL_TIERS", "{}")),
+}
+
+# Inputs with at least this many words are treated as complex and start at the top tier
+COMPLEX_INPUT_WORDS = int(os.getenv("CLARITY_ROUTING_COMPLEX_WORDS", "150"))
+# Cascade escalates when an output's self-reported `certainty` falls below this. Outputs
+# without one (e.g. the Judge's `confidence`, which scores the idea) escalate only when invalid
+CASCADE_MIN_CERTAINTY = float(os.getenv("CLARITY_CASCADE_MIN_CERTAINTY", "0.6"))
+
+def routing_mode(agent_name: str) -> str:
+    return ROUTING_MODES.get(agent_name, ROUTING_MODE)
+
+def input_complexity(args: Tuple[Any, ...]) -> int:
+    """
+    Rough complexity of an agent call: the number of words across its text arguments.
+    """
+    return sum(len(arg.split()) for arg in args if isinstance(arg, str))
+
+def model_route(agent_name: str, args: Tuple[Any, ...]) -> Optional[List[Tuple[int, str]]]:
+    """
+    Returns the (tier, model_id) pairs to try for a call, in order, or None when the agent
+    is not routed and should keep its own model.
+    """
+    mode = routing_mode(agent_name)
+    tiers = MODEL_TIERS.get(agent_name)
+    if mode not in ("complexity", "cascade") or not tiers:
+        return None
+    start = len(tiers) - 1 if input_complexity(args) >= COMPLEX_INPUT_WORDS else 0
+    route = list(enumerate(tiers))[start:]
+    return route if mode == "cascade" else route[:1]
+
+def reported_certainty(output: Any) -> Optional[float]:
+    """
+    The `certainty` an agent reported about its own output, if its output carries one.
+    """
+    certainty = output.get("certainty") if isinstance(output, dict) else getattr(output, "certainty", None)
+    return float(certainty) if isinstance(certainty, (int, float)) else None
+
+def low_certainty(output: Any) -> Optional[str]:
+    """
+    Returns an escalation reason when the output's self-reported certainty is too low.
+    """
+    certainty = reported_certainty(output)
+    if certainty is not None and certainty < CASCADE_MIN_CERTAINTY:
+        return f"certainty {certainty:.2f} below {CASCADE_MIN_CERTAINTY:.2f}"
+    return None
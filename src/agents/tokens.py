@@ -0,0 +1,135 @@
+import os
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+# USD per million tokens, as {"model": {"input": ..., "output": ...}}
+DEFAULT_MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+}
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    **DEFAULT_MODEL_PRICES,
+    **json.loads(os.getenv("CLARITY_MODEL_PRICES", "{}")),
+}
+
+# Maximum prompt tokens per agent, e.g. {"PlannerAgent": 3000}; longer prompts are truncated
+DEFAULT_CONTEXT_BUDGETS: Dict[str, int] = {
+    "PlannerAgent": 4000,
+    "MarketAgent": 2000,
+    "RiskAgent": 2000,
+    "ExecutionAgent": 2000,
+    "JudgeAgent": 3000,
+    "InterviewEvaluatorAgent": 4000,
+}
+CONTEXT_BUDGETS: Dict[str, int] = {
+    **DEFAULT_CONTEXT_BUDGETS,
+    **json.loads(os.getenv("CLARITY_CONTEXT_BUDGETS", "{}")),
+}
+
+# Per-run ceilings on counted tokens and estimated cost (0 disables)
+RUN_MAX_TOKENS = int(os.getenv("CLARITY_RUN_MAX_TOKENS", "0"))
+RUN_MAX_COST = float(os.getenv("CLARITY_RUN_MAX_COST", "0"))
+
+TRUNCATION_MARKER = "\n[... {count} tokens truncated ...]\n"
+
+class RunBudgetExceeded(ValueError):
+    pass
+
+@dataclass
+class TokenUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def __add__(self, other: "TokenUsage") -> "TokenUsage":
+        return TokenUsage(
+            self.input_tokens + other.input_tokens,
+            self.output_tokens + other.output_tokens,
+            self.cost_usd + other.cost_usd,
+        )
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+@lru_cache(maxsize=None)
+def _encoding(model_id: str) -> Any:
+    try:
+        return tiktoken.encoding_for_model(model_id)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def as_text(value: Any) -> str:
+    """
+    Text form of an instruction block or agent output, as it is sent or received.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        return "\n".join(value)
+    return json.dumps(value, default=str)
+
+def count_tokens(text: str, model_id: str) -> int:
+    """
+    Counts tokens with the model's tiktoken encoding, or estimates ~4 characters per token
+    when tiktoken is not installed.
+    """
+    if not text:
+        return 0
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    return len(_encoding(model_id).encode(text))
+
+def fit_context(agent_name: str, text: str, model_id: str, budget: Optional[int] = None) -> str:
+    """
+    Deterministically truncates `text` to the agent's context budget. The head and tail
+    are kept (the instruction-like opening and the latest context) and the middle is
+    replaced by a marker saying how many tokens were dropped.
+    """
+    budget = CONTEXT_BUDGETS.get(agent_name) if budget is None else budget
+    if not budget:
+        return text
+    total = count_tokens(text, model_id)
+    if total <= budget:
+        return text
+
+    dropped = total - budget
+    keep = max(0, budget - count_tokens(TRUNCATION_MARKER.format(count=dropped), model_id))
+    head, tail = keep - keep // 3, keep // 3
+    marker = TRUNCATION_MARKER.format(count=dropped)
+    if tiktoken is None:
+        return text[:head * 4] + marker + (text[-tail * 4:] if tail else "")
+    tokens = _encoding(model_id).encode(text)
+    decode = _encoding(model_id).decode
+    return decode(tokens[:head]) + marker + (decode(tokens[-tail:]) if tail else "")
+
+def estimate_cost(model_id: str, input_tokens: int, output_tokens: int) -> float:
+    prices = MODEL_PRICES.get(model_id)
+    if prices is None:
+        return 0.0
+    return (input_tokens * prices["input"] + output_tokens * prices["output"]) / 1_000_000
+
+def check_run_budget(totals: Dict[str, Any], pending_tokens: int = 0) -> None:
+    """
+    Raises RunBudgetExceeded when a run's recorded usage (plus `pending_tokens` about to
+    be sent) is over the configured per-run ceilings.
+    """
+    tokens = totals.get("input_tokens", 0) + totals.get("output_tokens", 0) + pending_tokens
+    if RUN_MAX_TOKENS and tokens > RUN_MAX_TOKENS:
+        raise RunBudgetExceeded(f"Run token budget exceeded: {tokens} > {RUN_MAX_TOKENS} tokens")
+    cost = totals.get("cost_usd", 0.0)
+    if RUN_MAX_COST and cost > RUN_MAX_COST:
+        raise RunBudgetExceeded(f"Run cost budget exceeded: ${cost:.4f} > ${RUN_MAX_COST:.4f}")
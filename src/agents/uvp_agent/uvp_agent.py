@@ -1,32 +1,35 @@
 import sys
 import os
+from typing import Optional
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.tools.hackernews import HackerNewsTools
 from agno.tools.newspaper4k import Newspaper4kTools
 from agno.tools.googlesearch import GoogleSearchTools
 from src.prompts.agent_prompts import AgentPrompts
+from src.agents.registry import run_session_id, shared_model
+from utils.telemetry.tracing import trace_tool_call, traced_run
 
 class UVPAgent():
     def __init__(self):
         self.agent = Agent(
             name="UVP Agent",
-            model=OpenAIChat(id="gpt-4o", temperature=0.5),
+            model=shared_model("gpt-4o", temperature=0.5),
             tools=[HackerNewsTools(), Newspaper4kTools(), GoogleSearchTools()],
+            tool_hooks=[trace_tool_call],
             instructions=AgentPrompts.UVP_AGENT_INSTRUCTIONS,
             markdown=True,
         )
 
-    def run(self, topic: str, audience_insights: str = "", competitive_analysis: str = "", stream: bool = False):
+    def run(self, topic: str, audience_insights: str = "", competitive_analysis: str = "", stream: bool = False, session_id: Optional[str] = None):
         context = f"Product/Idea: {topic}"
         if audience_insights:
             context += f"\n\nAudience Insights: {audience_insights}"
         if competitive_analysis:
             context += f"\n\nCompetitive Analysis: {competitive_analysis}"
         
-        return self.agent.run(f"Define a unique value proposition for: {context}", stream=stream)
+        return traced_run(f"agent {self.agent.name}", lambda: self.agent.run(f"Define a unique value proposition for: {context}", stream=stream, session_id=run_session_id(session_id)), topic=topic, stream=stream)
     
 if __name__ == "__main__":
     uvp_agent = UVPAgent()
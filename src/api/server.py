@@ -1,24 +1,54 @@
+import os
 import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse, RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 load_dotenv()
 
-from src.storage.runs import create_run, get_run, list_runs, _get_run_dir, save_interview, get_interview, update_run_status
-from src.agents.pipeline import run_analysis
-from src.contracts.clarity_report import ClarityReport
+from src.storage.runs import create_run, get_run, get_run_etag, get_run_updates, subscribe_run, decode_updates_cursor, encode_updates_cursor, list_run_page, get_report, save_interview, get_interview, update_run_status, find_similar_runs, fork_run
+from src.agents.pipeline import arun_analysis
+from src.contracts.clarity_report import ClarityReport, Interview
 from src.renderers.report_to_markdown import render_report_md
+from src.storage.retention import COMPACT_INTERVAL_HOURS, compact_runs
+from src.storage.run_index import MAX_PAGE_SIZE
+from utils.telemetry.metrics import CONTENT_TYPE, QUEUE_DEPTH, REGISTRY, RUNS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+async def _compact_periodically() -> None:
+    """
+    Applies the retention policies now and then every COMPACT_INTERVAL_HOURS.
+    """
+    while True:
+        try:
+            counts = await asyncio.to_thread(compact_runs)
+            if counts is not None:
+                logger.info("Compacted runs: archived %d, deleted %d", counts["archived"], counts["deleted"])
+        except Exception:
+            logger.exception("Run compaction failed")
+        await asyncio.sleep(COMPACT_INTERVAL_HOURS * 3600)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    compaction = asyncio.create_task(_compact_periodically()) if COMPACT_INTERVAL_HOURS > 0 else None
+    yield
+    if compaction is not None:
+        compaction.cancel()
 
 app = FastAPI(
     title="ClarityAI API",
     description="API for running AI-powered market analysis on startup ideas.",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Enable CORS
@@ -28,16 +58,191 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# The event loop only holds weak references to tasks, so keep in-flight runs alive here.
+_analysis_tasks: Dict[str, asyncio.Task] = {}
+
+# Seconds a run stream waits for progress before re-reading the run (catching up on writes
+# by other workers) and sending a keep-alive
+STREAM_RESYNC_SECONDS = float(os.getenv("CLARITY_STREAM_RESYNC_SECONDS", "15"))
+# Events after which a run stream ends
+FINAL_EVENTS = {"RUN_COMPLETED", "RUN_FAILED"}
+
+async def _analyse_after(previous: Optional[asyncio.Task], run_id: str, idea_text: str) -> None:
+    # A resume waits for the run's in-flight task (e.g. speculation while waiting for
+    # answers) so it can reuse whatever that task produced.
+    try:
+        if previous is not None:
+            await asyncio.wait({previous})
+    finally:
+        QUEUE_DEPTH.dec()
+    with RUNS_IN_FLIGHT.track():
+        await arun_analysis(run_id, idea_text)
+
+def _start_analysis(run_id: str, idea_text: str) -> None:
+    """
+    Schedules the async pipeline on the running event loop.
+    """
+    QUEUE_DEPTH.inc()
+    task = asyncio.create_task(_analyse_after(_analysis_tasks.get(run_id), run_id, idea_text))
+    _analysis_tasks[run_id] = task
+
+    def _forget(done: asyncio.Task) -> None:
+        if _analysis_tasks.get(run_id) is done:
+            del _analysis_tasks[run_id]
+
+    task.add_done_callback(_forget)
+
+def _partial_outputs(events: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Output streamed so far by agents that have started but not yet finished.
+    """
+    partial: Dict[str, str] = {}
+    for event in events:
+        agent = event.get("agent")
+        if event.get("type") == "AGENT_STARTED":
+            partial[agent] = ""
+        elif event.get("type") == "AGENT_OUTPUT_DELTA":
+            partial[agent] = partial.get(agent, "") + event.get("delta", "")
+        elif event.get("type") == "AGENT_FINISHED":
+            partial.pop(agent, None)
+    return {agent: text for agent, text in partial.items() if text}
+
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    message = f"id: {event_id}\n" if event_id else ""
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _has_final_event(updates: Dict[str, Any]) -> bool:
+    # A final event can be written just before the status update that goes with it; the
+    # update then takes its status
+    final = [event for event in updates["events"] if event.get("type") in FINAL_EVENTS]
+    if final:
+        updates["status"] = final[-1].get("status", updates["status"])
+    return bool(final)
+
+async def _stream_run(run_id: str, subscription: Any, updates: Dict[str, Any]):
+    """
+    Server-sent events of a run's progress: an "update" (shaped like GET /updates, with the
+    cursor as the event id) for the catch-up from the client's cursor and then one per
+    event, artifact or status change, until the run completes or fails ("end").
+    """
+    events_cursor, artifacts_cursor = decode_updates_cursor(updates["cursor"])
+    try:
+        done = _has_final_event(updates) or updates["status"] in ("COMPLETED", "FAILED")
+        status = updates["status"]
+        yield _sse("update", updates, updates["cursor"])
+        while not done:
+            message = await subscription.get(STREAM_RESYNC_SECONDS)
+            # A published event that does not follow the last one sent means events were
+            # missed, e.g. written by another worker
+            gap = message is not None and message["kind"] == "event" and message["start"] != events_cursor and message["position"] > events_cursor
+            if message is None or gap or subscription.overflowed:
+                subscription.resynced()
+                updates = await asyncio.to_thread(get_run_updates, run_id, encode_updates_cursor(events_cursor, artifacts_cursor))
+                if updates is None:
+                    break  # run deleted
+                done = _has_final_event(updates) or updates["status"] in ("COMPLETED", "FAILED")
+                if updates["events"] or updates["artifacts"] or updates["status"] != status:
+                    events_cursor, artifacts_cursor = decode_updates_cursor(updates["cursor"])
+                    status = updates["status"]
+                    yield _sse("update", updates, updates["cursor"])
+                elif message is None:
+                    yield ": keep-alive\n\n"
+                continue
+
+            updates = {"run_id": run_id, "status": status, "events": [], "artifacts": []}
+            if message["kind"] == "event":
+                if message["position"] <= events_cursor:
+                    continue  # already sent in the catch-up
+                events_cursor = message["position"]
+                updates["events"].append(message["event"])
+            elif message["kind"] == "artifact":
+                if message["position"] < artifacts_cursor:
+                    continue
+                artifacts_cursor = message["position"]
+                updates["artifacts"].append(message["artifact"])
+            else:
+                updates["status"] = message["status"]
+            # Live, only the final event ends the stream: a completed run's status is
+            # published just before its RUN_COMPLETED event
+            done = _has_final_event(updates)
+            status = updates["status"]
+            updates["cursor"] = encode_updates_cursor(events_cursor, artifacts_cursor)
+            yield _sse("update", updates, updates["cursor"])
+        yield _sse("end", {"run_id": run_id, "status": status})
+    finally:
+        subscription.close()
+
+def _etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    # If-None-Match compares tags weakly and may list several, or "*"
+    if not if_none_match or not etag:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def _merge_answers(interview: Interview, answers: Dict[str, str]) -> Interview:
+    # Unchanged answers keep the stages that depend on them reusable
+    merged = {**interview.answers, **answers}
+    interview.answers = {question_id: answer for question_id, answer in merged.items() if answer}
+    return interview
+
+def _load_run_with_report(run_id: str) -> Optional[Dict[str, Any]]:
+    run_data = get_run(run_id)
+    if not run_data:
+        return None
+    
+    # Expose in-progress output when agents stream (CLARITY_STREAM_AGENT_OUTPUT)
+    partial_outputs = _partial_outputs(run_data.get("events", []))
+    if partial_outputs:
+        run_data["partial_outputs"] = partial_outputs
+    
+    # If report exists, load it
+    if run_data.get("has_report"):
+        try:
+            report = get_report(run_id)
+        except ValueError:
+            report = None
+        run_data["report"] = report.model_dump(mode="json") if report is not None else None
+    
+    return run_data
+
+def _load_report(run_id: str) -> ClarityReport:
+    try:
+        report = get_report(run_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading report: {str(e)}")
+    
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report file missing")
+    return report
+
 class IdeaInput(BaseModel):
     idea: str = Field(..., examples=["A platform for connecting remote workers with co-working spaces."], description="The startup idea to analyze.")
+    reuse_duplicate: bool = Field(False, description="If a near-duplicate idea already has a report, return that run instead of starting a new one.")
+    seed_duplicate: bool = Field(False, description="If a near-duplicate idea already has a report, fork that run with this idea, so only the stages this idea changes are recomputed.")
+
+class SimilarRun(BaseModel):
+    run_id: str = Field(..., description="The near-duplicate run.")
+    idea_text: Optional[str] = Field(None, description="The idea the run analyzed.")
+    status: Optional[str] = Field(None, description="Status of the run.")
+    created_at: Optional[str] = Field(None, description="When the run was created.")
+    has_report: bool = Field(False, description="Whether the run has a finished report.")
+    similarity: float = Field(..., description="Estimated similarity to the submitted idea (0-1).")
 
 class RunResponse(BaseModel):
     run_id: str = Field(..., examples=["123e4567-e89b-12d3-a456-426614174000"], description="The unique identifier for the analysis run.")
+    reused: Optional[bool] = Field(None, description="True when an existing run was returned instead of starting a new one.")
+    duplicates: Optional[List[SimilarRun]] = Field(None, description="Earlier runs of near-duplicate ideas, most similar first.")
+    forked_from: Optional[str] = Field(None, description="The run this run was forked from, when it was.")
 
 class FeedbackInput(BaseModel):
-    answers: Dict[str, str] = Field(..., description="Map of question IDs to answers.")
+    answers: Dict[str, str] = Field(..., description="Map of question IDs to answers. Only the given answers change; an empty answer removes it.")
+
+class ForkInput(BaseModel):
+    idea: Optional[str] = Field(None, description="Edited idea for the fork; defaults to the original run's idea.")
+    answers: Dict[str, str] = Field(default_factory=dict, description="Interview answers to change in the fork, as in /feedback.")
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -47,95 +252,170 @@ async def root():
         "redoc": "http://127.0.0.1:8000/redoc"
     }
 
-@app.post("/analysis/run", response_model=RunResponse, tags=["Analysis"], summary="Start a new analysis")
-async def start_analysis(input_data: IdeaInput, background_tasks: BackgroundTasks):
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Operational metrics in the Prometheus text format, merged across workers when
+    CLARITY_METRICS_DIR is set.
+    """
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type=CONTENT_TYPE)
+
+@app.post("/analysis/run", response_model=RunResponse, response_model_exclude_none=True, tags=["Analysis"], summary="Start a new analysis")
+async def start_analysis(input_data: IdeaInput):
     """
     Starts the analysis pipeline for a given idea.
     
     - **idea**: A short description of the startup idea.
+    - **reuse_duplicate**: Return an existing report for a near-duplicate idea instead.
+    - **seed_duplicate**: Start from an existing report for a near-duplicate idea (see /fork).
+
+    Earlier runs of near-duplicate ideas are listed in `duplicates`, so the client can
+    offer to open one of them instead.
     """
-    run_id = create_run(input_data.idea)
+    duplicates = await asyncio.to_thread(find_similar_runs, input_data.idea)
+    reported = [duplicate for duplicate in duplicates if duplicate["has_report"]]
+    if reported and input_data.reuse_duplicate:
+        return {"run_id": reported[0]["run_id"], "reused": True, "duplicates": duplicates}
+    if reported and input_data.seed_duplicate:
+        run_id = await asyncio.to_thread(fork_run, reported[0]["run_id"], input_data.idea)
+        _start_analysis(run_id, input_data.idea)
+        return {"run_id": run_id, "forked_from": reported[0]["run_id"], "duplicates": duplicates}
+
+    run_id = await asyncio.to_thread(create_run, input_data.idea)
     
     # Run analysis in background
-    background_tasks.add_task(run_analysis, run_id, input_data.idea)
+    _start_analysis(run_id, input_data.idea)
     
-    return {"run_id": run_id}
+    return {"run_id": run_id, "duplicates": duplicates or None}
+
+@app.get("/analysis/similar", response_model=List[SimilarRun], tags=["Analysis"], summary="Find near-duplicate analyses")
+async def similar_analyses(idea: str, limit: int = 5):
+    """
+    Lists earlier runs whose idea is a near-duplicate of `idea`, most similar first.
+    """
+    return await asyncio.to_thread(find_similar_runs, idea, limit)
 
 @app.get("/analysis/{run_id}", tags=["Analysis"], summary="Get analysis status")
-async def get_analysis_status(run_id: str):
+async def get_analysis_status(run_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
     """
     Retrieves the status, artifacts, and report for a specific run.
+
+    Once a run has not changed for a moment its response carries an ETag, and a request
+    with a matching If-None-Match is answered with 304 Not Modified.
     """
-    run_data = get_run(run_id)
+    etag = await asyncio.to_thread(get_run_etag, run_id)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    run_data = await asyncio.to_thread(_load_run_with_report, run_id)
     if not run_data:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    # If report exists, load it
-    if run_data.get("has_report"):
-        run_dir = _get_run_dir(run_id)
-        report_path = run_dir / "report.json"
-        if report_path.exists():
-            with open(report_path, "r") as f:
-                try:
-                    run_data["report"] = json.load(f)
-                except json.JSONDecodeError:
-                    run_data["report"] = None
-    
+    if etag:
+        response.headers["ETag"] = etag
     return run_data
 
+@app.get("/analysis/{run_id}/updates", tags=["Analysis"], summary="Get what changed in an analysis")
+async def get_analysis_updates(run_id: str, since: Optional[str] = Query(None, description="The cursor of the run or of the previous updates.")):
+    """
+    Returns the run's status with the events and artifacts added since the cursor, and the
+    cursor to poll with next. Polling this instead of the whole run keeps each poll cheap
+    however long the run gets; fetch the run again once its status changes.
+    """
+    try:
+        updates = await asyncio.to_thread(get_run_updates, run_id, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not updates:
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    return updates
+
 @app.get("/analysis", tags=["Analysis"], summary="List recent analyses")
-async def list_analyses():
+async def list_analyses(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of runs to return."),
+    cursor: Optional[str] = Query(None, description="The X-Next-Cursor header of the previous page."),
+    status: Optional[List[str]] = Query(None, description="Only list runs with one of these statuses."),
+):
+    """
+    Lists run summaries, newest first, a page at a time. When more runs follow, the
+    X-Next-Cursor response header holds the cursor of the next page.
     """
-    Lists recent runs.
+    try:
+        runs, next_cursor = await asyncio.to_thread(list_run_page, limit, cursor, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return runs
+
+@app.get("/analysis/{run_id}/stream", tags=["Analysis"], summary="Stream analysis progress")
+async def stream_analysis(run_id: str, since: Optional[str] = Query(None, description="The cursor of the run or of the previous updates."), last_event_id: Optional[str] = Header(None)):
     """
-    return list_runs()
+    Streams the run's progress as server-sent events, starting with everything since the
+    cursor (or the browser's Last-Event-ID on reconnect) and then each event, artifact and
+    status change as it happens. The stream ends when the run completes or fails.
+    """
+    subscription = subscribe_run(run_id)
+    try:
+        updates = await asyncio.to_thread(get_run_updates, run_id, last_event_id or since)
+    except ValueError as e:
+        subscription.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    if not updates:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    return StreamingResponse(
+        _stream_run(run_id, subscription, updates),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/analysis/{run_id}/export.md", response_class=PlainTextResponse, tags=["Export"], summary="Export analysis as Markdown")
-async def export_analysis_markdown(run_id: str):
+async def export_analysis_markdown(run_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
     """
-    Exports the final report as Markdown.
+    Exports the final report as Markdown, with an ETag for conditional requests.
     """
-    run_data = get_run(run_id)
+    etag = await asyncio.to_thread(get_run_etag, run_id)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    run_data = await asyncio.to_thread(get_run, run_id)
     if not run_data:
         raise HTTPException(status_code=404, detail="Run not found")
     
     if not run_data.get("has_report"):
         raise HTTPException(status_code=400, detail="Report not yet generated")
     
-    run_dir = _get_run_dir(run_id)
-    report_path = run_dir / "report.json"
-    
-    if not report_path.exists():
-        raise HTTPException(status_code=404, detail="Report file missing")
-        
-    try:
-        with open(report_path, "r") as f:
-            report_dict = json.load(f)
-            report = ClarityReport(**report_dict)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error loading report: {str(e)}")
-    
+    report = await asyncio.to_thread(_load_report, run_id)
+    if etag:
+        response.headers["ETag"] = etag
     return render_report_md(report)
 
 @app.post("/analysis/{run_id}/feedback", tags=["Analysis"], summary="Submit answers to interview questions")
-async def submit_feedback(run_id: str, input_data: FeedbackInput, background_tasks: BackgroundTasks):
+async def submit_feedback(run_id: str, input_data: FeedbackInput):
     """
     Submits answers to the interview questions and resumes the analysis.
+
+    Answers can be edited after the run completes: only the given answers change, and
+    the rerun recomputes just the stages whose inputs changed as a result, reusing the
+    saved artifacts of the rest.
     """
-    run_data = get_run(run_id)
+    run_data = await asyncio.to_thread(get_run, run_id)
     if not run_data:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    interview = get_interview(run_id)
+    interview = await asyncio.to_thread(get_interview, run_id)
     if not interview:
         raise HTTPException(status_code=400, detail="No interview found for this run")
     
     # Update answers
-    interview.answers = input_data.answers
-    save_interview(run_id, interview)
+    await asyncio.to_thread(save_interview, run_id, _merge_answers(interview, input_data.answers))
     
     # Update status and resume
-    update_run_status(run_id, "RUNNING")
+    await asyncio.to_thread(update_run_status, run_id, "RUNNING")
     
     # Retrieve original idea
     idea_text = run_data.get("idea_text")
@@ -143,10 +423,64 @@ async def submit_feedback(run_id: str, input_data: FeedbackInput, background_tas
          raise HTTPException(status_code=500, detail="Could not retrieve original idea")
 
     # Resume analysis in background
-    background_tasks.add_task(run_analysis, run_id, idea_text)
+    _start_analysis(run_id, idea_text)
     
     return {"status": "resumed"}
 
+@app.post("/analysis/{run_id}/retry", tags=["Analysis"], summary="Retry a failed or interrupted analysis")
+async def retry_analysis(run_id: str):
+    """
+    Re-runs the pipeline for a run that failed or was interrupted by a restart.
+    Stages whose saved artifacts match their current inputs are reused, so only the
+    stages that never finished call their agents again.
+    """
+    run_data = await asyncio.to_thread(get_run, run_id)
+    if not run_data:
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    if run_data.get("status") in ("COMPLETED", "WAITING_FOR_INPUT"):
+        raise HTTPException(status_code=400, detail=f"Run is {run_data.get('status')} and cannot be retried")
+    
+    if run_id in _analysis_tasks:
+        raise HTTPException(status_code=409, detail="Run is already in progress")
+    
+    idea_text = run_data.get("idea_text")
+    if not idea_text:
+         raise HTTPException(status_code=500, detail="Could not retrieve original idea")
+    
+    await asyncio.to_thread(update_run_status, run_id, "RUNNING")
+    _start_analysis(run_id, idea_text)
+    
+    return {"status": "retrying"}
+
+@app.post("/analysis/{run_id}/fork", response_model=RunResponse, response_model_exclude_none=True, tags=["Analysis"], summary="Fork an analysis with an edited idea or answers")
+async def fork_analysis(run_id: str, input_data: ForkInput):
+    """
+    Starts a new run from an existing one, with an edited idea and/or edited interview
+    answers. The original run is left untouched; the fork reuses its artifacts for every
+    stage whose inputs the edits leave unchanged.
+    """
+    run_data = await asyncio.to_thread(get_run, run_id)
+    if not run_data:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    fork_id = await asyncio.to_thread(fork_run, run_id, input_data.idea)
+    idea_text = input_data.idea or run_data.get("idea_text")
+
+    interview = await asyncio.to_thread(get_interview, fork_id)
+    if interview is not None:
+        interview = _merge_answers(interview, input_data.answers)
+        await asyncio.to_thread(save_interview, fork_id, interview)
+        if not interview.answers:
+            # Nothing to analyse until the questions are answered, as in the original run
+            await asyncio.to_thread(update_run_status, fork_id, "WAITING_FOR_INPUT")
+            return {"run_id": fork_id, "forked_from": run_id}
+
+    await asyncio.to_thread(update_run_status, fork_id, "RUNNING")
+    _start_analysis(fork_id, idea_text)
+
+    return {"run_id": fork_id, "forked_from": run_id}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -20,7 +20,7 @@ class Interview(BaseModel):
 class Meta(BaseModel):
     run_id: str = Field(..., description="Unique identifier for the analysis run")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Timestamp of report creation")
-    model: str = Field(..., description="Model used for the analysis")
+    model: str = Field(..., description="Models that ran the analysis stages, comma-separated")
     version: str = Field("0.1", description="Schema version")
 
 class Idea(BaseModel):
@@ -61,6 +61,7 @@ class Scores(BaseModel):
 class Recommendation(BaseModel):
     verdict: Verdict = Field(...)
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confidence score between 0 and 1")
+    certainty: Optional[float] = Field(None, ge=0.0, le=1.0, description="How sure the judge is of its own assessment, between 0 and 1")
     scores: Optional[Scores] = Field(None, description="Weighted scores for the 4 pillars")
     rationale: str = Field(..., description="Explanation for the recommendation")
 
@@ -99,3 +100,10 @@ class AgentArtifact(BaseModel):
     input_summary: str = Field(..., description="Summary of the input provided to the agent")
     output_markdown: str = Field(..., description="Raw markdown output from the agent")
     output_json: Optional[Dict[str, Any]] = Field(None, description="Structured JSON output from the agent")
+    input_fingerprint: Optional[str] = Field(None, description="Hash of the inputs the agent consumed, used to reuse the artifact on resume")
+    input_hashes: Optional[Dict[str, str]] = Field(None, description="Hash of each stage input (idea, market, ...), used to report which ones changed when the stage is recomputed")
+    model: Optional[str] = Field(None, description="Model that produced the output")
+    tier: Optional[int] = Field(None, description="Routing tier of the model (0 = cheapest), when the stage was routed")
+    input_tokens: Optional[int] = Field(None, description="Tokens sent to the model, instructions included")
+    output_tokens: Optional[int] = Field(None, description="Tokens in the model's output")
+    cost_usd: Optional[float] = Field(None, description="Estimated cost of the agent's model calls")
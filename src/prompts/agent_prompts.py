@@ -408,12 +408,14 @@ class AgentPrompts:
             3. Technical Feasibility (20%)
             4. Business Viability (30%)
         - The final confidence score (0.0 - 1.0) should be the calculated weighted score divided by 10.
+        - Separately, rate your certainty (0.0 - 1.0) in your own assessment: how well the findings support it, regardless of how good the idea is.
         - Provide a clear rationale for the decision.
 
         OUTPUT FORMAT (JSON):
         {
             "verdict": "PURSUE" | "PIVOT" | "KILL",
             "confidence": 0.85,
+            "certainty": 0.9,
             "scores": {
                 "market_demand": {
                     "score": 8,
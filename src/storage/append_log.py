@@ -0,0 +1,66 @@
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class AppendLog:
+    """
+    A JSON-lines file that any number of processes append to and read incrementally:
+    `read_new` returns only the entries added since the previous call. Not thread-safe;
+    callers serialise access.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    def read_new(self) -> Tuple[bool, List[Dict[str, Any]]]:
+        """
+        Entries appended since the last call. The flag is True when the log was rewritten
+        in the meantime, in which case the entries are the whole log and anything built
+        from earlier reads should be discarded.
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False, []
+        reset = False
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            reset = self._inode is not None
+            self._inode = stat.st_ino
+            self._offset = 0
+        if stat.st_size == self._offset:
+            return reset, []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        # A concurrent writer may be mid-line; leave the partial line for next time
+        end = data.rfind(b"\n") + 1
+        entries = []
+        for line in data[:end].splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        self._offset += end
+        return reset, entries
+
+    def append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        # One write per call, so concurrent appenders never interleave within a line
+        data = "".join(json.dumps(entry) + "\n" for entry in entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(data)
+
+    def rewrite(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """
+        Atomically replaces the log's contents.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
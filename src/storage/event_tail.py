@@ -0,0 +1,71 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+# Runs whose latest events are held in memory; the least recently written is dropped first
+EVENT_TAIL_RUNS = int(os.getenv("CLARITY_EVENT_TAIL_RUNS", "256"))
+# Events held in memory per run
+EVENT_TAIL_SIZE = int(os.getenv("CLARITY_EVENT_TAIL_SIZE", "1000"))
+
+class _Tail:
+    def __init__(self, start: int):
+        # Log position just before the oldest held event
+        self.start = start
+        self.events: Deque[Tuple[int, Dict[str, Any]]] = deque()
+
+    @property
+    def end(self) -> int:
+        return self.events[-1][0] if self.events else self.start
+
+class EventTail:
+    """
+    The latest events written by this process per run, with their log positions, so polls
+    for the new events of an active run are answered from memory instead of the log.
+
+    A tail never has gaps: an event written after one this process did not see (e.g. from
+    another worker) starts the tail over. `since` only answers when the tail reaches back to
+    the requested position and forward to the log's current end.
+    """
+
+    def __init__(self, max_runs: int = EVENT_TAIL_RUNS, max_events: int = EVENT_TAIL_SIZE):
+        self.max_runs = max_runs
+        self.max_events = max_events
+        self._tails: "OrderedDict[Hashable, _Tail]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable, start: int, end: int, event: Dict[str, Any]) -> None:
+        """
+        Adds an event written to the log between positions `start` and `end`.
+        """
+        with self._lock:
+            tail = self._tails.get(key)
+            if tail is None or tail.end != start:
+                tail = self._tails[key] = _Tail(start)
+            self._tails.move_to_end(key)
+            tail.events.append((end, event))
+            if len(tail.events) > self.max_events:
+                tail.start = tail.events.popleft()[0]
+            while len(self._tails) > self.max_runs:
+                self._tails.popitem(last=False)
+
+    def since(self, key: Hashable, position: int, log_end: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        The events after `position`, or None when the tail cannot tell: it does not reach
+        back to `position` or does not end at `log_end`, the log's current end.
+        """
+        with self._lock:
+            tail = self._tails.get(key)
+            if tail is None or tail.end != log_end or not tail.start <= position <= log_end:
+                return None
+            newer = []
+            for event_position, event in reversed(tail.events):
+                if event_position <= position:
+                    break
+                newer.append(event)
+        newer.reverse()
+        return newer
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._tails.pop(key, None)
@@ -0,0 +1,475 @@
+import os
+import copy
+import gzip
+import json
+import uuid
+import atexit
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.contracts.clarity_report import ClarityReport, AgentArtifact, Interview
+from src.storage.read_cache import ReadCache
+from src.storage.run_state import RunStates, atomic_write
+
+# Metadata and open event logs of the runs this process works on, shared by every store;
+# what is held is written out when the process exits
+_run_states = RunStates()
+atexit.register(_run_states.close)
+
+# Unpacked archives of recently read archived runs, validated by the archive file's stamp
+_archives = ReadCache(max_entries=64)
+
+# Size at which an agent's duration log is rotated; reads look at most one rotation back
+DURATION_LOG_BYTES = 64 * 1024
+
+def _artifact_filename(agent_name: str) -> str:
+    # Sanitize agent name for filename
+    return f"{agent_name.lower().replace(' ', '_')}.json"
+
+class FileRunStore:
+    """
+    Stores each run as a directory under `data_dir`: run.json (metadata), events.jsonl,
+    interview.json, report.json, artifacts/*.json and speculative/*.json. The duration of
+    every saved artifact is also appended to a per-agent log, .index/durations/<agent>.log.
+
+    Files are replaced atomically. Metadata changes are written behind (see RunStates), so
+    reads of the run directory by other processes may lag them by up to a flush interval;
+    reads through a store in this process always see them.
+
+    A finished run can be archived: its directory is packed into a single compressed file,
+    .archive/<run_id>.json.gz. Reads of an archived run are served from the unpacked
+    archive; the first write to it restores the directory.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+
+    @property
+    def location(self) -> Path:
+        return self.data_dir
+
+    @property
+    def index_dir(self) -> Path:
+        return self.data_dir / ".index"
+
+    def run_dir(self, run_id: str) -> Path:
+        return self.data_dir / run_id
+
+    def _ensure_data_dir(self) -> None:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+    def _require(self, run_id: str) -> Path:
+        run_dir = self.run_dir(run_id)
+        if not run_dir.exists() and not self._restore(run_id):
+            raise ValueError(f"Run {run_id} not found")
+        return run_dir
+
+    # --- Run metadata ---
+
+    def create_run(self, idea_text: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        self._ensure_data_dir()
+        run_id = str(uuid.uuid4())
+        run_dir = self.run_dir(run_id)
+        run_dir.mkdir(parents=True, exist_ok=True)
+        (run_dir / "artifacts").mkdir(exist_ok=True)
+
+        run_data = {
+            "run_id": run_id,
+            "idea_text": idea_text,
+            "created_at": datetime.utcnow().isoformat(),
+            "status": "STARTED",
+            **(extra or {}),
+        }
+
+        # Create empty events file
+        (run_dir / "events.jsonl").touch()
+        _run_states.create(run_dir, run_data)
+        return run_id
+
+    def get_meta(self, run_id: str) -> Optional[Dict[str, Any]]:
+        run_data = _run_states.read_meta(self.run_dir(run_id))
+        if run_data is None:
+            archive = self._archived(run_id)
+            if archive is not None:
+                return copy.deepcopy(archive["run"])
+        return run_data
+
+    def update_meta(self, run_id: str, update: Callable[[Dict[str, Any]], Any]) -> Optional[Dict[str, Any]]:
+        run_dir = self.run_dir(run_id)
+        if not run_dir.exists():
+            self._restore(run_id)
+        return _run_states.update_meta(run_dir, update)
+
+    def flush(self, run_id: Optional[str] = None) -> None:
+        """
+        Writes out the metadata changes held for a run, or for every run.
+        """
+        _run_states.flush(self.run_dir(run_id) if run_id is not None else None)
+
+    def run_version(self, run_id: str) -> Optional[Tuple[str, int]]:
+        # The mtimes and sizes of every file get_run and get_report read, plus the newest
+        # mtime: a write within the same timestamp tick may leave the version unchanged
+        run_dir = self.run_dir(run_id)
+        self.flush(run_id)
+        stamps = []
+        for name in ("run.json", "events.jsonl", "interview.json", "report.json"):
+            try:
+                stat = os.stat(run_dir / name)
+            except FileNotFoundError:
+                if name == "run.json":
+                    return self._archive_version(run_id)
+                stamps.append((name, 0, -1))
+                continue
+            stamps.append((name, stat.st_mtime_ns, stat.st_size))
+        try:
+            with os.scandir(run_dir / "artifacts") as entries:
+                for entry in sorted(entries, key=lambda entry: entry.name):
+                    if not entry.name.endswith(".json"):
+                        continue
+                    stat = entry.stat()
+                    stamps.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            pass
+        return repr(stamps), max(mtime for _, mtime, _ in stamps)
+
+    def iter_runs(self) -> Iterator[Dict[str, Any]]:
+        self._ensure_data_dir()
+        self.flush()
+        for run_dir in self.data_dir.iterdir():
+            if run_dir.name.startswith("."):
+                continue  # indexes, archives and directories being removed or restored
+            try:
+                with open(run_dir / "run.json", "r") as f:
+                    run_data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            run_data.setdefault("run_id", run_dir.name)
+            yield run_data
+        for run_id in self.archived_run_ids():
+            try:
+                run_data = self.get_meta(run_id)
+            except (OSError, ValueError):
+                continue
+            if run_data is not None:
+                run_data.setdefault("run_id", run_id)
+                yield run_data
+
+    # --- Events ---
+
+    # Event positions are byte offsets into events.jsonl: each event's position is the offset
+    # just past its line, so the events after a position are the lines from that offset on
+
+    def append_event(self, run_id: str, event: Dict[str, Any]) -> Tuple[int, int]:
+        run_dir = self._require(run_id)
+        return _run_states.append_event(run_dir, (json.dumps(event) + "\n").encode())
+
+    def event_cursor(self, run_id: str) -> int:
+        try:
+            return (self.run_dir(run_id) / "events.jsonl").stat().st_size
+        except FileNotFoundError:
+            archive = self._archived(run_id)
+            return len(archive["events"].encode()) if archive is not None else 0
+
+    def read_events(self, run_id: str, since: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        try:
+            f = open(self.run_dir(run_id) / "events.jsonl", "rb")
+        except FileNotFoundError:
+            archive = self._archived(run_id)
+            if archive is None:
+                return [], 0
+            data = archive["events"].encode()
+            if since > len(data):
+                since = 0
+            data = data[since:]
+        else:
+            with f:
+                if since > os.fstat(f.fileno()).st_size:
+                    since = 0  # log was rewritten; start over
+                f.seek(since)
+                data = f.read()
+        # A concurrent writer may be mid-line; leave the partial line for the next read
+        end = data.rfind(b"\n") + 1
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+        return events, since + end
+
+    # --- Interview ---
+
+    def save_interview(self, run_id: str, interview: Interview) -> None:
+        run_dir = self._require(run_id)
+        atomic_write(run_dir / "interview.json", interview.model_dump_json().encode(), _run_states.sync)
+
+    def get_interview(self, run_id: str) -> Optional[Interview]:
+        interview_path = self.run_dir(run_id) / "interview.json"
+        if interview_path.exists():
+            with open(interview_path, "r") as f:
+                return Interview.model_validate_json(f.read())
+        archive = self._archived(run_id)
+        if archive is not None and archive["interview"] is not None:
+            return Interview.model_validate(archive["interview"])
+        return None
+
+    # --- Artifacts ---
+
+    def _artifacts_dir(self, run_id: str, speculative: bool) -> Path:
+        # Speculative results are kept apart from artifacts/ so they never show up as run progress
+        return self.run_dir(run_id) / ("speculative" if speculative else "artifacts")
+
+    def save_artifact(self, run_id: str, artifact: AgentArtifact, speculative: bool = False) -> int:
+        self._require(run_id)
+        artifacts_dir = self._artifacts_dir(run_id, speculative)
+        artifacts_dir.mkdir(exist_ok=True)
+        artifact_path = artifacts_dir / _artifact_filename(artifact.agent_name)
+        atomic_write(artifact_path, artifact.model_dump_json().encode(), _run_states.sync)
+        if not speculative:
+            self._log_duration(artifact)
+        return os.stat(artifact_path).st_mtime_ns
+
+    def _duration_log(self, agent_name: str) -> Path:
+        return self.index_dir / "durations" / Path(_artifact_filename(agent_name)).with_suffix(".log").name
+
+    def _log_duration(self, artifact: AgentArtifact) -> None:
+        log_path = self._duration_log(artifact.agent_name)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        # Appends of one short line are atomic, so processes can share the log
+        with open(log_path, "a") as f:
+            f.write(f"{(artifact.finished_at - artifact.started_at).total_seconds()}\n")
+            size = f.tell()
+        if size >= DURATION_LOG_BYTES:
+            os.replace(log_path, log_path.with_suffix(".log.1"))
+
+    def get_artifact(self, run_id: str, agent_name: str, speculative: bool = False) -> Optional[AgentArtifact]:
+        artifact_path = self._artifacts_dir(run_id, speculative) / _artifact_filename(agent_name)
+        if not artifact_path.exists():
+            archive = self._archived(run_id) if not speculative else None
+            for _, filename, artifact in archive["artifacts"] if archive is not None else []:
+                if filename == artifact_path.name:
+                    return AgentArtifact.model_validate(artifact)
+            return None
+        try:
+            with open(artifact_path, "r") as f:
+                return AgentArtifact.model_validate_json(f.read())
+        except ValueError:
+            return None
+
+    def stamped_artifacts(self, run_id: str, speculative: bool = False, since: int = 0) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """
+        The run's artifacts saved at or after `since`, oldest first, as (stamp, file name,
+        artifact). Artifacts are stamped with their file's mtime in nanoseconds.
+        """
+        stamped = []
+        artifacts_dir = self._artifacts_dir(run_id, speculative)
+        if not artifacts_dir.exists():
+            # Archives hold no speculative artifacts: only finished runs are archived
+            archive = self._archived(run_id) if not speculative else None
+            artifacts = archive["artifacts"] if archive is not None else []
+            return [(stamp, filename, copy.deepcopy(artifact)) for stamp, filename, artifact in artifacts if stamp >= since]
+        for artifact_file in artifacts_dir.glob("*.json"):
+            try:
+                stamp = artifact_file.stat().st_mtime_ns
+                if stamp < since:
+                    continue
+                with open(artifact_file, "r") as f:
+                    stamped.append((stamp, artifact_file.name, json.load(f)))
+            except (OSError, json.JSONDecodeError):
+                pass
+        stamped.sort(key=lambda item: item[0])
+        return stamped
+
+    def read_artifacts(self, run_id: str, since: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        stamped = self.stamped_artifacts(run_id, since=since)
+        return [artifact for _, _, artifact in stamped], max((stamp for stamp, _, _ in stamped), default=since)
+
+    def clear_speculation(self, run_id: str) -> None:
+        speculative_dir = self._artifacts_dir(run_id, True)
+        if speculative_dir.exists():
+            for speculative_file in speculative_dir.glob("*.json"):
+                speculative_file.unlink()
+            speculative_dir.rmdir()
+
+    def recent_agent_durations(self, agent_name: str, limit: int = 200) -> List[float]:
+        log_path = self._duration_log(agent_name)
+        durations: List[float] = []
+        # Newest first: the current log, then the rotated one if the current is short
+        for path in (log_path, log_path.with_suffix(".log.1")):
+            try:
+                lines = path.read_text().split()
+            except FileNotFoundError:
+                continue
+            for line in reversed(lines):
+                try:
+                    durations.append(float(line))
+                except ValueError:
+                    continue
+                if len(durations) >= limit:
+                    return durations
+        return durations
+
+    # --- Report ---
+
+    def save_report(self, run_id: str, report: ClarityReport) -> None:
+        run_dir = self._require(run_id)
+        atomic_write(run_dir / "report.json", report.model_dump_json().encode(), _run_states.sync)
+
+    def has_report(self, run_id: str) -> bool:
+        if (self.run_dir(run_id) / "report.json").exists():
+            return True
+        archive = self._archived(run_id)
+        return archive is not None and archive["report"] is not None
+
+    def get_report(self, run_id: str) -> Optional[ClarityReport]:
+        report_path = self.run_dir(run_id) / "report.json"
+        if not report_path.exists():
+            archive = self._archived(run_id)
+            if archive is not None and archive["report"] is not None:
+                return ClarityReport.model_validate(archive["report"])
+            return None
+        with open(report_path, "r") as f:
+            return ClarityReport.model_validate_json(f.read())
+
+    def iter_reports(self) -> Iterator[Tuple[str, ClarityReport]]:
+        for run_data in self.iter_runs():
+            try:
+                report = self.get_report(run_data["run_id"])
+            except (OSError, ValueError):
+                continue
+            if report is not None:
+                yield run_data["run_id"], report
+
+    # --- Retention ---
+
+    def _archive_path(self, run_id: str) -> Path:
+        return self.data_dir / ".archive" / f"{run_id}.json.gz"
+
+    def archived_run_ids(self) -> Iterator[str]:
+        archive_dir = self.data_dir / ".archive"
+        if archive_dir.exists():
+            for path in archive_dir.glob("*.json.gz"):
+                yield path.name[:-len(".json.gz")]
+
+    def _archive_version(self, run_id: str) -> Optional[Tuple[str, int]]:
+        try:
+            stat = os.stat(self._archive_path(run_id))
+        except FileNotFoundError:
+            return None
+        return f"archive:{stat.st_mtime_ns}:{stat.st_size}", stat.st_mtime_ns
+
+    def _archived(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The unpacked archive of the run, or None if the run is not archived.
+        """
+        if self.run_dir(run_id).exists():
+            return None
+        version = self._archive_version(run_id)
+        if version is None:
+            return None
+        path = self._archive_path(run_id)
+        archive = _archives.get(path, version[0])
+        if archive is None:
+            try:
+                with gzip.open(path, "rb") as f:
+                    archive = json.loads(f.read())
+            except FileNotFoundError:
+                return None  # restored since
+            _archives.put(path, version[0], archive)
+        return archive
+
+    def _remove_dir(self, run_id: str) -> bool:
+        # Moved aside first, so readers find either the whole directory or none of it
+        run_dir = self.run_dir(run_id)
+        removed = self.data_dir / f".{run_id}.{os.getpid()}.removed"
+        try:
+            os.rename(run_dir, removed)
+        except FileNotFoundError:
+            return False
+        _run_states.discard(run_dir)
+        shutil.rmtree(removed, ignore_errors=True)
+        return True
+
+    def archive_run(self, run_id: str, statuses: Optional[Sequence[str]] = None) -> bool:
+        """
+        Packs the run's directory into its archive, if its status is one of `statuses`.
+        Returns False if it was not packed: the run has no directory (it is archived already
+        or does not exist), has another status, or this process holds changes to it not yet
+        written.
+        """
+        run_dir = self.run_dir(run_id)
+        if not run_dir.exists():
+            return False
+        self.flush(run_id)
+        run_data = self.get_meta(run_id)
+        if run_data is None or (statuses is not None and run_data.get("status") not in statuses):
+            return False
+        if not _run_states.release(run_dir):
+            return False
+        try:
+            with open(run_dir / "events.jsonl", "r") as f:
+                events = f.read()
+        except FileNotFoundError:
+            events = ""
+        interview = self.get_interview(run_id)
+        report = self.get_report(run_id)
+        archive = {
+            "run": run_data,
+            # The log as written, so event positions stay valid
+            "events": events,
+            "interview": interview.model_dump(mode="json") if interview is not None else None,
+            "report": report.model_dump(mode="json") if report is not None else None,
+            "artifacts": self.stamped_artifacts(run_id),
+        }
+        path = self._archive_path(run_id)
+        path.parent.mkdir(exist_ok=True)
+        atomic_write(path, gzip.compress(json.dumps(archive).encode()), _run_states.sync)
+        return self._remove_dir(run_id)
+
+    def _restore(self, run_id: str) -> bool:
+        """
+        Unpacks the run's archive back into its directory, before a write to the run.
+        Returns whether the run now has a directory.
+        """
+        archive = self._archived(run_id)
+        if archive is None:
+            return self.run_dir(run_id).exists()
+        # Unpacked aside and renamed into place, so readers never see a partial directory
+        restoring = self.data_dir / f".{run_id}.{os.getpid()}.restoring"
+        shutil.rmtree(restoring, ignore_errors=True)
+        (restoring / "artifacts").mkdir(parents=True)
+        with open(restoring / "events.jsonl", "w") as f:
+            f.write(archive["events"])
+        for name in ("interview", "report"):
+            if archive[name] is not None:
+                with open(restoring / f"{name}.json", "w") as f:
+                    json.dump(archive[name], f)
+        for stamp, filename, artifact in archive["artifacts"]:
+            artifact_path = restoring / "artifacts" / filename
+            with open(artifact_path, "w") as f:
+                json.dump(artifact, f)
+            # Artifacts keep their stamps, so update cursors taken before stay valid
+            os.utime(artifact_path, ns=(stamp, stamp))
+        with open(restoring / "run.json", "w") as f:
+            json.dump(archive["run"], f)
+        try:
+            os.rename(restoring, self.run_dir(run_id))
+        except OSError:
+            # Restored concurrently
+            shutil.rmtree(restoring, ignore_errors=True)
+            return self.run_dir(run_id).exists()
+        self._archive_path(run_id).unlink(missing_ok=True)
+        return True
+
+    def delete_run(self, run_id: str) -> bool:
+        """
+        Deletes the run's directory and archive. Returns whether there was anything to delete.
+        """
+        removed = self._remove_dir(run_id)
+        try:
+            self._archive_path(run_id).unlink()
+        except FileNotFoundError:
+            return removed
+        return True
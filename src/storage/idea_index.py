@@ -0,0 +1,76 @@
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from src.storage.append_log import AppendLog
+from utils.retrieval.minhash import MinHasher, MinHashLSH
+
+# Estimated Jaccard similarity (of character shingles) from which an idea is a near-duplicate
+DUPLICATE_THRESHOLD = float(os.getenv("CLARITY_DUPLICATE_THRESHOLD", "0.5"))
+# 32 bands of 4 rows put the LSH candidate threshold at about 0.42, below DUPLICATE_THRESHOLD
+NUM_PERM = 128
+BANDS = 32
+
+class IdeaIndex:
+    """
+    MinHash LSH index over idea texts, persisted as an append-only log of signatures so it
+    loads without re-hashing any idea. Entries appended to the log by other processes are
+    picked up before each lookup.
+    """
+
+    def __init__(self, path: Path, num_perm: int = NUM_PERM, bands: int = BANDS):
+        self.log = AppendLog(path)
+        self.hasher = MinHasher(num_perm)
+        self.lsh = MinHashLSH(num_perm, bands)
+        self._lock = threading.Lock()
+        # Signatures are logged as hex-packed little-endian uint64s, which parse about twice
+        # as fast as JSON integer lists
+        self._packer = struct.Struct(f"<{num_perm}Q")
+
+    @property
+    def path(self) -> Path:
+        return self.log.path
+
+    def _entry(self, run_id: str, idea_text: str) -> Dict[str, str]:
+        return {"run_id": run_id, "signature": self._packer.pack(*self.hasher.signature(idea_text)).hex()}
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self.lsh)
+
+    def _refresh(self) -> None:
+        reset, entries = self.log.read_new()
+        if reset:
+            self.lsh = MinHashLSH(self.lsh.num_perm, self.lsh.bands)
+        for entry in entries:
+            try:
+                self.lsh.add(entry["run_id"], self._packer.unpack(bytes.fromhex(entry["signature"])))
+            except (ValueError, KeyError, TypeError, struct.error):
+                continue
+
+    def add(self, run_id: str, idea_text: str) -> None:
+        entry = self._entry(run_id, idea_text)
+        with self._lock:
+            self.log.append([entry])
+            self._refresh()
+
+    def rebuild(self, ideas: Iterable[Tuple[str, str]]) -> None:
+        """
+        Replaces the index with the given (run_id, idea_text) pairs.
+        """
+        entries = [self._entry(run_id, idea_text) for run_id, idea_text in ideas]
+        with self._lock:
+            self.log.rewrite(entries)
+            self._refresh()
+
+    def similar(self, idea_text: str, threshold: float = DUPLICATE_THRESHOLD, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Indexed runs whose idea is a near-duplicate of `idea_text`, most similar first.
+        """
+        signature = self.hasher.signature(idea_text)
+        with self._lock:
+            self._refresh()
+            return self.lsh.query(signature, threshold, limit)
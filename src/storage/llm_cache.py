@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Type
+
+from pydantic import BaseModel
+
+CACHE_PATH = Path(os.getenv("CLARITY_LLM_CACHE_PATH", "data/cache/llm_responses.sqlite"))
+CACHE_ENABLED = os.getenv("CLARITY_LLM_CACHE", "1") not in ("0", "false", "False")
+CACHE_TTL_SECONDS = float(os.getenv("CLARITY_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("CLARITY_LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Reads only touch the database to look up entries; their access times and hit/miss counts
+# are written with the next put, or by a read at most this many seconds after the last write
+CACHE_FLUSH_SECONDS = float(os.getenv("CLARITY_LLM_CACHE_FLUSH_SECONDS", "10"))
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_cache_key(
+    model_id: str,
+    instructions: Any,
+    output_schema: Optional[Type[BaseModel]],
+    prompt: str,
+) -> str:
+    """
+    Content-addressed key for a model call. Whitespace in the prompt is normalised so that
+    resubmissions differing only in spacing or line breaks share an entry.
+    """
+    schema = json.dumps(output_schema.model_json_schema(), sort_keys=True) if output_schema else ""
+    parts = {
+        "model": model_id,
+        "instructions": _digest(json.dumps(instructions, sort_keys=True, default=str)),
+        "schema": _digest(schema),
+        "prompt": " ".join(prompt.split()),
+    }
+    return _digest(json.dumps(parts, sort_keys=True))
+
+class ResponseCache:
+    """
+    Persistent response cache backed by SQLite.
+
+    The database runs in WAL mode with a busy timeout, so several uvicorn workers can read
+    and write the same file concurrently. Entries expire after `ttl_seconds`, and once the
+    stored payloads exceed `max_bytes` the least recently used entries are evicted.
+    Hit/miss counters are kept both per process and in the database (shared totals).
+
+    Each thread keeps its own connection. Reads never write: the access times and counts
+    they gather are held in memory and written together by `flush`, which runs with every
+    `put` (before eviction, so it sees them) and at most every `flush_seconds` otherwise.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_PATH,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        max_bytes: int = CACHE_MAX_BYTES,
+        flush_seconds: float = CACHE_FLUSH_SECONDS,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.flush_seconds = flush_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Gathered by reads, not yet written: last access time per key, and hit/miss counts
+        self._accessed: Dict[str, float] = {}
+        self._counts = {"hits": 0, "misses": 0}
+        self._flushed_at = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # This thread's autocommit connection, opened again in a forked process. A transaction
+        # left open by an error is rolled back, so the connection can be reused
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    def _write_reads(self, conn: sqlite3.Connection) -> None:
+        # Called inside a write transaction
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            counts, self._counts = self._counts, {"hits": 0, "misses": 0}
+            self._flushed_at = time.monotonic()
+        conn.executemany(
+            "UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(at, key) for key, at in accessed.items()],
+        )
+        conn.executemany("UPDATE stats SET value = value + ? WHERE name = ?", [(n, name) for name, n in counts.items() if n])
+
+    def flush(self) -> None:
+        """
+        Writes the access times and hit/miss counts gathered by reads since the last write.
+        """
+        with self._lock:
+            if not self._accessed and not any(self._counts.values()):
+                return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_reads(conn)
+            conn.execute("COMMIT")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached JSON value for `key`, or None on a miss or expired entry.
+        Expired entries are deleted by the next `put`.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        hit = row is not None and now - row[1] <= self.ttl_seconds
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self._counts["hits"] += 1
+                self._accessed[key] = now
+            else:
+                self.misses += 1
+                self._counts["misses"] += 1
+            due = time.monotonic() - self._flushed_at >= self.flush_seconds
+        if due:
+            self.flush()
+        return json.loads(row[0]) if hit else None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Stores a JSON-serialisable value, then applies TTL expiry and the size budget.
+        """
+        payload = json.dumps(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_reads(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk entries from least to most recently used until back under budget
+                excess = total - self.max_bytes
+                victims = []
+                for victim_key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                    victims.append((victim_key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            conn.execute("COMMIT")
+
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        with self._connect() as conn:
+            shared = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": shared.get("hits", 0),
+            "total_misses": shared.get("misses", 0),
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accessed, self._counts = {}, {"hits": 0, "misses": 0}
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("UPDATE stats SET value = 0")
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the process-wide response cache, or None when disabled via CLARITY_LLM_CACHE=0.
+    """
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+                atexit.register(_cache.flush)
+    return _cache
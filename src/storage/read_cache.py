@@ -0,0 +1,44 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Parsed runs and reports held in memory; the least recently read is dropped first
+READ_CACHE_SIZE = int(os.getenv("CLARITY_READ_CACHE_SIZE", "512"))
+
+class ReadCache:
+    """
+    LRU cache of values read from storage, each kept with the version of the stored state
+    it was read at. A lookup with any other version misses, so entries never need to be
+    invalidated: a write changes the version.
+    """
+
+    def __init__(self, max_entries: int = READ_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
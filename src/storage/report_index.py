@@ -0,0 +1,113 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.contracts.clarity_report import ClarityReport
+from src.storage.append_log import AppendLog
+from utils.retrieval.bm25 import BM25Index
+
+# Past findings handed to each of the Market and Risk agents; 0 disables retrieval
+RETRIEVAL_TOP_K = int(os.getenv("CLARITY_RETRIEVAL_TOP_K", "3"))
+# Minimum normalised BM25 score (0-1) for a past report to count as related
+RETRIEVAL_MIN_SCORE = float(os.getenv("CLARITY_RETRIEVAL_MIN_SCORE", "0.1"))
+# Reports kept searchable per section; older ones are evicted from memory and, on
+# compaction, from the log
+REPORT_INDEX_MAX_DOCUMENTS = int(os.getenv("CLARITY_REPORT_INDEX_MAX_DOCUMENTS", "5000"))
+
+# Report fields indexed per section, as (report part, field) pairs
+SECTIONS = {
+    "market": (("market", "competitors"), ("market", "demand_signals")),
+    "risks": (("risks", "top_risks"), ("risks", "mitigations")),
+}
+
+def report_documents(run_id: str, report: ClarityReport) -> List[Dict[str, Any]]:
+    """
+    Log entries for a completed report: one per section, holding the text to match on (the
+    idea plus the section's findings) and the findings themselves.
+    """
+    idea = f"{report.idea.title}. {report.idea.one_liner} {report.idea.expanded_summary}"
+    entries = []
+    for section, fields in SECTIONS.items():
+        findings = {field: list(getattr(getattr(report, part), field)) for part, field in fields}
+        text = " ".join([idea, *(item for items in findings.values() for item in items)])
+        entries.append({
+            "run_id": run_id,
+            "section": section,
+            "text": text,
+            "findings": {"title": report.idea.title, **findings},
+        })
+    return entries
+
+class ReportIndex:
+    """
+    Keyword (BM25) index over the findings of completed reports, persisted as an
+    append-only log of documents that is replayed on load and tailed before each search, so
+    reports saved by other processes are found too. At most `max_documents` reports per
+    section are held; the log is compacted once it holds twice that.
+    """
+
+    def __init__(self, path: Path, max_documents: int = REPORT_INDEX_MAX_DOCUMENTS):
+        self.log = AppendLog(path)
+        self.max_documents = max_documents
+        self.sections = self._empty()
+        self._logged = 0
+        self._lock = threading.Lock()
+
+    def _empty(self) -> Dict[str, BM25Index]:
+        return {section: BM25Index(self.max_documents) for section in SECTIONS}
+
+    def _refresh(self) -> None:
+        reset, entries = self.log.read_new()
+        if reset:
+            self.sections = self._empty()
+            self._logged = 0
+        for entry in entries:
+            index = self.sections.get(entry.get("section"))
+            if index is not None and entry.get("run_id"):
+                # The entry is the payload, so compaction can write it back as is
+                index.add(entry["run_id"], entry.get("text", ""), entry)
+        self._logged += len(entries)
+
+    def _compact(self) -> None:
+        self.log.rewrite(entry for index in self.sections.values() for _, entry in index.items())
+        self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return max((len(index) for index in self.sections.values()), default=0)
+
+    def add(self, run_id: str, report: ClarityReport) -> None:
+        with self._lock:
+            self.log.append(report_documents(run_id, report))
+            self._refresh()
+            if self._logged > 2 * self.max_documents * len(SECTIONS):
+                self._compact()
+
+    def rebuild(self, reports: Iterable[Tuple[str, ClarityReport]]) -> None:
+        """
+        Replaces the index with the given (run_id, report) pairs.
+        """
+        entries = [entry for run_id, report in reports for entry in report_documents(run_id, report)]
+        with self._lock:
+            self.log.rewrite(entries)
+            self._refresh()
+
+    def search(self, query: str, section: str, k: int = RETRIEVAL_TOP_K, min_score: float = RETRIEVAL_MIN_SCORE, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Findings of the `k` reports whose idea and `section` findings best match `query`,
+        best first, each with its run_id and score.
+        """
+        if section not in SECTIONS:
+            raise ValueError(f"Unknown report section: {section}")
+        if k <= 0:
+            return []
+        with self._lock:
+            self._refresh()
+            hits = self.sections[section].search(query, k + 1, min_score)
+        return [
+            {"run_id": run_id, "score": round(score, 3), **entry.get("findings", {})}
+            for run_id, score, entry in hits
+            if run_id != exclude
+        ][:k]
@@ -0,0 +1,96 @@
+import os
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+
+from src.storage import runs
+from utils.telemetry.metrics import RUNS_COMPACTED
+
+# Runs that finished (COMPLETED or FAILED) and were created more than this many days ago
+# are packed into a single compressed archive each (file store only)
+ARCHIVE_AFTER_DAYS = float(os.getenv("CLARITY_ARCHIVE_AFTER_DAYS", "7"))
+# Days after creation at which runs are deleted, by outcome; 0 keeps them forever.
+# Unfinished runs are those abandoned while running or waiting for answers
+DELETE_COMPLETED_AFTER_DAYS = float(os.getenv("CLARITY_DELETE_COMPLETED_AFTER_DAYS", "0"))
+DELETE_FAILED_AFTER_DAYS = float(os.getenv("CLARITY_DELETE_FAILED_AFTER_DAYS", "0"))
+DELETE_UNFINISHED_AFTER_DAYS = float(os.getenv("CLARITY_DELETE_UNFINISHED_AFTER_DAYS", "0"))
+# Hours between the compactions the API server runs in the background; 0 (the default)
+# leaves compaction to scripts/compact_runs.py. Workers that find another process
+# compacting skip their turn
+COMPACT_INTERVAL_HOURS = float(os.getenv("CLARITY_COMPACT_INTERVAL_HOURS", "0"))
+
+FINISHED_STATUSES = runs.FINISHED_STATUSES
+
+@contextmanager
+def _compaction_lock() -> Iterator[bool]:
+    # Held by one process at a time for a whole compaction; yields whether it was taken
+    path = runs.DATA_DIR / ".compact.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _cutoff(now: datetime, days: float) -> str:
+    return (now - timedelta(days=days)).isoformat()
+
+def compact_runs(
+    archive_after_days: float = ARCHIVE_AFTER_DAYS,
+    delete_completed_after_days: float = DELETE_COMPLETED_AFTER_DAYS,
+    delete_failed_after_days: float = DELETE_FAILED_AFTER_DAYS,
+    delete_unfinished_after_days: float = DELETE_UNFINISHED_AFTER_DAYS,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> Optional[Dict[str, int]]:
+    """
+    Applies the retention policies to the stored runs: deletes runs past their outcome's
+    time to live, then archives the finished runs past `archive_after_days`. Candidates
+    come from the listing index, so run directories are never scanned. Returns the number
+    of runs archived and deleted (with `dry_run`, only counts the runs that would be
+    deleted), or None if another process is compacting.
+    """
+    with _compaction_lock() as locked:
+        if not locked:
+            return None
+        return _compact(archive_after_days, delete_completed_after_days, delete_failed_after_days, delete_unfinished_after_days, now, dry_run)
+
+def _compact(
+    archive_after_days: float,
+    delete_completed_after_days: float,
+    delete_failed_after_days: float,
+    delete_unfinished_after_days: float,
+    now: Optional[datetime],
+    dry_run: bool,
+) -> Dict[str, int]:
+    now = now or datetime.utcnow()
+    counts = {"archived": 0, "deleted": 0}
+
+    policies = [
+        (delete_completed_after_days, lambda status: status == "COMPLETED"),
+        (delete_failed_after_days, lambda status: status == "FAILED"),
+        (delete_unfinished_after_days, lambda status: status not in FINISHED_STATUSES),
+    ]
+    for days, applies in policies:
+        if days <= 0:
+            continue
+        for summary in runs.list_runs_created_before(_cutoff(now, days)):
+            if not applies(summary["status"]):
+                continue
+            if dry_run or runs.delete_run(summary["run_id"]):
+                counts["deleted"] += 1
+                if not dry_run:
+                    RUNS_COMPACTED.inc(action="deleted")
+
+    if archive_after_days > 0 and not dry_run:
+        for summary in runs.list_runs_created_before(_cutoff(now, archive_after_days), FINISHED_STATUSES):
+            if runs.archive_run(summary["run_id"]):
+                counts["archived"] += 1
+                RUNS_COMPACTED.inc(action="archived")
+    return counts
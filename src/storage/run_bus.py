@@ -0,0 +1,92 @@
+import os
+import asyncio
+import threading
+from typing import Any, Dict, Hashable, Optional, Set
+
+# Messages a subscriber may fall behind by before it is marked overflowed and has to
+# re-read the run from storage
+RUN_BUS_MAX_PENDING = int(os.getenv("CLARITY_RUN_BUS_MAX_PENDING", "1000"))
+
+class Subscription:
+    """
+    A subscriber's queue of a run's messages. Consumed on the event loop it was created on;
+    messages may be published from any thread.
+    """
+
+    def __init__(self, bus: "RunBus", key: Hashable, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.bus = bus
+        self.key = key
+        self.loop = loop
+        self.max_pending = max_pending
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # Set when messages were dropped; the consumer re-reads the run and clears it
+        self.overflowed = False
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        if self.queue.qsize() >= self.max_pending:
+            self.overflowed = True
+            return
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        The next message, or None if none arrives within `timeout` seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def resynced(self) -> None:
+        """
+        Drops pending messages after the consumer has re-read the run from storage.
+        """
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+    def close(self) -> None:
+        self.bus._unsubscribe(self)
+
+class RunBus:
+    """
+    In-process publish/subscribe of run progress: storage publishes each run's events,
+    artifacts and status changes, and every subscriber of the run receives them. Messages
+    only reach subscribers in this process; they re-read storage to catch up on others.
+    """
+
+    def __init__(self, max_pending: int = RUN_BUS_MAX_PENDING):
+        self.max_pending = max_pending
+        self._subscribers: Dict[Hashable, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key: Hashable) -> Subscription:
+        """
+        Subscribes to a run's messages. Must be called from the event loop that consumes
+        the subscription.
+        """
+        subscription = Subscription(self, key, asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+
+    def has_subscribers(self, key: Hashable) -> bool:
+        return key in self._subscribers
+
+    def publish(self, key: Hashable, message: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, message)
+            except RuntimeError:
+                # The subscriber's event loop has closed
+                self._unsubscribe(subscription)
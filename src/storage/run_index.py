@@ -0,0 +1,174 @@
+import json
+import base64
+import bisect
+import heapq
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.storage.append_log import AppendLog
+
+# Characters of the idea kept in a run's summary; the full text is in the run itself
+SUMMARY_IDEA_CHARS = 200
+# Largest page of runs a listing returns
+MAX_PAGE_SIZE = 200
+# Superseded log entries tolerated, beyond one per indexed run, before compacting
+COMPACT_SLACK = 1000
+
+def run_summary(run_data: Dict[str, Any], has_report: bool = False) -> Dict[str, Any]:
+    """
+    The lightweight projection of a run's metadata that listings return.
+    """
+    return {
+        "run_id": run_data["run_id"],
+        "idea_text": (run_data.get("idea_text") or "")[:SUMMARY_IDEA_CHARS],
+        "status": run_data.get("status", ""),
+        "created_at": run_data.get("created_at", ""),
+        "has_report": has_report,
+        "forked_from": run_data.get("forked_from"),
+    }
+
+def encode_cursor(summary: Dict[str, Any]) -> str:
+    raw = json.dumps([summary["created_at"], summary["run_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(created_at, str) or not isinstance(run_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return created_at, run_id
+
+def _descending(keys: List[Tuple[str, str]], end: int) -> Iterator[Tuple[str, str]]:
+    # Walks keys[:end] backwards without copying the slice
+    for i in range(end - 1, -1, -1):
+        yield keys[i]
+
+class RunIndex:
+    """
+    Run summaries kept sorted by (created_at, run_id), overall and per status, so a page of
+    the listing costs a binary search plus the page itself rather than a read of every run.
+    Persisted as an append-only log of summary updates that is tailed before each read, so
+    runs created or updated by other processes are listed too.
+    """
+
+    def __init__(self, path: Path):
+        self.log = AppendLog(path)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.order: List[Tuple[str, str]] = []
+        self.by_status: Dict[str, List[Tuple[str, str]]] = {}
+        self._logged = 0
+
+    @staticmethod
+    def _key(summary: Dict[str, Any]) -> Tuple[str, str]:
+        return summary["created_at"], summary["run_id"]
+
+    def _unlink(self, summary: Dict[str, Any]) -> None:
+        key = self._key(summary)
+        for keys in (self.order, self.by_status.get(summary["status"], [])):
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        run_id = entry.get("run_id")
+        if not run_id:
+            return
+        previous = self.runs.get(run_id)
+        if entry.get("deleted"):
+            if previous is not None:
+                self._unlink(previous)
+                del self.runs[run_id]
+            return
+
+        # Entries after the first only carry the fields that changed
+        summary = {**previous, **entry} if previous is not None else {"status": "", **entry}
+        if not summary.get("created_at"):
+            return  # update of a run the index never saw created
+        if previous is not None:
+            if self._key(previous) == self._key(summary) and previous["status"] == summary["status"]:
+                self.runs[run_id] = summary
+                return
+            self._unlink(previous)
+        self.runs[run_id] = summary
+        key = self._key(summary)
+        bisect.insort(self.order, key)
+        bisect.insort(self.by_status.setdefault(summary["status"], []), key)
+
+    def _refresh(self) -> None:
+        reset, entries = self.log.read_new()
+        if reset:
+            self._reset()
+        for entry in entries:
+            self._apply(entry)
+        self._logged += len(entries)
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.log.append([entry])
+            self._refresh()
+            if self._logged > len(self.runs) + COMPACT_SLACK:
+                self.log.rewrite(self.runs[run_id] for _, run_id in self.order)
+                self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self.runs)
+
+    def add(self, summary: Dict[str, Any]) -> None:
+        self._write(summary)
+
+    def update(self, run_id: str, **fields: Any) -> None:
+        """
+        Changes fields of an indexed run's summary, e.g. its status.
+        """
+        self._write({"run_id": run_id, **fields})
+
+    def remove(self, run_id: str) -> None:
+        self._write({"run_id": run_id, "deleted": True})
+
+    def created_before(self, created_at: str, statuses: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        The summaries of runs created before `created_at`, optionally only those with one of
+        `statuses`, oldest first.
+        """
+        with self._lock:
+            self._refresh()
+            lists = [self.by_status.get(status, []) for status in set(statuses)] if statuses else [self.order]
+            keys = heapq.merge(*(keys[:bisect.bisect_left(keys, (created_at,))] for keys in lists))
+            return [dict(self.runs[run_id]) for _, run_id in keys]
+
+    def rebuild(self, summaries: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replaces the index with the given run summaries.
+        """
+        entries = list(summaries)
+        with self._lock:
+            self.log.rewrite(entries)
+            self._refresh()
+
+    def page(self, limit: int, cursor: Optional[str] = None, statuses: Optional[Sequence[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Up to `limit` run summaries, newest first, optionally only those with one of
+        `statuses`, starting after the run that `cursor` points at. Returns the page and the
+        cursor of the next one, or None on the last page.
+        """
+        if limit <= 0:
+            raise ValueError(f"Page size must be positive, got {limit}")
+        bound = decode_cursor(cursor) if cursor is not None else None
+        with self._lock:
+            self._refresh()
+            lists = [self.by_status.get(status, []) for status in set(statuses)] if statuses else [self.order]
+            walks = [_descending(keys, bisect.bisect_left(keys, bound) if bound is not None else len(keys)) for keys in lists]
+            keys = list(islice(heapq.merge(*walks, reverse=True), limit + 1))
+            page = [dict(self.runs[run_id]) for _, run_id in keys[:limit]]
+        next_cursor = encode_cursor(page[-1]) if len(keys) > limit else None
+        return page, next_cursor
@@ -0,0 +1,342 @@
+import os
+import copy
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# When run state reaches the disk: "always" writes and fsyncs every change before it
+# returns; "interval" holds each run's metadata changes for RUN_FLUSH_SECONDS, writes them
+# as one, and fsyncs what it writes; "none" holds changes likewise and never fsyncs
+RUN_DURABILITY = os.getenv("CLARITY_RUN_DURABILITY", "interval")
+DURABILITY_POLICIES = ("always", "interval", "none")
+# How long metadata changes are held, so a burst of them is written once
+RUN_FLUSH_SECONDS = float(os.getenv("CLARITY_RUN_FLUSH_SECONDS", "0.5"))
+# Runs whose state is held in memory; the least recently used is written out and dropped first
+RUN_STATE_RUNS = int(os.getenv("CLARITY_RUN_STATE_RUNS", "256"))
+# Longest wait before retrying a flush that failed; waits double from RUN_FLUSH_SECONDS
+RUN_FLUSH_MAX_BACKOFF_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path: Path, data: bytes, sync: bool) -> None:
+    """
+    Replaces the file at `path` with `data`, so readers and crashes see either the old or
+    the new contents and never a partial file. With `sync`, the data and the rename are
+    fsynced before returning.
+    """
+    path = Path(path)
+    # Hidden and without a .json suffix, so listings of the directory never pick it up
+    temp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp, "wb") as f:
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            temp.unlink()
+        except OSError:
+            pass
+        raise
+    if sync:
+        _fsync_dir(path.parent)
+
+def _stamp(path: Path) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+class _RunState:
+    def __init__(self, run_dir: Path):
+        self.run_dir = run_dir
+        self.lock = threading.Lock()
+        # run.json as last read or written by this process, and its stamp at that time
+        self.meta: Optional[Dict[str, Any]] = None
+        self.stamp: Optional[Tuple[int, int, int]] = None
+        # Changes to `meta` not yet written to run.json, kept so they can be applied again
+        # to run.json as another process left it
+        self.dirty = False
+        self.pending: List[Callable[[Dict[str, Any]], Any]] = []
+        # The event log, kept open for appending, and whether appends await an fsync
+        self.events_fd: Optional[int] = None
+        self.events_unsynced = False
+        # Set once dropped from the registry; holders of a dropped state look it up again
+        self.dropped = False
+
+class RunStates:
+    """
+    The state of runs in a file store, held per run: its metadata, with changes written
+    behind to run.json, and its event log, kept open for appending.
+
+    Every change to a run is made under the run's lock, on the metadata in memory, so
+    concurrent updates in this process never lose each other's changes. Unless the
+    durability policy is "always", changes are written out together after `flush_seconds`
+    by a background thread (or by `flush`), so a burst of status and usage updates costs
+    one write. run.json is always replaced atomically, and it is re-read when another
+    process has replaced it; changes held at that point are applied again to what that
+    process wrote, so they do not overwrite it.
+    """
+
+    def __init__(self, durability: str = RUN_DURABILITY, flush_seconds: float = RUN_FLUSH_SECONDS, max_runs: int = RUN_STATE_RUNS):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy: {durability}")
+        self.durability = durability
+        self.flush_seconds = flush_seconds
+        self.max_runs = max_runs
+        self._states: "OrderedDict[Path, _RunState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._unflushed: Set[_RunState] = set()
+        self._wake = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    @property
+    def sync(self) -> bool:
+        """
+        Whether writes are fsynced.
+        """
+        return self.durability != "none"
+
+    @contextmanager
+    def _locked(self, run_dir: Path) -> Iterator[_RunState]:
+        while True:
+            with self._lock:
+                state = self._states.get(run_dir)
+                if state is None:
+                    state = self._states[run_dir] = _RunState(run_dir)
+                self._states.move_to_end(run_dir)
+                dropped = []
+                while len(self._states) > self.max_runs:
+                    dropped.append(self._states.popitem(last=False)[1])
+            for old in dropped:
+                self._drop(old)
+            with state.lock:
+                if not state.dropped:
+                    yield state
+                    return
+
+    def _drop(self, state: _RunState) -> None:
+        with state.lock:
+            state.dropped = True
+            self._flush_state(state)
+            if state.events_fd is not None:
+                os.close(state.events_fd)
+                state.events_fd = None
+
+    def _load(self, state: _RunState) -> Optional[Dict[str, Any]]:
+        # run.json is re-read if it was replaced since it was last read (e.g. by another
+        # worker), and changes not yet written are applied again on top of it
+        run_file = state.run_dir / "run.json"
+        try:
+            stamp = _stamp(run_file)
+        except FileNotFoundError:
+            if state.dirty:
+                return state.meta
+            state.meta = state.stamp = None
+            return None
+        if stamp != state.stamp:
+            try:
+                with open(run_file, "r") as f:
+                    meta = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                return state.meta if state.dirty else None
+            for update in state.pending:
+                update(meta)
+            state.meta, state.stamp = meta, stamp
+        return state.meta
+
+    def _write(self, state: _RunState) -> None:
+        run_file = state.run_dir / "run.json"
+        if state.dirty:
+            self._load(state)
+        try:
+            atomic_write(run_file, json.dumps(state.meta).encode(), self.sync)
+        except FileNotFoundError:
+            if state.run_dir.exists():
+                raise
+            # The run was deleted; there is nothing left to write to
+            state.meta = None
+        else:
+            state.stamp = _stamp(run_file)
+        state.dirty = False
+        state.pending = []
+
+    def _flush_state(self, state: _RunState) -> None:
+        if state.dirty:
+            self._write(state)
+        if state.events_unsynced and state.events_fd is not None:
+            os.fsync(state.events_fd)
+        state.events_unsynced = False
+
+    def _changed(self, state: _RunState) -> None:
+        # Called with the run's lock held, after a change
+        if self.durability == "always":
+            self._flush_state(state)
+            return
+        with self._lock:
+            self._unflushed.add(state)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name="run-state-flusher", daemon=True)
+                self._flusher.start()
+        self._wake.set()
+
+    def _run_flusher(self) -> None:
+        failures = 0
+        while True:
+            self._wake.wait()
+            # Let the rest of a burst of changes arrive before writing them
+            time.sleep(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                failures += 1
+                backoff = min(RUN_FLUSH_MAX_BACKOFF_SECONDS, self.flush_seconds * 2 ** failures)
+                logger.warning("Could not write run state (attempt %d), retrying in %.1fs: %s", failures, backoff, e)
+                time.sleep(backoff)
+                self._wake.set()
+            else:
+                failures = 0
+
+    def create(self, run_dir: Path, meta: Dict[str, Any]) -> None:
+        """
+        Writes a new run's metadata; new runs are written at once, so other workers see them.
+        """
+        with self._locked(run_dir) as state:
+            state.meta = copy.deepcopy(meta)
+            state.dirty, state.pending = False, []
+            self._write(state)
+
+    def read_meta(self, run_dir: Path) -> Optional[Dict[str, Any]]:
+        """
+        A copy of the run's metadata, with any changes not yet written, or None if the run
+        does not exist.
+        """
+        with self._locked(run_dir) as state:
+            meta = self._load(state)
+            return copy.deepcopy(meta) if meta is not None else None
+
+    def update_meta(self, run_dir: Path, update: Callable[[Dict[str, Any]], Any]) -> Optional[Dict[str, Any]]:
+        """
+        Applies `update` to the run's metadata and returns a copy of the result, or None if
+        the run does not exist. The change is written per the durability policy.
+        """
+        with self._locked(run_dir) as state:
+            meta = self._load(state)
+            if meta is None:
+                return None
+            update(meta)
+            state.dirty = True
+            state.pending.append(update)
+            self._changed(state)
+            return copy.deepcopy(meta)
+
+    def append_event(self, run_dir: Path, data: bytes) -> Tuple[int, int]:
+        """
+        Appends a line to the run's event log and returns the log positions before and
+        after it.
+        """
+        with self._locked(run_dir) as state:
+            if state.events_fd is not None and os.fstat(state.events_fd).st_nlink == 0:
+                # The run was archived or deleted (and maybe restored) since the log was opened
+                os.close(state.events_fd)
+                state.events_fd = None
+            if state.events_fd is None:
+                state.events_fd = os.open(run_dir / "events.jsonl", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            # One write per line: appends from other processes never split it
+            written = 0
+            while written < len(data):
+                written += os.write(state.events_fd, data[written:])
+            end = os.lseek(state.events_fd, 0, os.SEEK_CUR)
+            if self.sync:
+                state.events_unsynced = True
+                self._changed(state)
+        return end - len(data), end
+
+    def flush(self, run_dir: Optional[Path] = None) -> None:
+        """
+        Writes out the changes held for a run, or for every run.
+        """
+        with self._lock:
+            if run_dir is None:
+                states = list(self._unflushed)
+                self._unflushed.clear()
+            else:
+                state = self._states.get(run_dir)
+                states = [state] if state is not None and state in self._unflushed else []
+                self._unflushed.difference_update(states)
+        # A run that fails to flush is kept for the next flush; the others are still written
+        error: Optional[OSError] = None
+        for state in states:
+            try:
+                with state.lock:
+                    self._flush_state(state)
+            except OSError as e:
+                with self._lock:
+                    self._unflushed.add(state)
+                error = error or e
+        if error is not None:
+            raise error
+
+    def release(self, run_dir: Path) -> bool:
+        """
+        Forgets a run unless changes to it are held unwritten, e.g. before its files are
+        moved. Returns whether it was released.
+        """
+        with self._lock:
+            state = self._states.get(run_dir)
+        if state is None:
+            return True
+        # The run's lock is always taken before the registry's
+        with state.lock:
+            if state.dirty or state.events_unsynced:
+                return False
+            with self._lock:
+                if state in self._unflushed:
+                    return False
+                if self._states.get(run_dir) is state:
+                    del self._states[run_dir]
+            state.dropped = True
+            if state.events_fd is not None:
+                os.close(state.events_fd)
+                state.events_fd = None
+        return True
+
+    def discard(self, run_dir: Path) -> None:
+        """
+        Forgets a run without writing what is held for it, e.g. once it has been deleted.
+        """
+        with self._lock:
+            state = self._states.pop(run_dir, None)
+            self._unflushed.discard(state)
+        if state is not None:
+            with state.lock:
+                state.dropped = True
+                state.dirty = state.events_unsynced = False
+                state.pending = []
+                if state.events_fd is not None:
+                    os.close(state.events_fd)
+                    state.events_fd = None
+
+    def close(self) -> None:
+        """
+        Writes out everything held and closes the open event logs.
+        """
+        self.flush()
+        with self._lock:
+            states = list(self._states.values())
+            self._states.clear()
+        for state in states:
+            self._drop(state)
@@ -1,213 +1,506 @@
 import os
-import json
-import uuid
+import time
+import hashlib
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Iterable, Iterator, Sequence, Tuple
 from pathlib import Path
 
 from src.contracts.clarity_report import ClarityReport, AgentArtifact, Interview
+from src.storage.event_tail import EventTail
+from src.storage.file_store import FileRunStore
+from src.storage.idea_index import IdeaIndex
+from src.storage.read_cache import ReadCache
+from src.storage.report_index import SECTIONS, ReportIndex
+from src.storage.run_bus import RunBus, Subscription
+from src.storage.run_index import RunIndex, run_summary
+from src.storage.sqlite_store import SqliteRunStore
+from utils.telemetry.metrics import READ_CACHE_LOOKUPS, STORAGE_LATENCY
 
 DATA_DIR = Path("data/runs")
 
-def _get_run_dir(run_id: str) -> Path:
-    return DATA_DIR / run_id
+# "files" keeps each run as a directory of JSON files under DATA_DIR; "sqlite" keeps all
+# runs in the database at RUN_DB_PATH (import existing runs with scripts/migrate_runs.py)
+RUN_STORE = os.getenv("CLARITY_RUN_STORE", "files")
+RUN_DB_PATH = Path(os.getenv("CLARITY_RUN_DB_PATH", "data/runs.sqlite"))
 
-def _ensure_data_dir():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+# SQLite stores by database path, opened on first use
+_sqlite_stores: Dict[Path, SqliteRunStore] = {}
+_store_lock = threading.Lock()
 
+# Latest events of active runs, by store location and run
+_event_tail = EventTail()
+# Live progress of runs for subscribers in this process, by store location and run
+_run_bus = RunBus()
+
+# Parsed runs and reports, by store location, run and kind, validated by the run's version
+_read_cache = ReadCache()
+# Nanoseconds after its last write from which a run's version is trusted: file timestamps
+# are coarse, so a further write within the same tick could leave the version unchanged
+SETTLE_NS = 2_000_000_000
+
+# Statuses of runs that are done with: only these are archived
+FINISHED_STATUSES = ("COMPLETED", "FAILED")
+
+# Search indexes by file, loaded on first use
+_indexes: Dict[Path, Any] = {}
+_index_lock = threading.Lock()
+
+def _store() -> Any:
+    """
+    The backend selected by RUN_STORE. Every function of this module goes through it, so
+    both backends share the module's API and behaviour.
+    """
+    if RUN_STORE == "files":
+        return FileRunStore(DATA_DIR)
+    if RUN_STORE != "sqlite":
+        raise ValueError(f"Unknown run store: {RUN_STORE}")
+    with _store_lock:
+        store = _sqlite_stores.get(RUN_DB_PATH)
+        if store is None:
+            store = _sqlite_stores[RUN_DB_PATH] = SqliteRunStore(RUN_DB_PATH)
+    return store
+
+def _load_index(name: str, factory: Callable[[Path], Any], contents: Callable[[], Iterable[Any]], rebuild: bool = False) -> Any:
+    # Indexes live in the active store's index directory, so a store never serves another
+    # store's runs, and are built from its runs the first time they are used
+    path = _store().index_dir / name
+    with _index_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = factory(path)
+            rebuild = rebuild or not path.exists()
+        if rebuild:
+            index.rebuild(contents())
+    return index
+
+def _stored_ideas() -> Iterator[Tuple[str, str]]:
+    for run_data in _store().iter_runs():
+        if run_data.get("idea_text"):
+            yield run_data["run_id"], run_data["idea_text"]
+
+def _idea_index(rebuild: bool = False) -> IdeaIndex:
+    """
+    The near-duplicate index over the idea texts of stored runs.
+    """
+    return _load_index("ideas.jsonl", IdeaIndex, _stored_ideas, rebuild)
+
+def _report_index(rebuild: bool = False) -> ReportIndex:
+    """
+    The retrieval index over the findings of completed reports.
+    """
+    return _load_index("reports.jsonl", ReportIndex, lambda: _store().iter_reports(), rebuild)
+
+def _stored_summaries() -> Iterator[Dict[str, Any]]:
+    store = _store()
+    for run_data in store.iter_runs():
+        yield run_summary(run_data, store.has_report(run_data["run_id"]))
+
+def _run_index(rebuild: bool = False) -> RunIndex:
+    """
+    The listing index of run summaries, by creation time and status.
+    """
+    return _load_index("runs.jsonl", RunIndex, _stored_summaries, rebuild)
+
+def rebuild_indexes() -> None:
+    """
+    Rebuilds the active store's listing, near-duplicate and retrieval indexes from its
+    runs, e.g. after runs were imported into it.
+    """
+    _run_index(rebuild=True)
+    _idea_index(rebuild=True)
+    _report_index(rebuild=True)
+
+def _index_new_run(store: Any, run_id: str) -> None:
+    run_data = store.get_meta(run_id)
+    _idea_index().add(run_id, run_data["idea_text"])
+    _run_index().add(run_summary(run_data))
+
+@STORAGE_LATENCY.time(operation="update_run_status")
 def update_run_status(run_id: str, status: str):
     """
     Updates the status of a run.
     """
-    run_dir = _get_run_dir(run_id)
-    if not run_dir.exists():
-        return
-    
-    run_file = run_dir / "run.json"
-    if run_file.exists():
-        with open(run_file, "r") as f:
-            run_data = json.load(f)
-        
+    def update(run_data: Dict[str, Any]) -> None:
         run_data["status"] = status
         run_data["updated_at"] = datetime.utcnow().isoformat()
-        
-        with open(run_file, "w") as f:
-            json.dump(run_data, f, indent=2)
 
+    store = _store()
+    if store.update_meta(run_id, update) is not None:
+        _run_index().update(run_id, status=status)
+        _run_bus.publish((store.location, run_id), {"kind": "status", "status": status})
+
+@STORAGE_LATENCY.time(operation="save_interview")
 def save_interview(run_id: str, interview: Interview):
     """
-    Saves the interview to interview.json.
+    Saves the run's interview.
     """
-    run_dir = _get_run_dir(run_id)
-    if not run_dir.exists():
-        raise ValueError(f"Run {run_id} not found")
-    
-    with open(run_dir / "interview.json", "w") as f:
-        f.write(interview.model_dump_json(indent=2))
+    _store().save_interview(run_id, interview)
 
+@STORAGE_LATENCY.time(operation="get_interview")
 def get_interview(run_id: str) -> Optional[Interview]:
     """
     Retrieves the interview for a run.
     """
-    run_dir = _get_run_dir(run_id)
-    interview_path = run_dir / "interview.json"
-    
-    if interview_path.exists():
-        with open(interview_path, "r") as f:
-            return Interview.model_validate_json(f.read())
-    return None
+    return _store().get_interview(run_id)
 
+@STORAGE_LATENCY.time(operation="create_run")
 def create_run(idea_text: str) -> str:
     """
-    Creates a new run directory and run.json.
+    Creates a new run.
     Returns the run_id.
     """
-    _ensure_data_dir()
-    run_id = str(uuid.uuid4())
-    run_dir = _get_run_dir(run_id)
-    run_dir.mkdir(parents=True, exist_ok=True)
-    (run_dir / "artifacts").mkdir(exist_ok=True)
+    store = _store()
+    run_id = store.create_run(idea_text)
+    _index_new_run(store, run_id)
+    return run_id
 
-    run_data = {
-        "run_id": run_id,
-        "idea_text": idea_text,
-        "created_at": datetime.utcnow().isoformat(),
-        "status": "STARTED"
-    }
+@STORAGE_LATENCY.time(operation="fork_run")
+def fork_run(source_run_id: str, idea_text: Optional[str] = None) -> str:
+    """
+    Creates a new run from an existing one, optionally with an edited idea. The source's
+    interview and agent artifacts are copied, so when the fork is analysed only the stages
+    whose inputs changed call their agents again. Returns the new run_id.
+    """
+    store = _store()
+    source_data = store.get_meta(source_run_id)
+    if source_data is None:
+        raise ValueError(f"Run {source_run_id} not found")
 
-    with open(run_dir / "run.json", "w") as f:
-        json.dump(run_data, f, indent=2)
-    
-    # Create empty events file
-    (run_dir / "events.jsonl").touch()
+    fork_idea = idea_text or source_data["idea_text"]
+    extra: Dict[str, Any] = {"forked_from": source_run_id}
+    # The same idea would retrieve the same findings; keep the source's so the Market and
+    # Risk artifacts stay reusable
+    if fork_idea == source_data["idea_text"] and "related_findings" in source_data:
+        extra["related_findings"] = source_data["related_findings"]
+    run_id = store.create_run(fork_idea, extra)
 
+    artifacts, _ = store.read_artifacts(source_run_id)
+    for artifact in artifacts:
+        store.save_artifact(run_id, AgentArtifact.model_validate(artifact))
+    interview = store.get_interview(source_run_id)
+    if interview is not None:
+        store.save_interview(run_id, interview)
+
+    _index_new_run(store, run_id)
     return run_id
 
+@STORAGE_LATENCY.time(operation="append_event")
 def append_event(run_id: str, event: Dict[str, Any]):
     """
-    Appends an event to events.jsonl.
+    Appends an event to the run's event log.
     """
-    run_dir = _get_run_dir(run_id)
-    if not run_dir.exists():
-        raise ValueError(f"Run {run_id} not found")
-    
     # Add timestamp if not present
     if "timestamp" not in event:
         event["timestamp"] = datetime.utcnow().isoformat()
 
+    store = _store()
+    if store.get_meta(run_id) is None:
+        raise ValueError(f"Run {run_id} not found")
+
     # Print to stdout for logging
     print(f"INFO:     Run {run_id} event: {event['type']} {event.get('agent', '')} {event.get('status', '')}")
 
-    with open(run_dir / "events.jsonl", "a") as f:
-        f.write(json.dumps(event) + "\n")
+    start, end = store.append_event(run_id, event)
+    _event_tail.record((store.location, run_id), start, end, event)
+    _run_bus.publish((store.location, run_id), {"kind": "event", "start": start, "position": end, "event": event})
 
+@STORAGE_LATENCY.time(operation="save_artifact")
 def save_artifact(run_id: str, artifact: AgentArtifact):
     """
-    Saves an artifact to artifacts/{agent_name}.json.
+    Saves an agent's artifact, replacing any earlier one of the same agent.
     """
-    run_dir = _get_run_dir(run_id)
-    if not run_dir.exists():
-        raise ValueError(f"Run {run_id} not found")
-    
-    artifacts_dir = run_dir / "artifacts"
-    artifacts_dir.mkdir(exist_ok=True)
-    
-    # Sanitize agent name for filename
-    filename = f"{artifact.agent_name.lower().replace(' ', '_')}.json"
-    
-    with open(artifacts_dir / filename, "w") as f:
-        f.write(artifact.model_dump_json(indent=2))
+    store = _store()
+    position = store.save_artifact(run_id, artifact)
+    key = (store.location, run_id)
+    if _run_bus.has_subscribers(key):
+        _run_bus.publish(key, {"kind": "artifact", "position": position, "artifact": artifact.model_dump(mode="json")})
+
+@STORAGE_LATENCY.time(operation="get_artifact")
+def get_artifact(run_id: str, agent_name: str) -> Optional[AgentArtifact]:
+    """
+    Retrieves a single agent's artifact, or None if it has not been saved.
+    """
+    return _store().get_artifact(run_id, agent_name)
+
+@STORAGE_LATENCY.time(operation="recent_agent_durations")
+def recent_agent_durations(agent_name: str, limit: int = 200) -> List[float]:
+    """
+    Returns the durations in seconds (finished_at - started_at) of an agent's most recently
+    written artifacts across all runs, newest first.
+    """
+    return _store().recent_agent_durations(agent_name, limit)
+
+@STORAGE_LATENCY.time(operation="save_speculation")
+def save_speculation(run_id: str, artifact: AgentArtifact):
+    """
+    Saves a speculative artifact. Speculative results are kept apart from the run's
+    artifacts so they never show up as run progress.
+    """
+    _store().save_artifact(run_id, artifact, speculative=True)
+
+@STORAGE_LATENCY.time(operation="get_speculation")
+def get_speculation(run_id: str, agent_name: str) -> Optional[AgentArtifact]:
+    """
+    Retrieves a speculative artifact, or None if none was produced.
+    """
+    return _store().get_artifact(run_id, agent_name, speculative=True)
+
+@STORAGE_LATENCY.time(operation="clear_speculation")
+def clear_speculation(run_id: str):
+    """
+    Deletes all speculative artifacts of a run.
+    """
+    _store().clear_speculation(run_id)
+
+@STORAGE_LATENCY.time(operation="get_usage")
+def get_usage(run_id: str) -> Dict[str, Any]:
+    """
+    Returns the token usage recorded for a run so far.
+    """
+    run_data = _store().get_meta(run_id) or {}
+    return run_data.get("usage", {"input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+
+@STORAGE_LATENCY.time(operation="record_usage")
+def record_usage(run_id: str, input_tokens: int, output_tokens: int, cost_usd: float) -> Dict[str, Any]:
+    """
+    Adds one agent call's token usage to the run's totals and returns the new totals.
+    """
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "cost_usd": cost_usd}
+
+    def update(run_data: Dict[str, Any]) -> None:
+        totals = run_data.get("usage", {"input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+        for key, value in usage.items():
+            totals[key] = totals.get(key, 0) + value
+        run_data["usage"] = totals
 
+    run_data = _store().update_meta(run_id, update)
+    return run_data["usage"] if run_data is not None else usage
+
+@STORAGE_LATENCY.time(operation="save_report")
 def save_report(run_id: str, report: ClarityReport):
     """
-    Saves the final report to report.json and updates run status.
+    Saves the final report and marks the run completed.
     """
-    run_dir = _get_run_dir(run_id)
-    if not run_dir.exists():
-        raise ValueError(f"Run {run_id} not found")
-    
-    # Save report.json
-    with open(run_dir / "report.json", "w") as f:
-        f.write(report.model_dump_json(indent=2))
-    
-    # Update run status
-    run_file = run_dir / "run.json"
-    if run_file.exists():
-        with open(run_file, "r") as f:
-            run_data = json.load(f)
-        
+    store = _store()
+    store.save_report(run_id, report)
+
+    def update(run_data: Dict[str, Any]) -> None:
         run_data["status"] = "COMPLETED"
         run_data["completed_at"] = datetime.utcnow().isoformat()
-        
-        with open(run_file, "w") as f:
-            json.dump(run_data, f, indent=2)
 
+    store.update_meta(run_id, update)
+    _run_index().update(run_id, status="COMPLETED", has_report=True)
+    _run_bus.publish((store.location, run_id), {"kind": "status", "status": "COMPLETED"})
+    _report_index().add(run_id, report)
+
+def _settled_version(store: Any, run_id: str) -> Tuple[bool, Optional[str]]:
+    """
+    Whether the run exists, and its version if it is settled (not written too recently to
+    be told apart from a further write).
+    """
+    version = store.run_version(run_id)
+    if version is None:
+        return False, None
+    token, modified_ns = version
+    return True, token if time.time_ns() - modified_ns >= SETTLE_NS else None
+
+def _cached_read(kind: str, run_id: str, read: Callable[[Any], Any]) -> Any:
+    # The version is taken before reading, so a cached value is never older than its version
+    store = _store()
+    exists, version = _settled_version(store, run_id)
+    if not exists:
+        return None
+    key = (store.location, run_id, kind)
+    if version is not None:
+        value = _read_cache.get(key, version)
+        if value is not None:
+            READ_CACHE_LOOKUPS.inc(kind=kind, result="hit")
+            return value
+    READ_CACHE_LOOKUPS.inc(kind=kind, result="miss")
+    value = read(store)
+    if version is not None and value is not None:
+        _read_cache.put(key, version, value)
+    return value
+
+def get_run_etag(run_id: str) -> Optional[str]:
+    """
+    A strong entity tag for the run's stored state (everything get_run and get_report
+    return), or None if the run does not exist or was written too recently to tag.
+    """
+    store = _store()
+    _, version = _settled_version(store, run_id)
+    if version is None:
+        return None
+    return '"' + hashlib.blake2b(f"{run_id}:{version}".encode(), digest_size=16).hexdigest() + '"'
+
+@STORAGE_LATENCY.time(operation="get_report")
+def get_report(run_id: str) -> Optional[ClarityReport]:
+    """
+    Retrieves the final report of a run, or None if it has none yet. Reports of settled
+    runs are served from memory.
+    """
+    return _cached_read("report", run_id, lambda store: store.get_report(run_id))
+
+@STORAGE_LATENCY.time(operation="get_run")
 def get_run(run_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieves run details, including status, timestamps, and partial outputs (artifacts).
+    Runs that have not been written to for a moment are served from memory.
     """
-    run_dir = _get_run_dir(run_id)
-    if not run_dir.exists():
+    run_data = _cached_read("run", run_id, lambda store: _assemble_run(store, run_id))
+    # Callers add to the run's dict; keep the cached one as read
+    return dict(run_data) if run_data is not None else None
+
+def _assemble_run(store: Any, run_id: str) -> Optional[Dict[str, Any]]:
+    run_data = store.get_meta(run_id)
+    if run_data is None:
         return None
-    
-    # Load run metadata
-    run_data = {}
-    if (run_dir / "run.json").exists():
-        with open(run_dir / "run.json", "r") as f:
-            run_data = json.load(f)
-            
-    # Load artifacts
-    artifacts = []
-    artifacts_dir = run_dir / "artifacts"
-    if artifacts_dir.exists():
-        for artifact_file in artifacts_dir.glob("*.json"):
-            with open(artifact_file, "r") as f:
-                try:
-                    artifacts.append(json.load(f))
-                except json.JSONDecodeError:
-                    pass
-    
-    run_data["artifacts"] = artifacts
-    
-    # Load events
-    events = []
-    events_file = run_dir / "events.jsonl"
-    if events_file.exists():
-        with open(events_file, "r") as f:
-            for line in f:
-                try:
-                    events.append(json.loads(line))
-                except json.JSONDecodeError:
-                    pass
-    run_data["events"] = events
-
-    # Check if report exists
-    run_data["has_report"] = (run_dir / "report.json").exists()
-    
-    # Check if interview exists
-    if (run_dir / "interview.json").exists():
-        with open(run_dir / "interview.json", "r") as f:
-            run_data["interview"] = json.load(f)
+
+    run_data["artifacts"], artifacts_cursor = store.read_artifacts(run_id)
+    run_data["events"], events_cursor = store.read_events(run_id)
+    run_data["has_report"] = store.has_report(run_id)
+    # Where get_run_updates picks up from
+    run_data["cursor"] = encode_updates_cursor(events_cursor, artifacts_cursor)
+
+    interview = store.get_interview(run_id)
+    if interview is not None:
+        run_data["interview"] = interview.model_dump(mode="json")
 
     return run_data
 
+def encode_updates_cursor(events_cursor: int, artifacts_cursor: int) -> str:
+    return f"{events_cursor}.{artifacts_cursor}"
+
+def decode_updates_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        events_cursor, artifacts_cursor = (int(part) for part in cursor.split("."))
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if events_cursor < 0 or artifacts_cursor < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return events_cursor, artifacts_cursor
+
+def subscribe_run(run_id: str) -> Subscription:
+    """
+    Subscribes to the live progress of a run: messages of kind "event" (with the event and
+    its log "start" and "position"), "artifact" (with the artifact and its "position") and
+    "status". Must be called on the event loop that consumes the subscription; close it
+    when done.
+    """
+    return _run_bus.subscribe((_store().location, run_id))
+
+@STORAGE_LATENCY.time(operation="get_run_updates")
+def get_run_updates(run_id: str, cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    What changed in a run since `cursor` (the "cursor" of get_run or of an earlier call):
+    its status, the events appended since, and the artifacts saved since, plus the cursor to
+    continue from. The newest artifact may be returned again; artifacts replace earlier ones
+    of the same agent. For an active run the events usually come from memory, so a poll
+    costs the same however long the run's event log is.
+    """
+    store = _store()
+    run_data = store.get_meta(run_id)
+    if run_data is None:
+        return None
+
+    events_since, artifacts_since = decode_updates_cursor(cursor) if cursor else (0, 0)
+    events_cursor = store.event_cursor(run_id)
+    events = _event_tail.since((store.location, run_id), events_since, events_cursor)
+    if events is None:
+        events, events_cursor = store.read_events(run_id, events_since)
+    artifacts, artifacts_cursor = store.read_artifacts(run_id, artifacts_since)
+
+    return {
+        "run_id": run_id,
+        "status": run_data.get("status"),
+        "has_report": store.has_report(run_id),
+        "events": events,
+        "artifacts": artifacts,
+        "cursor": encode_updates_cursor(events_cursor, artifacts_cursor),
+    }
+
+@STORAGE_LATENCY.time(operation="list_runs")
+def list_run_page(limit: int = 50, cursor: Optional[str] = None, statuses: Optional[Sequence[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Lists run summaries, newest first, a page at a time: returns up to `limit` runs after
+    `cursor` (optionally only those with one of `statuses`) and the cursor of the next
+    page, or None on the last one.
+    """
+    return _run_index().page(limit, cursor, statuses)
+
 def list_runs(limit: int = 50) -> List[Dict[str, Any]]:
     """
-    Lists runs, sorted by newest first.
-    """
-    _ensure_data_dir()
-    runs = []
-    
-    for run_dir in DATA_DIR.iterdir():
-        if run_dir.is_dir() and (run_dir / "run.json").exists():
-            try:
-                with open(run_dir / "run.json", "r") as f:
-                    run_data = json.load(f)
-                    runs.append(run_data)
-            except (json.JSONDecodeError, IOError):
-                continue
-                
-    # Sort by created_at descending
-    runs.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    return runs[:limit]
+    Lists the summaries of the newest runs, sorted by newest first.
+    """
+    return list_run_page(limit)[0]
+
+def list_runs_created_before(created_at: str, statuses: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Lists the summaries of runs created before `created_at` (an ISO timestamp), optionally
+    only those with one of `statuses`, oldest first.
+    """
+    return _run_index().created_before(created_at, statuses)
+
+@STORAGE_LATENCY.time(operation="archive_run")
+def archive_run(run_id: str) -> bool:
+    """
+    Packs a finished run into a single compressed archive (file store only). It is still
+    listed and read as before; the first write to it unpacks it again. Returns whether it
+    was packed: runs that have not finished or are being written to are left alone.
+    """
+    return _store().archive_run(run_id, FINISHED_STATUSES)
+
+@STORAGE_LATENCY.time(operation="delete_run")
+def delete_run(run_id: str) -> bool:
+    """
+    Deletes a run and everything stored for it. Returns whether it existed.
+    """
+    store = _store()
+    deleted = store.delete_run(run_id)
+    _run_index().remove(run_id)
+    _event_tail.discard((store.location, run_id))
+    for kind in ("run", "report"):
+        _read_cache.discard((store.location, run_id, kind))
+    return deleted
+
+@STORAGE_LATENCY.time(operation="find_similar_runs")
+def find_similar_runs(idea_text: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Existing runs whose idea is a near-duplicate of `idea_text`, most similar first, as
+    summaries with the estimated similarity.
+    """
+    store = _store()
+    similar = []
+    for run_id, score in _idea_index().similar(idea_text, limit=limit):
+        run_data = store.get_meta(run_id)
+        if run_data is None:
+            continue  # run deleted since it was indexed
+        similar.append({
+            "run_id": run_id,
+            "idea_text": run_data.get("idea_text"),
+            "status": run_data.get("status"),
+            "created_at": run_data.get("created_at"),
+            "has_report": store.has_report(run_id),
+            "similarity": round(score, 3),
+        })
+    return similar
+
+@STORAGE_LATENCY.time(operation="get_related_findings")
+def get_related_findings(run_id: str, idea_text: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Findings of completed reports related to `idea_text`, by report section ("market",
+    "risks"), for grounding the run's agents. The first lookup is pinned in the run's
+    metadata, so a resumed run hands its agents the same context and keeps its checkpoints.
+    """
+    store = _store()
+    run_data = store.get_meta(run_id)
+    if run_data is None:
+        raise ValueError(f"Run {run_id} not found")
+    if run_data.get("related_findings") is not None:
+        return run_data["related_findings"]
+
+    index = _report_index()
+    findings = {section: index.search(idea_text, section, exclude=run_id) for section in SECTIONS}
+    run_data = store.update_meta(run_id, lambda data: data.setdefault("related_findings", findings))
+    return run_data["related_findings"] if run_data is not None else findings
@@ -0,0 +1,312 @@
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.contracts.clarity_report import ClarityReport, AgentArtifact, Interview
+from src.storage.run_state import RUN_DURABILITY
+
+SYNCHRONOUS = {"always": "FULL", "interval": "NORMAL", "none": "OFF"}
+
+SCHEMA = [
+    # Run metadata (what run.json holds) is kept whole in `data`; status and created_at are
+    # mirrored into columns so runs can be selected by them on an index. `version` counts
+    # the writes to the run, so cached reads of it can be validated
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "run_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at TEXT NOT NULL, data TEXT NOT NULL, "
+    "version INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at)",
+    "CREATE TABLE IF NOT EXISTS events ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_events_run ON events(run_id, id)",
+    "CREATE TABLE IF NOT EXISTS artifacts ("
+    "run_id TEXT NOT NULL, agent_name TEXT NOT NULL, speculative INTEGER NOT NULL, "
+    "data TEXT NOT NULL, saved_at INTEGER NOT NULL, PRIMARY KEY (run_id, agent_name, speculative))",
+    "CREATE INDEX IF NOT EXISTS idx_artifacts_agent ON artifacts(agent_name, speculative, saved_at)",
+    "CREATE TABLE IF NOT EXISTS interviews (run_id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS reports (run_id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+]
+
+class SqliteRunStore:
+    """
+    Stores runs in a single SQLite database with the same operations as FileRunStore.
+
+    The database runs in WAL mode with a busy timeout, so several uvicorn workers can read
+    and write it concurrently; metadata updates are read-modify-write transactions, so
+    concurrent status and usage updates never lose each other's changes. Each thread keeps
+    its own connection.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+    @property
+    def location(self) -> Path:
+        return self.path
+
+    @property
+    def index_dir(self) -> Path:
+        # Next to the database, e.g. data/runs.sqlite.index
+        return self.path.with_name(self.path.name + ".index")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit connection; multi-statement writes open their own transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            # The durability policy of the file store, in SQLite's terms: with WAL, NORMAL
+            # keeps committed data safe across process crashes and only an OS crash can
+            # lose the last transactions; FULL syncs every commit
+            conn.execute(f"PRAGMA synchronous={SYNCHRONOUS[RUN_DURABILITY]}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _exists(self, conn: sqlite3.Connection, run_id: str) -> bool:
+        return conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    def _require(self, conn: sqlite3.Connection, run_id: str) -> None:
+        if not self._exists(conn, run_id):
+            raise ValueError(f"Run {run_id} not found")
+
+    def _touch(self, conn: sqlite3.Connection, run_id: str) -> None:
+        conn.execute("UPDATE runs SET version = version + 1 WHERE run_id = ?", (run_id,))
+
+    # --- Run metadata ---
+
+    def create_run(self, idea_text: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        run_id = str(uuid.uuid4())
+        run_data = {
+            "run_id": run_id,
+            "idea_text": idea_text,
+            "created_at": datetime.utcnow().isoformat(),
+            "status": "STARTED",
+            **(extra or {}),
+        }
+        self._connection().execute(
+            "INSERT INTO runs (run_id, status, created_at, data) VALUES (?, ?, ?, ?)",
+            (run_id, run_data["status"], run_data["created_at"], json.dumps(run_data)),
+        )
+        return run_id
+
+    def get_meta(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_meta(self, run_id: str, update: Callable[[Dict[str, Any]], Any]) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run_data = json.loads(row[0])
+            update(run_data)
+            conn.execute(
+                "UPDATE runs SET status = ?, created_at = ?, data = ?, version = version + 1 WHERE run_id = ?",
+                (run_data.get("status", ""), run_data.get("created_at", ""), json.dumps(run_data), run_id),
+            )
+        return run_data
+
+    def run_version(self, run_id: str) -> Optional[Tuple[str, int]]:
+        row = self._connection().execute("SELECT version FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        # Counted, not timestamped, so a version never has to settle
+        return (str(row[0]), 0) if row else None
+
+    def iter_runs(self) -> Iterator[Dict[str, Any]]:
+        for (data,) in self._connection().execute("SELECT data FROM runs").fetchall():
+            yield json.loads(data)
+
+    # --- Events ---
+
+    # Event positions are row ids, which only grow
+
+    def append_event(self, run_id: str, event: Dict[str, Any]) -> Tuple[int, int]:
+        with self._transaction() as conn:
+            self._require(conn, run_id)
+            previous = self._event_cursor(conn, run_id)
+            cursor = conn.execute("INSERT INTO events (run_id, data) VALUES (?, ?)", (run_id, json.dumps(event)))
+            self._touch(conn, run_id)
+        return previous, cursor.lastrowid
+
+    def _event_cursor(self, conn: sqlite3.Connection, run_id: str) -> int:
+        return conn.execute("SELECT MAX(id) FROM events WHERE run_id = ?", (run_id,)).fetchone()[0] or 0
+
+    def event_cursor(self, run_id: str) -> int:
+        return self._event_cursor(self._connection(), run_id)
+
+    def read_events(self, run_id: str, since: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        rows = self._connection().execute(
+            "SELECT id, data FROM events WHERE run_id = ? AND id > ? ORDER BY id", (run_id, since)
+        ).fetchall()
+        return [json.loads(data) for _, data in rows], rows[-1][0] if rows else since
+
+    # --- Interview ---
+
+    def save_interview(self, run_id: str, interview: Interview) -> None:
+        with self._transaction() as conn:
+            self._require(conn, run_id)
+            conn.execute("INSERT OR REPLACE INTO interviews (run_id, data) VALUES (?, ?)", (run_id, interview.model_dump_json()))
+            self._touch(conn, run_id)
+
+    def get_interview(self, run_id: str) -> Optional[Interview]:
+        row = self._connection().execute("SELECT data FROM interviews WHERE run_id = ?", (run_id,)).fetchone()
+        return Interview.model_validate_json(row[0]) if row else None
+
+    # --- Artifacts ---
+
+    def save_artifact(self, run_id: str, artifact: AgentArtifact, speculative: bool = False) -> int:
+        saved_at = time.time_ns()
+        with self._transaction() as conn:
+            self._require(conn, run_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (run_id, agent_name, speculative, data, saved_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, artifact.agent_name, int(speculative), artifact.model_dump_json(), saved_at),
+            )
+            self._touch(conn, run_id)
+        return saved_at
+
+    def get_artifact(self, run_id: str, agent_name: str, speculative: bool = False) -> Optional[AgentArtifact]:
+        row = self._connection().execute(
+            "SELECT data FROM artifacts WHERE run_id = ? AND agent_name = ? AND speculative = ?",
+            (run_id, agent_name, int(speculative)),
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return AgentArtifact.model_validate_json(row[0])
+        except ValueError:
+            return None
+
+    def read_artifacts(self, run_id: str, since: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        # Artifacts are stamped with their save time in nanoseconds
+        rows = self._connection().execute(
+            "SELECT saved_at, data FROM artifacts WHERE run_id = ? AND speculative = 0 AND saved_at >= ? ORDER BY saved_at",
+            (run_id, since),
+        ).fetchall()
+        return [json.loads(data) for _, data in rows], rows[-1][0] if rows else since
+
+    def clear_speculation(self, run_id: str) -> None:
+        self._connection().execute("DELETE FROM artifacts WHERE run_id = ? AND speculative = 1", (run_id,))
+
+    def recent_agent_durations(self, agent_name: str, limit: int = 200) -> List[float]:
+        rows = self._connection().execute(
+            "SELECT data FROM artifacts WHERE agent_name = ? AND speculative = 0 ORDER BY saved_at DESC LIMIT ?",
+            (agent_name, limit),
+        ).fetchall()
+        durations = []
+        for (data,) in rows:
+            try:
+                artifact = AgentArtifact.model_validate_json(data)
+            except ValueError:
+                continue
+            durations.append((artifact.finished_at - artifact.started_at).total_seconds())
+        return durations
+
+    # --- Report ---
+
+    def save_report(self, run_id: str, report: ClarityReport) -> None:
+        with self._transaction() as conn:
+            self._require(conn, run_id)
+            conn.execute("INSERT OR REPLACE INTO reports (run_id, data) VALUES (?, ?)", (run_id, report.model_dump_json()))
+            self._touch(conn, run_id)
+
+    def has_report(self, run_id: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM reports WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    def get_report(self, run_id: str) -> Optional[ClarityReport]:
+        row = self._connection().execute("SELECT data FROM reports WHERE run_id = ?", (run_id,)).fetchone()
+        return ClarityReport.model_validate_json(row[0]) if row else None
+
+    def iter_reports(self) -> Iterator[Tuple[str, ClarityReport]]:
+        for run_id, data in self._connection().execute("SELECT run_id, data FROM reports").fetchall():
+            try:
+                yield run_id, ClarityReport.model_validate_json(data)
+            except ValueError:
+                continue
+
+    # --- Retention ---
+
+    def archive_run(self, run_id: str, statuses: Optional[Sequence[str]] = None) -> bool:
+        # A run's rows already live in the one database file; there is nothing to pack
+        return False
+
+    def delete_run(self, run_id: str) -> bool:
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,)).rowcount > 0
+            for table in ("events", "artifacts", "interviews", "reports"):
+                conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        return deleted
+
+def migrate_runs(data_dir: Path, store: SqliteRunStore) -> Tuple[int, int]:
+    """
+    Imports every run under `data_dir` (the layout of FileRunStore, archived or not) into
+    `store`, one transaction per run, keeping run ids, timestamps and artifact order. Runs
+    already in the store are replaced, so the migration can be re-run. Returns the number
+    of runs imported and skipped.
+    """
+    # Imported here: the file store is only needed to migrate away from it
+    from src.storage.file_store import FileRunStore
+
+    source = FileRunStore(data_dir)
+    imported = skipped = 0
+    for run_data in source.iter_runs():
+        run_id = run_data["run_id"]
+        try:
+            events, _ = source.read_events(run_id)
+            artifacts = []
+            for speculative in (False, True):
+                for stamp, _, data in source.stamped_artifacts(run_id, speculative):
+                    try:
+                        artifact = AgentArtifact.model_validate(data)
+                    except ValueError:
+                        continue
+                    artifacts.append((artifact.agent_name, int(speculative), artifact.model_dump_json(), stamp))
+            interview = source.get_interview(run_id)
+            report = source.get_report(run_id)
+        except (OSError, ValueError) as e:
+            print(f"WARNING:  Skipping run {run_id}: {e}")
+            skipped += 1
+            continue
+
+        with store._transaction() as conn:
+            # A replaced run keeps counting versions, so reads cached before still miss
+            row = conn.execute("SELECT version FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            for table in ("runs", "events", "artifacts", "interviews", "reports"):
+                conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            conn.execute(
+                "INSERT INTO runs (run_id, status, created_at, data, version) VALUES (?, ?, ?, ?, ?)",
+                (run_id, run_data.get("status", ""), run_data.get("created_at", ""), json.dumps(run_data), row[0] + 1 if row else 0),
+            )
+            conn.executemany("INSERT INTO events (run_id, data) VALUES (?, ?)", [(run_id, json.dumps(event)) for event in events])
+            conn.executemany(
+                "INSERT INTO artifacts (run_id, agent_name, speculative, data, saved_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, *artifact) for artifact in artifacts],
+            )
+            if interview is not None:
+                conn.execute("INSERT INTO interviews (run_id, data) VALUES (?, ?)", (run_id, interview.model_dump_json()))
+            if report is not None:
+                conn.execute("INSERT INTO reports (run_id, data) VALUES (?, ?)", (run_id, report.model_dump_json()))
+        imported += 1
+    return imported, skipped
@@ -1,10 +1,10 @@
 
 import os
 import sys
+from typing import Optional
 
 from agno.team import Team
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
 
@@ -12,14 +12,19 @@ from agno.tools.reasoning import ReasoningTools
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 
 from src.prompts.agent_prompts import AgentPrompts
+from src.agents.registry import run_session_id, shared_model
 from src.agents.audience_insight_agent.audience_insight_agent import AudienceInsightAgent
 from src.agents.competitor_scan_agent.competitor_scan_agent import CompetitorScanAgent
 from src.agents.uvp_agent.uvp_agent import UVPAgent
 from src.agents.channel_strategy_agent.channel_strategy_agent import ChannelStrategyAgent
+from utils.telemetry.tracing import trace_tool_call, traced_run
 
 
 class StatergyLeadTeam():
     def __init__(self):
+        # The team gets its own member agents: agno marks members as belonging to the team,
+        # and agents marked that way no longer save sessions of their own when AgentOS
+        # serves them. Their models still share the process-wide OpenAI clients
         audience_insight_agent = AudienceInsightAgent()
         competitor_scan_agent = CompetitorScanAgent()
         uvp_agent = UVPAgent()
@@ -27,9 +32,10 @@ class StatergyLeadTeam():
         self.team = Team(
             name="Statergy Lead Team",
             members=[audience_insight_agent.agent, competitor_scan_agent.agent, uvp_agent.agent, channel_strategy_agent.agent],
-            model=OpenAIChat(id="gpt-4o"),
+            model=shared_model("gpt-4o"),
             instructions=AgentPrompts.STATERGY_LEAD_TEAM_INSTRUCTIONS,
             tools=[ReasoningTools(add_instructions=True), DuckDuckGoTools()],
+            tool_hooks=[trace_tool_call],
             reasoning=True,
             show_members_responses=True,
             share_member_interactions=True,
@@ -40,8 +46,8 @@ class StatergyLeadTeam():
             markdown=True
         )
     
-    def run(self, topic: str, stream: bool = False):
-        return self.team.run(f"Based on the reports from all agents, provide a comprehensive and balanced final assessment on the topic: {topic}", stream=stream)
+    def run(self, topic: str, stream: bool = False, session_id: Optional[str] = None):
+        return traced_run(f"team {self.team.name}", lambda: self.team.run(f"Based on the reports from all agents, provide a comprehensive and balanced final assessment on the topic: {topic}", stream=stream, session_id=run_session_id(session_id)), topic=topic, stream=stream)
     
 if __name__ == "__main__":
     statergy_lead_team = StatergyLeadTeam()
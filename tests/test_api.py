@@ -1,9 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timezone
 import json
 
+from src.contracts.clarity_report import ClarityReport, Interview, Question
+
 # Import the app
 from src.api.server import app
 
@@ -17,14 +19,18 @@ MOCK_IDEA = "A test idea"
 def mock_storage():
     with patch("src.api.server.create_run") as mock_create, \
          patch("src.api.server.get_run") as mock_get, \
-         patch("src.api.server.list_runs") as mock_list, \
-         patch("src.api.server._get_run_dir") as mock_dir, \
-         patch("src.api.server.run_analysis") as mock_run_analysis:
+         patch("src.api.server.list_run_page") as mock_list, \
+         patch("src.api.server.get_report") as mock_report, \
+         patch("src.api.server.find_similar_runs", return_value=[]) as mock_similar, \
+         patch("src.api.server.get_run_etag", return_value=None) as mock_etag, \
+         patch("src.api.server.arun_analysis", new_callable=AsyncMock) as mock_run_analysis:
         yield {
             "create": mock_create,
             "get": mock_get,
             "list": mock_list,
-            "dir": mock_dir,
+            "report": mock_report,
+            "similar": mock_similar,
+            "etag": mock_etag,
             "run_analysis": mock_run_analysis
         }
 
@@ -45,6 +51,49 @@ def test_start_analysis(mock_storage):
     assert response.status_code == 200
     assert response.json() == {"run_id": MOCK_RUN_ID}
     mock_storage["create"].assert_called_once_with(MOCK_IDEA)
+    mock_storage["run_analysis"].assert_called_once_with(MOCK_RUN_ID, MOCK_IDEA)
+
+MOCK_DUPLICATE = {
+    "run_id": "earlier-run-id",
+    "idea_text": "A test idea!",
+    "status": "COMPLETED",
+    "created_at": "2024-01-01T00:00:00",
+    "has_report": True,
+    "similarity": 0.9,
+}
+
+def test_start_analysis_lists_near_duplicates(mock_storage):
+    mock_storage["create"].return_value = MOCK_RUN_ID
+    mock_storage["similar"].return_value = [MOCK_DUPLICATE]
+
+    response = client.post("/analysis/run", json={"idea": MOCK_IDEA})
+
+    assert response.status_code == 200
+    assert response.json() == {"run_id": MOCK_RUN_ID, "duplicates": [MOCK_DUPLICATE]}
+
+def test_start_analysis_reuses_duplicate_report(mock_storage):
+    mock_storage["similar"].return_value = [MOCK_DUPLICATE]
+
+    response = client.post("/analysis/run", json={"idea": MOCK_IDEA, "reuse_duplicate": True})
+
+    assert response.status_code == 200
+    assert response.json()["run_id"] == "earlier-run-id"
+    assert response.json()["reused"] is True
+    mock_storage["create"].assert_not_called()
+    mock_storage["run_analysis"].assert_not_called()
+
+def test_start_analysis_seeds_from_duplicate_report(mock_storage):
+    mock_storage["similar"].return_value = [MOCK_DUPLICATE]
+
+    with patch("src.api.server.fork_run", return_value="forked-run-id") as mock_fork:
+        response = client.post("/analysis/run", json={"idea": MOCK_IDEA, "seed_duplicate": True})
+
+    assert response.status_code == 200
+    assert response.json()["run_id"] == "forked-run-id"
+    assert response.json()["forked_from"] == "earlier-run-id"
+    mock_fork.assert_called_once_with("earlier-run-id", MOCK_IDEA)
+    mock_storage["create"].assert_not_called()
+    mock_storage["run_analysis"].assert_called_once_with("forked-run-id", MOCK_IDEA)
 
 def test_get_analysis_status_found(mock_storage):
     mock_data = {"run_id": MOCK_RUN_ID, "status": "completed", "has_report": False}
@@ -64,20 +113,67 @@ def test_get_analysis_status_not_found(mock_storage):
     assert response.status_code == 404
     assert response.json()["detail"] == "Run not found"
 
+def test_get_analysis_status_revalidates_with_etag(mock_storage):
+    mock_storage["get"].return_value = {"run_id": MOCK_RUN_ID, "status": "COMPLETED"}
+    mock_storage["etag"].return_value = '"abc"'
+
+    response = client.get(f"/analysis/{MOCK_RUN_ID}")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"abc"'
+
+    response = client.get(f"/analysis/{MOCK_RUN_ID}", headers={"If-None-Match": 'W/"old", "abc"'})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"abc"'
+    mock_storage["get"].assert_called_once()
+
+    assert client.get(f"/analysis/{MOCK_RUN_ID}", headers={"If-None-Match": '"old"'}).status_code == 200
+
+def test_get_analysis_updates_since_cursor():
+    updates = {"run_id": MOCK_RUN_ID, "status": "RUNNING", "events": [{"type": "AGENT_STARTED"}], "artifacts": [], "cursor": "120.0"}
+    with patch("src.api.server.get_run_updates", return_value=updates) as mock_updates:
+        response = client.get(f"/analysis/{MOCK_RUN_ID}/updates", params={"since": "60.0"})
+
+    assert response.status_code == 200
+    assert response.json() == updates
+    mock_updates.assert_called_once_with(MOCK_RUN_ID, "60.0")
+
+def test_get_analysis_updates_errors():
+    with patch("src.api.server.get_run_updates", side_effect=ValueError("Invalid cursor: x")):
+        assert client.get(f"/analysis/{MOCK_RUN_ID}/updates", params={"since": "x"}).status_code == 400
+    with patch("src.api.server.get_run_updates", return_value=None):
+        assert client.get(f"/analysis/{MOCK_RUN_ID}/updates").status_code == 404
+
 def test_list_analyses(mock_storage):
     mock_list = [{"run_id": "1"}, {"run_id": "2"}]
-    mock_storage["list"].return_value = mock_list
+    mock_storage["list"].return_value = (mock_list, None)
     
     response = client.get("/analysis")
     
     assert response.status_code == 200
     assert response.json() == mock_list
+    assert "X-Next-Cursor" not in response.headers
+
+def test_list_analyses_pages_with_cursor_and_status(mock_storage):
+    mock_storage["list"].return_value = ([{"run_id": "1"}], "next-page")
+
+    response = client.get("/analysis", params={"limit": 1, "cursor": "page", "status": ["FAILED", "COMPLETED"]})
+
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == "next-page"
+    mock_storage["list"].assert_called_once_with(1, "page", ["FAILED", "COMPLETED"])
+
+def test_list_analyses_rejects_bad_cursor(mock_storage):
+    mock_storage["list"].side_effect = ValueError("Invalid cursor: bad")
+
+    response = client.get("/analysis", params={"cursor": "bad"})
+
+    assert response.status_code == 400
 
 def test_export_analysis_markdown(mock_storage):
     # Mock run data
     mock_storage["get"].return_value = {"run_id": MOCK_RUN_ID, "has_report": True}
     
-    # Mock report file content
+    # Mock stored report
     mock_report = {
         "meta": {
             "run_id": MOCK_RUN_ID,
@@ -118,22 +214,93 @@ def test_export_analysis_markdown(mock_storage):
         "sources": []
     }
     
-    # Mock file operations
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        # Setup mock file handle
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
-        
-        # Setup json.load to return our mock report
-        with patch("json.load", return_value=mock_report):
-            # We also need to mock path.exists()
-            mock_path = MagicMock()
-            mock_path.exists.return_value = True
-            mock_storage["dir"].return_value = MagicMock()
-            mock_storage["dir"].return_value.__truediv__.return_value = mock_path
-            
-            response = client.get(f"/analysis/{MOCK_RUN_ID}/export.md")
-            
-            assert response.status_code == 200
-            assert "# Test Idea" in response.text
-            assert "Verdict: 🟢 PURSUE" in response.text
+    mock_storage["report"].return_value = ClarityReport.model_validate(mock_report)
+    
+    response = client.get(f"/analysis/{MOCK_RUN_ID}/export.md")
+    
+    assert response.status_code == 200
+    assert "# Test Idea" in response.text
+    assert "Verdict: 🟢 PURSUE" in response.text
+
+    mock_storage["etag"].return_value = '"abc"'
+    response = client.get(f"/analysis/{MOCK_RUN_ID}/export.md", headers={"If-None-Match": '"abc"'})
+    assert response.status_code == 304
+
+def test_retry_analysis_restarts_failed_run(mock_storage):
+    mock_storage["get"].return_value = {"run_id": MOCK_RUN_ID, "status": "FAILED", "idea_text": MOCK_IDEA}
+
+    with patch("src.api.server.update_run_status") as mock_update:
+        response = client.post(f"/analysis/{MOCK_RUN_ID}/retry")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "retrying"}
+    mock_update.assert_called_once_with(MOCK_RUN_ID, "RUNNING")
+    mock_storage["run_analysis"].assert_called_once_with(MOCK_RUN_ID, MOCK_IDEA)
+
+def test_retry_analysis_rejects_completed_run(mock_storage):
+    mock_storage["get"].return_value = {"run_id": MOCK_RUN_ID, "status": "COMPLETED", "idea_text": MOCK_IDEA}
+
+    response = client.post(f"/analysis/{MOCK_RUN_ID}/retry")
+
+    assert response.status_code == 400
+    mock_storage["run_analysis"].assert_not_called()
+
+MOCK_INTERVIEW = Interview(
+    questions=[Question(id="1", text="Who pays?"), Question(id="2", text="Why now?")],
+    answers={"1": "Spaces", "2": "Remote work"},
+)
+
+def test_feedback_changes_only_the_given_answers(mock_storage):
+    mock_storage["get"].return_value = {"run_id": MOCK_RUN_ID, "status": "COMPLETED", "idea_text": MOCK_IDEA}
+
+    with patch("src.api.server.get_interview", return_value=MOCK_INTERVIEW.model_copy(deep=True)), \
+         patch("src.api.server.save_interview") as mock_save, \
+         patch("src.api.server.update_run_status"):
+        response = client.post(f"/analysis/{MOCK_RUN_ID}/feedback", json={"answers": {"1": "Workers"}})
+
+    assert response.status_code == 200
+    assert mock_save.call_args[0][1].answers == {"1": "Workers", "2": "Remote work"}
+    mock_storage["run_analysis"].assert_called_once_with(MOCK_RUN_ID, MOCK_IDEA)
+
+def test_fork_analysis_with_edited_idea_and_answer(mock_storage):
+    mock_storage["get"].return_value = {"run_id": MOCK_RUN_ID, "status": "COMPLETED", "idea_text": MOCK_IDEA}
+
+    with patch("src.api.server.fork_run", return_value="forked-run-id") as mock_fork, \
+         patch("src.api.server.get_interview", return_value=MOCK_INTERVIEW.model_copy(deep=True)), \
+         patch("src.api.server.save_interview") as mock_save, \
+         patch("src.api.server.update_run_status") as mock_update:
+        response = client.post(f"/analysis/{MOCK_RUN_ID}/fork", json={"idea": "An edited idea", "answers": {"2": ""}})
+
+    assert response.status_code == 200
+    assert response.json() == {"run_id": "forked-run-id", "forked_from": MOCK_RUN_ID}
+    mock_fork.assert_called_once_with(MOCK_RUN_ID, "An edited idea")
+    assert mock_save.call_args[0][1].answers == {"1": "Spaces"}
+    mock_update.assert_called_once_with("forked-run-id", "RUNNING")
+    mock_storage["run_analysis"].assert_called_once_with("forked-run-id", "An edited idea")
+
+def test_fork_analysis_not_found(mock_storage):
+    mock_storage["get"].return_value = None
+
+    response = client.post(f"/analysis/{MOCK_RUN_ID}/fork", json={})
+
+    assert response.status_code == 404
+
+def test_get_analysis_status_exposes_partial_outputs(mock_storage):
+    mock_storage["get"].return_value = {
+        "run_id": MOCK_RUN_ID,
+        "status": "RUNNING",
+        "has_report": False,
+        "events": [
+            {"type": "AGENT_STARTED", "agent": "PlannerAgent"},
+            {"type": "AGENT_OUTPUT_DELTA", "agent": "PlannerAgent", "seq": 0, "delta": "Remote"},
+            {"type": "AGENT_FINISHED", "agent": "PlannerAgent"},
+            {"type": "AGENT_STARTED", "agent": "MarketAgent"},
+            {"type": "AGENT_OUTPUT_DELTA", "agent": "MarketAgent", "seq": 0, "delta": '{"audience": '},
+            {"type": "AGENT_OUTPUT_DELTA", "agent": "MarketAgent", "seq": 1, "delta": '{"primary_users"'},
+        ],
+    }
+
+    response = client.get(f"/analysis/{MOCK_RUN_ID}")
+
+    assert response.status_code == 200
+    assert response.json()["partial_outputs"] == {"MarketAgent": '{"audience": {"primary_users"'}
@@ -0,0 +1,316 @@
+"""
+Micro-benchmarks for run storage, report rendering/validation and a full pipeline run on
+the fake model backend.
+
+Skipped unless CLARITY_BENCH=1. Scales are comma-separated lists, e.g.
+
+    CLARITY_BENCH=1 CLARITY_BENCH_RUNS=1000,100000,1000000 CLARITY_BENCH_EVENTS=100,100000 \
+        python -m pytest tests/test_benchmarks.py -q --no-cov
+
+Results (ops/sec and latency percentiles per operation and scale) are written as JSON to
+CLARITY_BENCH_OUTPUT. When CLARITY_BENCH_BASELINE points at an earlier results file, an
+operation whose p50 got slower than CLARITY_BENCH_MAX_REGRESSION fails the run.
+"""
+import os
+import json
+import time
+import random
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import pytest
+
+from src.agents import registry as registry_module
+from src.agents.pipeline import run_analysis
+from src.contracts.clarity_report import AgentArtifact, ClarityReport
+from src.renderers.report_to_markdown import render_report_md
+from src.storage import runs
+
+pytestmark = pytest.mark.skipif(os.getenv("CLARITY_BENCH") != "1", reason="set CLARITY_BENCH=1 to run benchmarks")
+
+def _scales(name: str, default: str) -> List[int]:
+    return [int(value) for value in os.getenv(name, default).split(",") if value.strip()]
+
+# Run directories in the synthetic store, events per run log, and list length in reports
+BENCH_RUNS = _scales("CLARITY_BENCH_RUNS", "1000,10000")
+BENCH_EVENTS = _scales("CLARITY_BENCH_EVENTS", "100,10000")
+BENCH_REPORT_ITEMS = _scales("CLARITY_BENCH_REPORT_ITEMS", "5,500")
+# Each measurement stops after this many samples or this many seconds, whichever is first
+BENCH_ITERATIONS = int(os.getenv("CLARITY_BENCH_ITERATIONS", "200"))
+BENCH_SECONDS = float(os.getenv("CLARITY_BENCH_SECONDS", "2"))
+BENCH_OUTPUT = os.getenv("CLARITY_BENCH_OUTPUT", "bench_results.json")
+BENCH_BASELINE = os.getenv("CLARITY_BENCH_BASELINE")
+BENCH_MAX_REGRESSION = float(os.getenv("CLARITY_BENCH_MAX_REGRESSION", "0.25"))
+
+WORDS = "market users platform growth pricing remote teams pilot launch retention channel demand".split()
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def measure(fn: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Times `fn` repeatedly (after an untimed warm-up call) and summarises the samples.
+    """
+    fn()
+    samples: List[float] = []
+    deadline = time.perf_counter() + BENCH_SECONDS
+    while len(samples) < 3 or (len(samples) < BENCH_ITERATIONS and time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "samples": len(samples),
+        "ops_per_sec": len(samples) / sum(samples) if sum(samples) else float("inf"),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _key(result: Dict[str, Any]) -> str:
+    return f"{result['operation']}[{','.join(f'{k}={v}' for k, v in sorted(result['params'].items()))}]"
+
+def _regressions(results: List[Dict[str, Any]], baseline_path: str) -> List[str]:
+    with open(baseline_path, "r") as f:
+        baseline = {_key(result): result for result in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        before = baseline.get(_key(result))
+        if before and result["p50_ms"] > before["p50_ms"] * (1 + BENCH_MAX_REGRESSION):
+            regressions.append(f"{_key(result)}: p50 {before['p50_ms']:.3f}ms -> {result['p50_ms']:.3f}ms")
+    return regressions
+
+@pytest.fixture(scope="module")
+def bench_results():
+    results: List[Dict[str, Any]] = []
+    yield results
+
+    document = {
+        "commit": _commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(BENCH_OUTPUT, "w") as f:
+        json.dump(document, f, indent=2)
+
+    if BENCH_BASELINE:
+        regressions = _regressions(results, BENCH_BASELINE)
+        assert not regressions, "Benchmark regressions:\n" + "\n".join(regressions)
+
+@pytest.fixture
+def record(bench_results):
+    def _record(operation: str, stats: Dict[str, float], **params: Any) -> None:
+        bench_results.append({"operation": operation, "params": params, **stats})
+    return _record
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    runs.DATA_DIR.mkdir()
+    return runs.DATA_DIR
+
+def _artifact(agent_name: str, rng: random.Random, started_at: datetime) -> AgentArtifact:
+    return AgentArtifact(
+        agent_name=agent_name,
+        started_at=started_at,
+        finished_at=started_at + timedelta(seconds=rng.uniform(1, 20)),
+        input_summary=_text(rng, 20),
+        output_markdown=_text(rng, 200),
+        output_json={"items": [_text(rng, 8) for _ in range(10)]},
+        model="gpt-4o",
+        input_tokens=rng.randint(500, 3000),
+        output_tokens=rng.randint(100, 800),
+        cost_usd=0.01,
+    )
+
+def _event(rng: random.Random, timestamp: datetime) -> Dict[str, Any]:
+    return {
+        "type": rng.choice(["AGENT_STARTED", "AGENT_FINISHED", "AGENT_DELTA"]),
+        "agent": rng.choice(["PlannerAgent", "MarketAgent", "RiskAgent"]),
+        "timestamp": timestamp.isoformat(),
+    }
+
+def populate_runs(data_dir: Path, count: int, events_per_run: int = 6, artifacts_per_run: int = 0, seed: int = 0) -> List[str]:
+    """
+    Writes `count` synthetic run directories in the layout of src.storage.runs, directly
+    (not through create_run) so that large stores are quick to build.
+    """
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    run_ids = []
+    for i in range(count):
+        run_id = f"bench-{i:07d}"
+        run_dir = data_dir / run_id
+        (run_dir / "artifacts").mkdir(parents=True)
+        created_at = base + timedelta(seconds=i)
+        with open(run_dir / "run.json", "w") as f:
+            json.dump({
+                "run_id": run_id,
+                "idea_text": _text(rng, 12),
+                "created_at": created_at.isoformat(),
+                "status": rng.choice(["COMPLETED", "FAILED", "WAITING_FOR_INPUT"]),
+            }, f, indent=2)
+        with open(run_dir / "events.jsonl", "w") as f:
+            f.writelines(json.dumps(_event(rng, created_at)) + "\n" for _ in range(events_per_run))
+        for agent_name in ["PlannerAgent", "MarketAgent", "RiskAgent", "ExecutionAgent", "JudgeAgent"][:artifacts_per_run]:
+            with open(run_dir / "artifacts" / f"{agent_name.lower()}.json", "w") as f:
+                f.write(_artifact(agent_name, rng, created_at).model_dump_json(indent=2))
+        run_ids.append(run_id)
+    return run_ids
+
+def synthetic_report(items: int, seed: int = 0) -> ClarityReport:
+    """
+    A valid ClarityReport whose every list holds `items` entries.
+    """
+    rng = random.Random(seed)
+
+    def texts(words: int = 10) -> List[str]:
+        return [_text(rng, words) for _ in range(items)]
+
+    def score() -> Dict[str, Any]:
+        return {"score": round(rng.uniform(0, 10), 1), "reasoning": _text(rng, 25)}
+
+    return ClarityReport.model_validate({
+        "meta": {"run_id": "bench", "model": "gpt-4o"},
+        "idea": {"title": _text(rng, 3), "one_liner": _text(rng, 12), "expanded_summary": _text(rng, 120), "assumptions": texts()},
+        "audience": {
+            "primary_users": texts(3),
+            "jobs_to_be_done": texts(),
+            "personas": [{"name": _text(rng, 2), "description": _text(rng, 30)} for _ in range(items)],
+        },
+        "market": {"demand_signals": texts(), "competitors": texts(2), "positioning": _text(rng, 30)},
+        "risks": {"top_risks": texts(), "mitigations": texts()},
+        "execution": {"mvp_scope": texts(), "two_week_plan": texts(), "two_month_plan": texts()},
+        "recommendation": {
+            "verdict": "PURSUE",
+            "confidence": 0.8,
+            "rationale": _text(rng, 60),
+            "scores": {
+                "market_demand": score(),
+                "competitive_advantage": score(),
+                "technical_feasibility": score(),
+                "business_viability": score(),
+            },
+        },
+        "interview_evaluation": {
+            "summary": _text(rng, 60),
+            "evaluations": [
+                {
+                    "question_id": f"q{i}",
+                    "question_text": _text(rng, 10) + "?",
+                    "answer_text": _text(rng, 40),
+                    "analysis": _text(rng, 40),
+                    "suggestions": [_text(rng, 10)],
+                    "concerns": [_text(rng, 10)],
+                }
+                for i in range(items)
+            ],
+        },
+        "sources": [{"title": _text(rng, 4), "url": f"https://example.com/{i}", "snippet": _text(rng, 20)} for i in range(items)],
+    })
+
+@pytest.mark.parametrize("events", BENCH_EVENTS)
+def test_bench_append_event(data_dir, record, capsys, events):
+    run_id = populate_runs(data_dir, 1, events_per_run=events)[0]
+
+    stats = measure(lambda: runs.append_event(run_id, {"type": "AGENT_STARTED", "agent": "PlannerAgent"}))
+    capsys.readouterr()
+
+    record("append_event", stats, events=events)
+
+@pytest.mark.parametrize("events", BENCH_EVENTS)
+def test_bench_get_run(data_dir, record, events):
+    run_id = populate_runs(data_dir, 1, events_per_run=events, artifacts_per_run=5)[0]
+
+    stats = measure(lambda: runs.get_run(run_id))
+
+    assert len(runs.get_run(run_id)["events"]) == events
+    record("get_run", stats, events=events)
+
+@pytest.mark.parametrize("events", BENCH_EVENTS)
+def test_bench_get_run_updates(data_dir, record, events):
+    run_id = populate_runs(data_dir, 1, events_per_run=events, artifacts_per_run=5)[0]
+    cursor = runs.get_run(run_id)["cursor"]
+
+    stats = measure(lambda: runs.get_run_updates(run_id, cursor))
+
+    assert runs.get_run_updates(run_id, cursor)["events"] == []
+    record("get_run_updates", stats, events=events)
+
+def test_bench_save_artifact(data_dir, record):
+    run_id = populate_runs(data_dir, 1)[0]
+    artifact = _artifact("PlannerAgent", random.Random(0), datetime(2025, 1, 1))
+
+    stats = measure(lambda: runs.save_artifact(run_id, artifact))
+
+    record("save_artifact", stats)
+
+@pytest.mark.parametrize("count", BENCH_RUNS)
+def test_bench_list_runs(data_dir, record, count):
+    populate_runs(data_dir, count)
+
+    stats = measure(lambda: runs.list_runs(limit=50))
+
+    assert len(runs.list_runs(limit=50)) == min(50, count)
+    record("list_runs", stats, runs=count, limit=50)
+
+@pytest.mark.parametrize("items", BENCH_REPORT_ITEMS)
+def test_bench_render_report_md(record, items):
+    report = synthetic_report(items)
+
+    stats = measure(lambda: render_report_md(report))
+
+    record("render_report_md", stats, items=items)
+
+@pytest.mark.parametrize("items", BENCH_REPORT_ITEMS)
+def test_bench_validate_report(record, items):
+    payload = synthetic_report(items).model_dump_json()
+
+    stats = measure(lambda: ClarityReport.model_validate_json(payload))
+
+    record("validate_report", stats, items=items, bytes=len(payload))
+
+def test_bench_run_analysis_on_fake_backend(data_dir, record, capsys, monkeypatch):
+    monkeypatch.setattr(registry_module, "MODEL_BACKEND", "fake")
+    monkeypatch.setattr(registry_module, "_clients", None)
+    registry_module.registry.clear()
+    idea = "A marketplace for renting camera gear"
+
+    def analyse():
+        # A run stops at the interview on its first pass; answering it and running again
+        # gives a complete report
+        run_id = runs.create_run(idea)
+        run_analysis(run_id, idea)
+        interview = runs.get_interview(run_id)
+        interview.answers = {q.id: "Photographers pay a booking fee" for q in interview.questions}
+        runs.save_interview(run_id, interview)
+        assert run_analysis(run_id, idea) is not None
+
+    try:
+        with patch("src.agents.pipeline.get_response_cache", return_value=None):
+            stats = measure(analyse)
+    finally:
+        registry_module.registry.clear()
+    capsys.readouterr()
+
+    record("run_analysis_fake_backend", stats)
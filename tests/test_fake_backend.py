@@ -0,0 +1,110 @@
+import json
+import random
+from unittest.mock import patch
+
+import pytest
+
+from src.agents import registry as registry_module
+from src.agents.fake_backend import Distribution, FakeModelBackend, FakeOpenAITransport, fake_content
+from src.agents.http_client import httpx
+from src.agents.pipeline import _parse_market, run_analysis
+from src.contracts.clarity_report import Execution, Idea, InterviewEvaluation, Recommendation, Risks
+from src.prompts.agent_prompts import AgentPrompts
+from src.storage import runs
+
+
+def _request(body):
+    return httpx.Request("POST", "https://api.openai.com/v1/chat/completions", content=json.dumps(body).encode())
+
+@pytest.mark.parametrize("model", [Idea, Risks, Execution, Recommendation, InterviewEvaluation])
+def test_fake_content_is_schema_valid(model):
+    body = {"response_format": {"type": "json_schema", "json_schema": {"name": model.__name__, "schema": {}}}}
+
+    model.model_validate_json(fake_content(body, random.Random(1), 100))
+
+def test_fake_content_answers_market_agent_with_market_dict():
+    body = {"messages": [{"role": "system", "content": AgentPrompts.MARKET_AGENT_INSTRUCTIONS}]}
+
+    audience, market = _parse_market(json.loads(fake_content(body, random.Random(1), 100)))
+
+    assert market.positioning
+
+def test_fake_backend_is_deterministic_for_a_seed():
+    body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hello"}]}
+    first = FakeModelBackend(seed=1).plan(_request(body))[1].json()
+    second = FakeModelBackend(seed=1).plan(_request(body))[1].json()
+
+    assert first["choices"][0]["message"]["content"] == second["choices"][0]["message"]["content"]
+
+def test_fake_backend_injects_failures_and_latency():
+    backend = FakeModelBackend(latency="constant:0.25", failure_rate=1.0, failure_status=429)
+
+    delay, response = backend.plan(_request({"model": "gpt-4o", "messages": []}))
+
+    assert delay == 0.25
+    assert response.status_code == 429
+
+def test_distribution_specs():
+    rng = random.Random(0)
+    assert Distribution("constant:2").sample(rng) == 2
+    assert 1 <= Distribution("uniform:1,3").sample(rng) <= 3
+    assert Distribution("normal:-5,0.1").sample(rng) == 0  # clamped
+    with pytest.raises(ValueError):
+        Distribution("pareto:1")
+
+def test_run_analysis_end_to_end_on_fake_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry_module, "MODEL_BACKEND", "fake")
+    monkeypatch.setattr(registry_module, "_clients", None)
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    registry_module.registry.clear()
+    try:
+        with patch("src.agents.pipeline.get_response_cache", return_value=None):
+            run_id = runs.create_run("A marketplace for renting camera gear")
+            assert run_analysis(run_id, "A marketplace for renting camera gear") is None
+
+            interview = runs.get_interview(run_id)
+            interview.answers = {q.id: "Photographers pay a booking fee" for q in interview.questions}
+            runs.save_interview(run_id, interview)
+            report = run_analysis(run_id, "A marketplace for renting camera gear")
+    finally:
+        registry_module.registry.clear()
+
+    assert report is not None
+    assert report.interview_evaluation is not None
+    assert runs.get_run(run_id)["usage"]["input_tokens"] > 0
+
+def test_fork_reuses_every_stage_its_edits_leave_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry_module, "MODEL_BACKEND", "fake")
+    monkeypatch.setattr(registry_module, "_clients", None)
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    registry_module.registry.clear()
+    idea = "A marketplace for renting camera gear"
+    try:
+        with patch("src.agents.pipeline.get_response_cache", return_value=None):
+            run_id = runs.create_run(idea)
+            run_analysis(run_id, idea)
+            interview = runs.get_interview(run_id)
+            interview.answers = {q.id: "Photographers pay a booking fee" for q in interview.questions}
+            runs.save_interview(run_id, interview)
+            report = run_analysis(run_id, idea)
+
+            fork_id = runs.fork_run(run_id)
+            fork_report = run_analysis(fork_id, idea)
+    finally:
+        registry_module.registry.clear()
+
+    assert runs.get_run(fork_id)["forked_from"] == run_id
+    assert fork_report.recommendation == report.recommendation
+    # Every stage came from the copied artifacts: the fork never called a model
+    assert "usage" not in runs.get_run(fork_id)
+    events = runs.get_run(fork_id)["events"]
+    assert not [event for event in events if event["type"] == "AGENT_STARTED"]
+
+def test_fake_transport_streams_sse():
+    transport = FakeOpenAITransport(FakeModelBackend())
+
+    response = transport.handle_request(_request({"model": "gpt-4o", "messages": [], "stream": True}))
+
+    lines = [line for line in response.read().decode().split("\n\n") if line]
+    assert lines[-1] == "data: [DONE]"
+    assert json.loads(lines[0][len("data: "):])["object"] == "chat.completion.chunk"
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.agents.hedging import HedgeBudget, LatencyTracker, acall_with_hedge, call_with_hedge
+
+
+def test_latency_tracker_seeds_from_artifacts_and_records():
+    loader_calls = []
+
+    def loader(agent_name, limit):
+        loader_calls.append(agent_name)
+        return [float(i) for i in range(10, 0, -1)]  # newest first
+
+    tracker = LatencyTracker(loader=loader)
+
+    assert tracker.percentile("MarketAgent", 90, min_samples=5) == 9.0
+    tracker.record("MarketAgent", 100.0)
+    assert tracker.percentile("MarketAgent", 100, min_samples=5) == 100.0
+    assert tracker.percentile("MarketAgent", 50, min_samples=50) is None
+    assert loader_calls == ["MarketAgent"]
+
+def test_hedge_budget_caps_fraction_of_calls():
+    budget = HedgeBudget(fraction=0.5)
+    budget.call()
+    budget.call()
+
+    assert budget.try_hedge()
+    assert not budget.try_hedge()
+
+def test_call_with_hedge_returns_first_result():
+    release_primary = threading.Event()
+    calls = []
+    hedges = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release_primary.wait(2)
+            return "primary"
+        return "hedge"
+
+    with patch("src.agents.hedging.budget", HedgeBudget(fraction=1.0)):
+        result = call_with_hedge("MarketAgent", fn, hedge_after=0.01, on_hedge=lambda: hedges.append(1))
+    release_primary.set()
+
+    assert result == "hedge"
+    assert hedges == [1]
+
+def test_call_with_hedge_skips_hedge_without_budget():
+    def fn():
+        time.sleep(0.05)
+        return "primary"
+
+    with patch("src.agents.hedging.budget", HedgeBudget(fraction=0.0)):
+        assert call_with_hedge("MarketAgent", fn, hedge_after=0.01) == "primary"
+
+def test_call_with_hedge_enforces_deadline():
+    release = threading.Event()
+
+    with pytest.raises(TimeoutError, match="RiskAgent exceeded"):
+        call_with_hedge("RiskAgent", lambda: release.wait(2), deadline=0.05)
+    release.set()
+
+async def test_acall_with_hedge_cancels_loser():
+    cancelled = []
+
+    async def fn():
+        if not cancelled:
+            cancelled.append(False)
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled[0] = True
+                raise
+            return "primary"
+        return "hedge"
+
+    with patch("src.agents.hedging.budget", HedgeBudget(fraction=1.0)):
+        result = await acall_with_hedge("MarketAgent", fn, hedge_after=0.01)
+    await asyncio.sleep(0)
+
+    assert result == "hedge"
+    assert cancelled == [True]
+
+async def test_acall_with_hedge_enforces_deadline():
+    with pytest.raises(TimeoutError):
+        await acall_with_hedge("RiskAgent", lambda: asyncio.sleep(5), deadline=0.05)
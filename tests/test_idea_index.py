@@ -0,0 +1,64 @@
+import time
+import random
+import string
+
+from src.storage import runs
+from src.storage.idea_index import IdeaIndex
+from utils.retrieval import MinHasher, MinHashLSH, similarity
+
+
+def test_rewordings_are_similar_and_different_ideas_are_not():
+    hasher = MinHasher()
+    idea = hasher.signature("A platform for connecting remote workers with co-working spaces.")
+
+    assert similarity(idea, hasher.signature("A platform connecting remote workers to coworking spaces nearby")) >= 0.5
+    assert similarity(idea, hasher.signature("A marketplace for renting camera gear")) < 0.2
+
+def test_lsh_query_and_remove():
+    hasher = MinHasher()
+    lsh = MinHashLSH()
+    lsh.add("desks", hasher.signature("Book desks in co-working spaces for remote workers"))
+    lsh.add("cameras", hasher.signature("A marketplace for renting camera gear"))
+
+    matches = lsh.query(hasher.signature("Book desks in coworking spaces for remote workers"), threshold=0.5)
+    assert [key for key, _ in matches] == ["desks"]
+
+    lsh.remove("desks")
+    assert lsh.query(hasher.signature("Book desks in coworking spaces for remote workers"), threshold=0.5) == []
+
+def test_index_picks_up_entries_written_by_another_process(tmp_path):
+    path = tmp_path / "ideas.jsonl"
+    writer, reader = IdeaIndex(path), IdeaIndex(path)
+
+    writer.add("run-1", "A marketplace for renting camera gear")
+
+    assert [run_id for run_id, _ in reader.similar("Marketplace for renting camera gear")] == ["run-1"]
+
+def test_find_similar_runs_indexes_new_and_existing_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    existing = runs.create_run("A marketplace for renting camera gear")
+    # Drop the index so it has to be rebuilt from run.json files
+    runs._indexes.clear()
+    (tmp_path / ".index" / "ideas.jsonl").unlink()
+
+    new = runs.create_run("An app that helps freelancers track invoices and get paid faster")
+
+    assert [r["run_id"] for r in runs.find_similar_runs("A marketplace for renting camera gear!")] == [existing]
+    (match,) = runs.find_similar_runs("App helping freelancers to track their invoices and get paid quicker")
+    assert match["run_id"] == new
+    assert match["status"] == "STARTED"
+    assert match["has_report"] is False
+
+def test_lookup_is_sub_millisecond(tmp_path):
+    rng = random.Random(0)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))) for _ in range(3000)]
+    ideas = [" ".join(rng.sample(words, 10)) for _ in range(2000)]
+    index = IdeaIndex(tmp_path / "ideas.jsonl")
+    index.rebuild((f"run-{i}", idea) for i, idea in enumerate(ideas))
+    index.similar(ideas[0])
+
+    start = time.perf_counter()
+    for idea in ideas[:100]:
+        assert index.similar(idea)[0][1] == 1.0
+
+    assert (time.perf_counter() - start) / 100 < 0.001
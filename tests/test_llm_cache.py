@@ -0,0 +1,89 @@
+import time
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+from src.agents.pipeline import PlannerAgent
+from src.contracts.clarity_report import Idea
+from src.storage.llm_cache import ResponseCache, make_cache_key
+
+MOCK_IDEA_OBJ = Idea(
+    title="RemoteWorkConnect",
+    one_liner="Airbnb for co-working spaces",
+    expanded_summary="A platform that allows remote workers to find and book desks.",
+    assumptions=[]
+)
+
+
+def test_cache_key_depends_on_model_instructions_schema_and_prompt():
+    base = make_cache_key("gpt-4o", "Be terse", Idea, "Analyze this idea: desks")
+
+    assert base == make_cache_key("gpt-4o", "Be terse", Idea, "Analyze  this idea:\ndesks")
+    assert base != make_cache_key("gpt-4o-mini", "Be terse", Idea, "Analyze this idea: desks")
+    assert base != make_cache_key("gpt-4o", "Be verbose", Idea, "Analyze this idea: desks")
+    assert base != make_cache_key("gpt-4o", "Be terse", None, "Analyze this idea: desks")
+    assert base != make_cache_key("gpt-4o", "Be terse", Idea, "Analyze this idea: boats")
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+
+    assert cache.get("k") is None
+    cache.put("k", {"title": "x"})
+    assert cache.get("k") == {"title": "x"}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    # Counters are shared through the database with other processes using the same file
+    other = ResponseCache(tmp_path / "cache.sqlite")
+    other.get("k")
+    assert other.stats()["total_hits"] == 2
+
+def test_cache_expires_entries_after_ttl(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", ttl_seconds=0.01)
+    cache.put("k", "value")
+    time.sleep(0.02)
+
+    assert cache.get("k") is None
+    # Reads never write; the expired entry is deleted by the next put
+    cache.put("other", "value")
+    assert cache.stats()["entries"] == 1
+
+def test_cache_reads_do_not_take_the_write_lock(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", flush_seconds=3600)
+    cache.put("k", "value")
+    writer = sqlite3.connect(tmp_path / "cache.sqlite", isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        # Another worker holding the write lock does not hold up reads
+        assert cache.get("k") == "value"
+        assert cache.get("missing") is None
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+    # What the reads gathered is written later, in one transaction
+    assert cache.stats()["total_hits"] == 1
+    assert cache.stats()["total_misses"] == 1
+
+def test_cache_evicts_least_recently_used_over_budget(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=30)
+    cache.put("old", "a" * 10)
+    cache.put("recent", "b" * 10)
+    cache.get("old")
+    cache.put("new", "c" * 10)
+
+    assert cache.get("recent") is None
+    assert cache.get("old") == "a" * 10
+    assert cache.get("new") == "c" * 10
+
+def test_pipeline_agent_replays_cached_temperature_zero_calls(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    planner = PlannerAgent()
+
+    with patch("src.agents.pipeline.get_response_cache", return_value=cache), \
+         patch.object(planner.agent, "run", return_value=MagicMock(content=MOCK_IDEA_OBJ)) as mock_run:
+        first = planner.run("desks for remote workers")
+        second = planner.run("desks for remote workers")
+
+    assert first == second == MOCK_IDEA_OBJ
+    mock_run.assert_called_once()
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.server import app
+from utils.telemetry.metrics import AGGREGATE_SNAPSHOT, Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_render_counter_gauge_and_histogram():
+    registry = MetricsRegistry(directory="")
+    runs = Counter("runs_total", "Runs", ["status"], registry=registry)
+    in_flight = Gauge("in_flight", "In flight", registry=registry)
+    latency = Histogram("latency_seconds", "Latency", ["agent"], buckets=(1, 5), registry=registry)
+
+    runs.inc(status="COMPLETED")
+    runs.inc(2, status="FAILED")
+    with in_flight.track():
+        in_flight.inc()
+    latency.observe(0.5, agent="Planner")
+    latency.observe(3, agent="Planner")
+    latency.observe(9, agent="Planner")
+
+    text = registry.render()
+
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{status="FAILED"} 2.0' in text
+    assert "in_flight 1.0" in text
+    assert 'latency_seconds_bucket{agent="Planner",le="1.0"} 1.0' in text
+    assert 'latency_seconds_bucket{agent="Planner",le="5.0"} 2.0' in text
+    assert 'latency_seconds_bucket{agent="Planner",le="+Inf"} 3.0' in text
+    assert 'latency_seconds_count{agent="Planner"} 3.0' in text
+
+def test_labels_must_match():
+    registry = MetricsRegistry(directory="")
+    runs = Counter("runs_total", "Runs", ["status"], registry=registry)
+
+    with pytest.raises(ValueError):
+        runs.inc(outcome="COMPLETED")
+
+def test_snapshots_from_other_workers_are_merged(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    runs = Counter("runs_total", "Runs", ["status"], registry=registry)
+    in_flight = Gauge("in_flight", "In flight", registry=registry)
+    runs.inc(status="COMPLETED")
+    in_flight.set(2)
+    registry.flush()
+
+    # A worker that has exited since: its counters still count, its gauges do not
+    with open(tmp_path / "999999999-0.json", "w") as f:
+        json.dump({"pid": 999999999, "metrics": {
+            "runs_total": [[["COMPLETED"], 4.0]],
+            "in_flight": [[[], 7.0]],
+        }}, f)
+
+    text = registry.render()
+
+    assert 'runs_total{status="COMPLETED"} 5.0' in text
+    assert "in_flight 2.0" in text
+
+def test_snapshots_of_exited_workers_are_folded_at_startup(tmp_path):
+    (tmp_path / "999999998-0.json").write_text(json.dumps({"pid": 999999998, "metrics": {"runs_total": [[["COMPLETED"], 4.0]]}}))
+    (tmp_path / "999999999-0.json").write_text(json.dumps({"pid": 999999999, "metrics": {
+        "runs_total": [[["COMPLETED"], 2.0]],
+        "in_flight": [[[], 7.0]],
+    }}))
+    registry = MetricsRegistry(directory=str(tmp_path))
+    runs = Counter("runs_total", "Runs", ["status"], registry=registry)
+    Gauge("in_flight", "In flight", registry=registry)
+    runs.inc(status="COMPLETED")
+
+    text = registry.render()
+
+    # Counters of exited workers keep counting, so a restarted worker does not reset totals
+    assert 'runs_total{status="COMPLETED"} 7.0' in text
+    assert "in_flight 7.0" not in text
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == sorted([AGGREGATE_SNAPSHOT, registry._snapshot_path().name])
+
+    # A worker that exits later is folded in on top of the aggregate by the next to start
+    (tmp_path / "999999997-0.json").write_text(json.dumps({"pid": 999999997, "metrics": {"runs_total": [[["COMPLETED"], 3.0]]}}))
+    restarted = MetricsRegistry(directory=str(tmp_path))
+    Counter("runs_total", "Runs", ["status"], registry=restarted)
+
+    assert 'runs_total{status="COMPLETED"} 10.0' in restarted.render()
+    assert not (tmp_path / "999999997-0.json").exists()
+
+def test_snapshots_are_written_in_the_background(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path), flush_interval=0.01)
+    runs = Counter("runs_total", "Runs", ["status"], registry=registry)
+    writers = []
+    flush = registry.flush
+    registry.flush = lambda: (writers.append(threading.current_thread()), flush())
+
+    runs.inc(status="COMPLETED")
+
+    deadline = time.monotonic() + 5
+    while not writers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writers and threading.current_thread() not in writers
+
+def test_timer_decorator_observes_each_call():
+    registry = MetricsRegistry(directory="")
+    latency = Histogram("op_seconds", "Latency", ["operation"], registry=registry)
+
+    @latency.time(operation="save")
+    def save():
+        return "saved"
+
+    assert save() == "saved"
+    save()
+
+    assert 'op_seconds_count{operation="save"} 2.0' in registry.render()
+
+def test_metrics_endpoint():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE clarity_agent_duration_seconds histogram" in response.text
+    assert "# TYPE clarity_runs_in_flight gauge" in response.text
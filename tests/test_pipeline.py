@@ -1,8 +1,15 @@
+import asyncio
+import time
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import ANY, patch, MagicMock, AsyncMock
 from datetime import datetime
-from src.agents.pipeline import run_analysis, PlannerAgent, MarketAgent, RiskAgent, ExecutionAgent, JudgeAgent
-from src.contracts.clarity_report import Idea, Audience, Market, Risks, Execution, Recommendation, Verdict, Scores, ScoreDetail, InterviewEvaluation, AnswerEvaluation
+from agno.metrics import RunMetrics
+from agno.run.agent import RunContentEvent, RunOutput
+from src.agents.pipeline import run_analysis, arun_analysis, DeltaBuffer, PlannerAgent, MarketAgent, RiskAgent, ExecutionAgent, JudgeAgent
+from src.agents.hedging import HedgeBudget
+from src.agents.tokens import TokenUsage
+from src.contracts.clarity_report import Idea, Audience, Market, Risks, Execution, Recommendation, Verdict, Scores, ScoreDetail, InterviewEvaluation, AnswerEvaluation, Interview, Question
 
 # Mock Data
 MOCK_IDEA_TEXT = "A platform for connecting remote workers with co-working spaces."
@@ -69,18 +76,32 @@ MOCK_INTERVIEW_EVALUATION = InterviewEvaluation(
 def mock_storage():
     with patch("src.agents.pipeline.append_event") as mock_append, \
          patch("src.agents.pipeline.save_artifact") as mock_save_artifact, \
+         patch("src.agents.pipeline.get_artifact", return_value=None) as mock_get_artifact, \
          patch("src.agents.pipeline.save_report") as mock_save_report, \
          patch("src.agents.pipeline.save_interview") as mock_save_interview, \
          patch("src.agents.pipeline.get_run") as mock_get_run, \
          patch("src.agents.pipeline.get_interview") as mock_get_interview, \
+         patch("src.agents.pipeline.save_speculation") as mock_save_speculation, \
+         patch("src.agents.pipeline.get_speculation", return_value=None) as mock_get_speculation, \
+         patch("src.agents.pipeline.clear_speculation") as mock_clear_speculation, \
+         patch("src.agents.pipeline.get_usage", return_value={}) as mock_get_usage, \
+         patch("src.agents.pipeline.record_usage", return_value={}) as mock_record_usage, \
+         patch("src.agents.pipeline.get_related_findings", return_value={}) as mock_get_related_findings, \
          patch("src.agents.pipeline.update_run_status") as mock_update_run_status:
         yield {
             "append_event": mock_append,
             "save_artifact": mock_save_artifact,
+            "get_artifact": mock_get_artifact,
             "save_report": mock_save_report,
             "save_interview": mock_save_interview,
             "get_run": mock_get_run,
             "get_interview": mock_get_interview,
+            "save_speculation": mock_save_speculation,
+            "get_speculation": mock_get_speculation,
+            "clear_speculation": mock_clear_speculation,
+            "get_usage": mock_get_usage,
+            "record_usage": mock_record_usage,
+            "get_related_findings": mock_get_related_findings,
             "update_run_status": mock_update_run_status
         }
 
@@ -122,6 +143,13 @@ def mock_agents():
         interview_evaluator_instance = MockInterviewEvaluator.return_value
         interview_evaluator_instance.run.return_value = MOCK_INTERVIEW_EVALUATION
         
+        # Mirror each sync return value on the async run path
+        for instance in (planner_instance, market_instance, risk_instance, execution_instance,
+                         judge_instance, interviewer_instance, interview_evaluator_instance):
+            instance.arun = AsyncMock(side_effect=lambda *args, _i=instance, **kwargs: _i.run(*args, **kwargs))
+            instance.model_id = "gpt-4o"
+            instance.usage.return_value = TokenUsage(100, 50, 0.001)
+
         yield {
             "planner": planner_instance,
             "market": market_instance,
@@ -146,8 +174,8 @@ def test_run_analysis_success(mock_storage, mock_agents):
     assert report.recommendation == MOCK_RECOMMENDATION_OBJ
     
     # Verify Agent Calls
-    mock_agents["planner"].run.assert_called_once_with(MOCK_IDEA_TEXT)
-    mock_agents["market"].run.assert_called_once_with(MOCK_IDEA_OBJ.expanded_summary)
+    mock_agents["planner"].run.assert_called_once_with(MOCK_IDEA_TEXT, on_cache_hit=ANY, on_usage=ANY)
+    mock_agents["market"].run.assert_called_once_with(MOCK_IDEA_OBJ.expanded_summary, on_cache_hit=ANY, on_usage=ANY)
     mock_agents["risk"].run.assert_called_once()
     mock_agents["execution"].run.assert_called_once()
     mock_agents["judge"].run.assert_called_once()
@@ -179,3 +207,412 @@ def test_run_analysis_failure(mock_storage, mock_agents):
     assert failure_call[0][1]["type"] == "RUN_FAILED"
     assert "Planner failed" in failure_call[0][1]["error"]
 
+
+def test_run_analysis_with_interview_runs_evaluator(mock_storage, mock_agents):
+    interview = Interview(
+        questions=[Question(id="1", text="Who pays?", guidance=None)],
+        answers={"1": "Co-working spaces pay a commission"}
+    )
+    mock_storage["get_interview"].return_value = interview
+
+    report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT, max_concurrency=2)
+
+    assert report is not None
+    assert report.interview_evaluation == MOCK_INTERVIEW_EVALUATION
+    mock_agents["interview_evaluator"].run.assert_called_once_with(interview, on_cache_hit=ANY, on_usage=ANY)
+    mock_agents["interviewer"].run.assert_not_called()
+    assert "Who pays?" in mock_agents["planner"].run.call_args[0][0]
+    # 5 chain agents + evaluator
+    assert mock_storage["save_artifact"].call_count == 6
+
+async def test_arun_analysis_success(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+
+    report = await arun_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is not None
+    assert report.recommendation == MOCK_RECOMMENDATION_OBJ
+    mock_agents["planner"].arun.assert_awaited_once_with(MOCK_IDEA_TEXT, on_cache_hit=ANY, on_usage=ANY)
+    mock_agents["judge"].arun.assert_awaited_once()
+    assert mock_storage["save_artifact"].call_count == 5
+    mock_storage["save_report"].assert_called_once()
+
+    calls = mock_storage["append_event"].call_args_list
+    assert calls[0][0][1]["type"] == "RUN_STARTED"
+    assert calls[-1][0][1]["type"] == "RUN_COMPLETED"
+
+async def test_arun_analysis_failure(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    mock_agents["market"].run.side_effect = Exception("Market failed")
+
+    report = await arun_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is None
+    failure_call = mock_storage["append_event"].call_args_list[-1]
+    assert failure_call[0][1]["type"] == "RUN_FAILED"
+    assert "Market failed" in failure_call[0][1]["error"]
+
+def test_run_analysis_resumes_from_checkpoints(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+    saved = {call[0][1].agent_name: call[0][1] for call in mock_storage["save_artifact"].call_args_list}
+
+    # Retry after the Judge failed: every other stage has a matching artifact on disk
+    del saved["JudgeAgent"]
+    mock_storage["get_artifact"].side_effect = lambda run_id, agent_name: saved.get(agent_name)
+    for agent in mock_agents.values():
+        agent.run.reset_mock()
+    mock_storage["save_artifact"].reset_mock()
+
+    report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is not None
+    assert report.market.positioning == MOCK_MARKET_DICT["market"]["positioning"]
+    mock_agents["planner"].run.assert_not_called()
+    mock_agents["market"].run.assert_not_called()
+    mock_agents["risk"].run.assert_not_called()
+    mock_agents["execution"].run.assert_not_called()
+    mock_agents["judge"].run.assert_called_once()
+    assert mock_storage["save_artifact"].call_count == 1
+
+def test_run_analysis_reruns_stages_whose_inputs_changed(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+    saved = {call[0][1].agent_name: call[0][1] for call in mock_storage["save_artifact"].call_args_list}
+    mock_storage["get_artifact"].side_effect = lambda run_id, agent_name: saved.get(agent_name)
+    mock_agents["planner"].run.reset_mock()
+
+    run_analysis(MOCK_RUN_ID, "A different idea")
+
+    mock_agents["planner"].run.assert_called_once_with("A different idea", on_cache_hit=ANY, on_usage=ANY)
+
+def test_run_analysis_grounds_market_and_risk_in_related_findings(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    mock_storage["get_related_findings"].return_value = {
+        "market": [{"run_id": "earlier", "score": 0.4, "title": "DeskHop", "competitors": ["WeWork", "Regus"], "demand_signals": []}],
+        "risks": [],
+    }
+
+    report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is not None
+    mock_storage["get_related_findings"].assert_called_once_with(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+    mock_agents["market"].run.assert_called_once_with(MOCK_IDEA_OBJ.expanded_summary, "- DeskHop: competitors: WeWork, Regus", on_cache_hit=ANY, on_usage=ANY)
+    mock_agents["risk"].run.assert_called_once_with(MOCK_IDEA_OBJ.expanded_summary, MOCK_MARKET_DICT["market"]["positioning"], on_cache_hit=ANY, on_usage=ANY)
+
+def test_run_analysis_logs_a_failed_findings_lookup_and_carries_on(mock_storage, mock_agents, caplog):
+    mock_storage["get_interview"].return_value = None
+    mock_storage["get_related_findings"].side_effect = OSError("index unreadable")
+
+    report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is not None
+    assert "Could not look up related findings" in caplog.text
+    mock_agents["market"].run.assert_called_once_with(MOCK_IDEA_OBJ.expanded_summary, on_cache_hit=ANY, on_usage=ANY)
+
+def test_edited_answer_recomputes_only_stages_whose_inputs_changed(mock_storage, mock_agents):
+    questions = [Question(id="1", text="Who pays?", guidance=None), Question(id="2", text="Why now?", guidance=None)]
+    mock_storage["get_interview"].return_value = Interview(questions=questions, answers={"1": "Spaces", "2": "Remote work"})
+    run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+    saved = {call[0][1].agent_name: call[0][1] for call in mock_storage["save_artifact"].call_args_list}
+    assert saved["MarketAgent"].input_hashes.keys() == {"idea", "findings"}
+
+    # Editing one answer changes the Planner's and the evaluator's input; the Planner
+    # comes back with the same idea, so nothing downstream of it is recomputed
+    mock_storage["get_interview"].return_value = Interview(questions=questions, answers={"1": "Workers", "2": "Remote work"})
+    mock_storage["get_artifact"].side_effect = lambda run_id, agent_name: saved.get(agent_name)
+    for agent in mock_agents.values():
+        agent.run.reset_mock()
+    mock_storage["append_event"].reset_mock()
+
+    assert run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT) is not None
+
+    mock_agents["planner"].run.assert_called_once()
+    mock_agents["interview_evaluator"].run.assert_called_once()
+    for name in ("market", "risk", "execution", "judge"):
+        mock_agents[name].run.assert_not_called()
+    started = [call[0][1] for call in mock_storage["append_event"].call_args_list if call[0][1]["type"] == "AGENT_STARTED"]
+    assert {event["agent"]: event["changed_inputs"] for event in started} == {
+        "PlannerAgent": ["interview"],
+        "InterviewEvaluatorAgent": ["interview"],
+    }
+
+def test_run_analysis_speculates_while_waiting_for_input(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    mock_agents["interviewer"].run.return_value = [{"text": "Who pays?", "guidance": None}]
+
+    with patch("src.agents.pipeline.SPECULATIVE_ENABLED", True):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is None
+    mock_storage["update_run_status"].assert_called_with(MOCK_RUN_ID, "WAITING_FOR_INPUT")
+    mock_agents["planner"].run.assert_called_once_with(MOCK_IDEA_TEXT, on_cache_hit=ANY, on_usage=ANY)
+    mock_agents["market"].run.assert_called_once()
+    mock_agents["risk"].run.assert_not_called()
+    assert mock_storage["save_speculation"].call_count == 2
+    # Speculation stays invisible to run progress
+    assert mock_storage["save_artifact"].call_count == 0
+    event_types = [call[0][1]["type"] for call in mock_storage["append_event"].call_args_list]
+    assert event_types[-1] == "WAITING_FOR_INPUT"
+
+@pytest.mark.parametrize("policy,answer,reused", [
+    ("similar", "Desks", True),
+    ("similar", "A long answer introducing lots of brand new context about pricing and payments", False),
+    ("never", "Desks", False),
+    ("always", "A long answer introducing lots of brand new context about pricing and payments", True),
+])
+def test_run_analysis_applies_speculation_policy_on_resume(mock_storage, mock_agents, policy, answer, reused):
+    interview = Interview(questions=[Question(id="1", text="What?", guidance=None)], answers={"1": answer})
+
+    # Speculative artifacts as produced while the run was waiting
+    mock_storage["get_interview"].return_value = None
+    mock_agents["interviewer"].run.return_value = [{"text": "What?", "guidance": None}]
+    with patch("src.agents.pipeline.SPECULATIVE_ENABLED", True):
+        run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+    speculative = {call[0][1].agent_name: call[0][1] for call in mock_storage["save_speculation"].call_args_list}
+    mock_storage["get_speculation"].side_effect = lambda run_id, agent_name: speculative.get(agent_name)
+
+    saved = {}
+    mock_storage["save_artifact"].side_effect = lambda run_id, artifact: saved.__setitem__(artifact.agent_name, artifact)
+    mock_storage["get_artifact"].side_effect = lambda run_id, agent_name: saved.get(agent_name)
+    mock_storage["get_interview"].return_value = interview
+    mock_agents["planner"].run.reset_mock()
+    mock_agents["market"].run.reset_mock()
+
+    with patch("src.agents.pipeline.SPECULATIVE_POLICY", policy):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is not None
+    assert mock_agents["planner"].run.called != reused
+    assert mock_agents["market"].run.called != reused
+    mock_storage["clear_speculation"].assert_called_with(MOCK_RUN_ID)
+
+def test_delta_buffer_coalesces_chunks():
+    buffer = DeltaBuffer("PlannerAgent", interval=60, max_chars=10)
+
+    assert buffer.add("Remote") is None
+    event = buffer.add("Work!")
+    assert event == {"type": "AGENT_OUTPUT_DELTA", "agent": "PlannerAgent", "seq": 0, "delta": "RemoteWork!"}
+    assert buffer.add("Co") is None
+    assert buffer.flush()["delta"] == "Co"
+    assert buffer.flush() is None
+
+def test_run_analysis_streams_agent_output(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+
+    def stream_market(*args, on_delta, on_cache_hit=None, on_usage=None):
+        for chunk in ['{"market": ', '{"positioning": ', '"Desks"}}']:
+            on_delta(chunk)
+        return MOCK_MARKET_DICT
+
+    def stream_questions(*args, on_delta, on_cache_hit=None, on_usage=None):
+        on_delta('{"questions": []}')
+        return []
+
+    mock_agents["market"].run.side_effect = stream_market
+    mock_agents["interviewer"].run.side_effect = stream_questions
+
+    with patch("src.agents.pipeline.STREAM_AGENT_OUTPUT", True):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT, max_concurrency=1)
+
+    assert report.market.positioning == MOCK_MARKET_DICT["market"]["positioning"]
+    # Agents with an output schema stream their JSON as well
+    mock_agents["planner"].run.assert_called_once_with(MOCK_IDEA_TEXT, on_delta=ANY, on_cache_hit=ANY, on_usage=ANY)
+    events = [call[0][1] for call in mock_storage["append_event"].call_args_list]
+    deltas = "".join(e["delta"] for e in events if e["type"] == "AGENT_OUTPUT_DELTA" and e["agent"] == "MarketAgent")
+    assert deltas == '{"market": {"positioning": "Desks"}}'
+    finished = events.index({"type": "AGENT_FINISHED", "agent": "MarketAgent", "model": "gpt-4o"})
+    assert max(i for i, e in enumerate(events) if e["type"] == "AGENT_OUTPUT_DELTA" and e["agent"] == "MarketAgent") < finished
+    interviewer_delta = {"type": "AGENT_OUTPUT_DELTA", "agent": "InterviewerAgent", "seq": 0, "delta": '{"questions": []}'}
+    assert events.index(interviewer_delta) < events.index({"type": "AGENT_FINISHED", "agent": "InterviewerAgent"})
+
+def test_pipeline_agent_stream_forwards_content_deltas():
+    market = MarketAgent()
+    stream = [
+        RunContentEvent(content='{"market": '),
+        RunContentEvent(content='{"positioning": "x"}}'),
+        RunOutput(content='{"market": {"positioning": "x"}}'),
+    ]
+    deltas = []
+
+    with patch("src.agents.pipeline.get_response_cache", return_value=None), \
+         patch.object(market.agent, "run", return_value=iter(stream)) as mock_run:
+        result = market.run("desks", on_delta=deltas.append)
+
+    assert result == {"market": {"positioning": "x"}}
+    assert deltas == ['{"market": ', '{"positioning": "x"}}']
+    assert mock_run.call_args.kwargs["stream"] is True
+
+async def test_arun_analysis_hedges_slow_stage(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    calls = []
+
+    async def slow_then_fast(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return MOCK_MARKET_DICT
+
+    mock_agents["market"].arun = AsyncMock(side_effect=slow_then_fast)
+
+    with patch("src.agents.pipeline.hedge_delay", side_effect=lambda name: 0.01 if name == "MarketAgent" else None), \
+         patch("src.agents.hedging.budget", HedgeBudget(fraction=1.0)):
+        report = await arun_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is not None
+    assert len(calls) == 2
+    events = [call[0][1] for call in mock_storage["append_event"].call_args_list]
+    assert {"type": "AGENT_HEDGED", "agent": "MarketAgent"} in events
+    # The duplicate's input is charged on top of the six calls' usage
+    assert mock_storage["record_usage"].call_count == 7
+    assert any(call[0][2] == 0 for call in mock_storage["record_usage"].call_args_list)
+
+def test_run_analysis_fails_stage_past_deadline(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    mock_agents["risk"].run.side_effect = lambda *args, **kwargs: time.sleep(0.5)
+
+    with patch("src.agents.pipeline.stage_deadline", side_effect=lambda name: 0.05 if name == "RiskAgent" else None):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is None
+    failure = mock_storage["append_event"].call_args_list[-1][0][1]
+    assert failure["type"] == "RUN_FAILED"
+    assert "RiskAgent exceeded" in failure["error"]
+
+def test_run_analysis_cascade_escalates_uncertain_judge(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    judge = mock_agents["judge"]
+    unsure = MOCK_RECOMMENDATION_OBJ.model_copy(update={"certainty": 0.3})
+    tiers = {"gpt-4o-mini": MagicMock(model_id="gpt-4o-mini"), "gpt-4o": MagicMock(model_id="gpt-4o")}
+    for tier_agent in tiers.values():
+        tier_agent.usage.return_value = TokenUsage(100, 50, 0.001)
+    tiers["gpt-4o-mini"].run.return_value = unsure
+    tiers["gpt-4o"].run.return_value = MOCK_RECOMMENDATION_OBJ
+    judge.with_model.side_effect = tiers.get
+
+    with patch("src.agents.routing.ROUTING_MODES", {"JudgeAgent": "cascade"}):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report.recommendation == MOCK_RECOMMENDATION_OBJ
+    events = [call[0][1] for call in mock_storage["append_event"].call_args_list]
+    escalation = next(e for e in events if e["type"] == "AGENT_ESCALATED")
+    assert escalation["from"] == "gpt-4o-mini" and escalation["to"] == "gpt-4o"
+    judge_artifact = next(
+        call[0][1] for call in mock_storage["save_artifact"].call_args_list if call[0][1].agent_name == "JudgeAgent"
+    )
+    assert (judge_artifact.model, judge_artifact.tier) == ("gpt-4o", 1)
+    # Unrouted stages keep their own model
+    planner_artifact = mock_storage["save_artifact"].call_args_list[0][0][1]
+    assert (planner_artifact.model, planner_artifact.tier) == ("gpt-4o", None)
+
+def test_run_analysis_cascade_keeps_certain_judge_of_a_weak_idea(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    judge = mock_agents["judge"]
+    weak_idea = MOCK_RECOMMENDATION_OBJ.model_copy(update={"confidence": 0.3, "certainty": 0.9})
+    tiers = {"gpt-4o-mini": MagicMock(model_id="gpt-4o-mini"), "gpt-4o": MagicMock(model_id="gpt-4o")}
+    for tier_agent in tiers.values():
+        tier_agent.usage.return_value = TokenUsage(100, 50, 0.001)
+    tiers["gpt-4o-mini"].run.return_value = weak_idea
+    judge.with_model.side_effect = tiers.get
+    saved = {}
+    mock_storage["save_artifact"].side_effect = lambda run_id, artifact: saved.setdefault(artifact.agent_name, artifact)
+    mock_storage["get_artifact"].side_effect = lambda run_id, agent_name: saved.get(agent_name)
+
+    with patch("src.agents.routing.ROUTING_MODES", {"JudgeAgent": "cascade"}):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report.recommendation == weak_idea
+    # The report names the models that actually ran the stages
+    assert report.meta.model == "gpt-4o, gpt-4o-mini"
+    tiers["gpt-4o"].run.assert_not_called()
+    events = [call[0][1] for call in mock_storage["append_event"].call_args_list]
+    assert not any(e["type"] == "AGENT_ESCALATED" for e in events)
+
+def test_run_analysis_records_token_usage(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+
+    run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    planner_artifact = mock_storage["save_artifact"].call_args_list[0][0][1]
+    assert (planner_artifact.input_tokens, planner_artifact.output_tokens, planner_artifact.cost_usd) == (100, 50, 0.001)
+    # Interviewer + 5 analysis stages
+    assert mock_storage["record_usage"].call_count == 6
+
+def test_run_analysis_charges_provider_reported_usage(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+
+    def reported_planner(idea_text, on_cache_hit=None, on_usage=None):
+        on_usage(TokenUsage(900, 300, 0.005))
+        return MOCK_IDEA_OBJ
+
+    mock_agents["planner"].run.side_effect = reported_planner
+
+    run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    planner_artifact = mock_storage["save_artifact"].call_args_list[0][0][1]
+    assert (planner_artifact.input_tokens, planner_artifact.output_tokens, planner_artifact.cost_usd) == (900, 300, 0.005)
+
+def test_pipeline_agent_reports_run_metrics():
+    planner = PlannerAgent()
+    response = RunOutput(content=MOCK_IDEA_OBJ, metrics=RunMetrics(input_tokens=1200, output_tokens=80))
+    reported = []
+
+    with patch("src.agents.pipeline.get_response_cache", return_value=None), \
+         patch.object(planner.agent, "run", return_value=response):
+        planner.run(MOCK_IDEA_TEXT, on_usage=reported.append)
+
+    assert [(u.input_tokens, u.output_tokens) for u in reported] == [(1200, 80)]
+    assert reported[0].cost_usd == pytest.approx((1200 * 2.50 + 80 * 10.00) / 1_000_000)
+
+def test_run_analysis_does_not_charge_cached_responses(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+
+    def cached_planner(idea_text, on_cache_hit=None, on_usage=None):
+        on_cache_hit()
+        return MOCK_IDEA_OBJ
+
+    mock_agents["planner"].run.side_effect = cached_planner
+
+    run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    planner_artifact = mock_storage["save_artifact"].call_args_list[0][0][1]
+    assert (planner_artifact.input_tokens, planner_artifact.output_tokens, planner_artifact.cost_usd) == (0, 0, 0.0)
+    assert mock_storage["record_usage"].call_count == 5
+
+def test_run_analysis_aborts_over_run_budget(mock_storage, mock_agents):
+    mock_storage["get_interview"].return_value = None
+    mock_storage["record_usage"].side_effect = lambda run_id, i, o, c: {"input_tokens": 900, "output_tokens": 200}
+
+    with patch("src.agents.tokens.RUN_MAX_TOKENS", 1000):
+        report = run_analysis(MOCK_RUN_ID, MOCK_IDEA_TEXT)
+
+    assert report is None
+    failure = mock_storage["append_event"].call_args_list[-1][0][1]
+    assert failure["type"] == "RUN_FAILED"
+    assert "token budget exceeded" in failure["error"]
+    mock_agents["planner"].run.assert_not_called()
+
+def test_pipeline_agent_truncates_prompt_to_context_budget():
+    planner = PlannerAgent()
+    long_idea = "word " * 5000
+
+    with patch("src.agents.tokens.CONTEXT_BUDGETS", {"PlannerAgent": 100}):
+        prompt = planner._prompt(long_idea)
+        usage = planner.usage((long_idea,))
+
+    assert "tokens truncated" in prompt
+    assert prompt.startswith("Analyze this idea: word")
+    assert usage.input_tokens < 100 + 2000  # budgeted prompt plus the instruction block
+
+def test_pipeline_agent_streams_schema_output_as_json():
+    planner = PlannerAgent()
+    text = MOCK_IDEA_OBJ.model_dump_json()
+    stream = [RunContentEvent(content=text[:20]), RunContentEvent(content=text[20:]), RunOutput(content=text)]
+    deltas = []
+
+    with patch("src.agents.pipeline.get_response_cache", return_value=None), \
+         patch.object(planner.streaming_agent, "run", return_value=iter(stream)):
+        result = planner.run(MOCK_IDEA_TEXT, on_delta=deltas.append)
+
+    assert result == MOCK_IDEA_OBJ
+    assert "".join(deltas) == text
@@ -0,0 +1,202 @@
+import json
+import asyncio
+import threading
+from unittest.mock import patch
+
+from src.agents.http_client import httpx
+from src.agents.rate_limit import (
+    AsyncRateLimitedTransport,
+    ModelLimiter,
+    RateLimitedTransport,
+    TokenBucket,
+    retry_after_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class EventStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    def __iter__(self):
+        yield b"data: [DONE]\n\n"
+
+    async def __aiter__(self):
+        yield b"data: [DONE]\n\n"
+
+
+def _chat_request(url="https://api.openai.com/v1/chat/completions"):
+    body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 10}
+    return httpx.Request("POST", url, content=json.dumps(body).encode())
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+    assert bucket.take(2) == 0
+    assert bucket.take(1) == 1.0
+
+    clock.now = 1.0
+    assert bucket.take(1) == 0
+
+def test_model_limiter_halves_concurrency_on_throttle_and_recovers():
+    clock = FakeClock()
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4, clock=clock)
+
+    assert limiter.try_acquire(10) == 0
+    limiter.release(throttled=True, retry_after=3.0)
+
+    assert limiter.limit == 2
+    # Blocked until Retry-After has elapsed
+    assert limiter.try_acquire(10) == 3.0
+
+    clock.now = 3.0
+    assert limiter.try_acquire(10) == 0
+    assert limiter.try_acquire(10) == 0
+    assert limiter.try_acquire(10) > 0  # concurrency limit of 2 reached
+
+    limiter.release()
+    assert limiter.limit > 2
+
+def test_shared_buckets_coordinate_through_sqlite(tmp_path):
+    db = tmp_path / "limits.sqlite"
+    first = ModelLimiter("gpt-4o", rpm=1, tpm=1_000_000, concurrency=4, shared_path=db)
+    second = ModelLimiter("gpt-4o", rpm=1, tpm=1_000_000, concurrency=4, shared_path=db)
+
+    assert first.try_acquire(1) == 0
+    # The single request/minute is already spent by the other limiter
+    assert second.try_acquire(1) > 0
+
+def test_shared_bucket_reuses_its_connection_per_thread(tmp_path):
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4, shared_path=tmp_path / "limits.sqlite")
+
+    limiter.try_acquire(10)
+    conn = limiter.requests._connection()
+    limiter.release(token_delta=5)
+    limiter.try_acquire(10)
+
+    assert limiter.requests._connection() is conn
+
+def test_waiters_for_a_slot_are_woken_by_its_release():
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=1)
+    limiter.acquire(10)
+    acquired = threading.Event()
+    worker = threading.Thread(target=lambda: (limiter.acquire(10), acquired.set()))
+    worker.start()
+
+    assert not acquired.wait(0.1)
+    limiter.release()
+    assert acquired.wait(1)
+    worker.join()
+
+async def test_async_waiters_for_a_slot_are_woken_by_a_release_in_another_thread():
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=1)
+    limiter.acquire(10)
+    waiter = asyncio.ensure_future(limiter.aacquire(10))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    threading.Thread(target=limiter.release).start()
+
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 1
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(httpx.Response(429, headers={"retry-after": "2"})) == 2.0
+    assert retry_after_seconds(httpx.Response(429, headers={"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(httpx.Response(429)) is None
+
+def test_transport_retries_throttled_requests():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0.01"})
+        return httpx.Response(200, json={"usage": {"total_tokens": 5}})
+
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4)
+    with patch("src.agents.rate_limit.get_limiter", return_value=limiter):
+        response = RateLimitedTransport(httpx.MockTransport(handler)).handle_request(_chat_request())
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert limiter.throttled == 1
+    assert limiter.in_flight == 0
+
+def test_transport_passes_through_requests_without_model():
+    transport = RateLimitedTransport(httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    with patch("src.agents.rate_limit.get_limiter") as get_limiter:
+        response = transport.handle_request(httpx.Request("GET", "https://api.openai.com/v1/models"))
+
+    assert response.status_code == 200
+    get_limiter.assert_not_called()
+
+async def test_async_transport_surfaces_429_after_retries():
+    async def handler(request):
+        return httpx.Response(429, headers={"retry-after": "0"})
+
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4)
+    transport = AsyncRateLimitedTransport(httpx.MockTransport(handler), retries=2)
+    with patch("src.agents.rate_limit.get_limiter", return_value=limiter):
+        response = await transport.handle_async_request(_chat_request())
+
+    assert response.status_code == 429
+    assert limiter.throttled == 3
+    assert limiter.limit == 1
+
+def test_streamed_response_holds_its_slot_until_closed():
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=EventStream())
+
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4)
+    with patch("src.agents.rate_limit.get_limiter", return_value=limiter):
+        response = RateLimitedTransport(httpx.MockTransport(handler)).handle_request(_chat_request())
+
+    assert limiter.in_flight == 1
+    assert response.read() == b"data: [DONE]\n\n"
+    response.close()
+    assert limiter.in_flight == 0
+
+async def test_async_streamed_response_holds_its_slot_until_closed():
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=EventStream())
+
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4)
+    transport = AsyncRateLimitedTransport(httpx.MockTransport(handler))
+    with patch("src.agents.rate_limit.get_limiter", return_value=limiter):
+        response = await transport.handle_async_request(_chat_request())
+
+    assert limiter.in_flight == 1
+    await response.aread()
+    await response.aclose()
+    assert limiter.in_flight == 0
+
+def test_bucket_reservations_are_taken_outside_the_limiter_lock():
+    limiter = ModelLimiter("gpt-4o", rpm=6000, tpm=1_000_000, concurrency=4)
+    taking, done = threading.Event(), threading.Event()
+    take = limiter.requests.take
+
+    def slow_take(amount):
+        # Stands in for a shared bucket waiting on SQLite
+        taking.set()
+        done.wait(5)
+        return take(amount)
+
+    limiter.requests.take = slow_take
+    worker = threading.Thread(target=limiter.try_acquire, args=(10,))
+    worker.start()
+    taking.wait(5)
+
+    # Another caller is not held up by the reservation in progress
+    assert limiter._lock.acquire(timeout=1)
+    limiter._lock.release()
+    done.set()
+    worker.join()
+    assert limiter.in_flight == 1
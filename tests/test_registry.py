@@ -0,0 +1,93 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.agents.registry import AgentRegistry, get_agent, shared_model
+
+
+class DummyAgent:
+    instances = 0
+
+    def __init__(self):
+        DummyAgent.instances += 1
+
+
+def test_registry_builds_each_agent_once():
+    registry = AgentRegistry()
+
+    first = registry.get(DummyAgent)
+    second = registry.get(DummyAgent)
+
+    assert first is second
+
+def test_registry_keys_distinct_configurations():
+    registry = AgentRegistry()
+
+    mini = registry.get(DummyAgent, key=(DummyAgent, "gpt-4o-mini"))
+    large = registry.get(DummyAgent, key=(DummyAgent, "gpt-4o"))
+
+    assert mini is not large
+
+def test_registry_is_thread_safe():
+    registry = AgentRegistry()
+    DummyAgent.instances = 0
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        seen.append(registry.get(DummyAgent))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert DummyAgent.instances == 1
+    assert all(agent is seen[0] for agent in seen)
+
+def test_shared_model_reuses_openai_clients(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    with patch("src.agents.registry._clients", None):
+        first = shared_model("gpt-4o", temperature=0.0)
+        second = shared_model("gpt-4o-mini", temperature=0.0)
+
+        assert first.client is not None
+        assert first.client is second.client
+        assert first.async_client is second.async_client
+
+def test_shared_agents_run_each_call_in_its_own_session(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    # The marketing agents' tools need optional packages
+    uvp_module = pytest.importorskip("src.agents.uvp_agent.uvp_agent", exc_type=ImportError)
+    team_module = pytest.importorskip("src.teams.statergy_lead_orchestrator.statergy_lead_orchestrator", exc_type=ImportError)
+
+    uvp = uvp_module.UVPAgent()
+    # Only run() is under test, so the team's agno Team is left out
+    team = team_module.StatergyLeadTeam.__new__(team_module.StatergyLeadTeam)
+    team.team = MagicMock()
+    with patch.object(uvp.agent, "run") as agent_run:
+        uvp.run("desks")
+        uvp.run("desks")
+    team.run("desks")
+    team.run("desks", session_id="run-1")
+
+    agent_sessions = [call.kwargs["session_id"] for call in agent_run.call_args_list]
+    team_sessions = [call.kwargs["session_id"] for call in team.team.run.call_args_list]
+    assert agent_sessions[0] != agent_sessions[1]
+    assert team_sessions[0] != "run-1" and team_sessions[1] == "run-1"
+
+def test_team_members_are_not_the_agents_served_on_their_own(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    team_module = pytest.importorskip("src.teams.statergy_lead_orchestrator.statergy_lead_orchestrator", exc_type=ImportError)
+    monkeypatch.setattr("src.agents.registry.registry", AgentRegistry())
+    served = get_agent(team_module.UVPAgent)
+
+    team = team_module.StatergyLeadTeam()
+
+    # agno marks team members, and marked agents stop saving their own sessions
+    assert served.agent.team_id is None
+    assert all(member is not served.agent for member in team.team.members)
+    assert served.agent.model.client is team.team.members[2].model.client
@@ -0,0 +1,89 @@
+import time
+import random
+import string
+
+from src.contracts.clarity_report import (
+    Audience, ClarityReport, Execution, Idea, Market, Meta, Recommendation, Risks, Verdict
+)
+from src.storage import runs
+from src.storage.report_index import ReportIndex
+from utils.retrieval import BM25Index
+
+
+def make_report(run_id, title, summary, competitors, risks):
+    return ClarityReport(
+        meta=Meta(run_id=run_id, model="gpt-4o"),
+        idea=Idea(title=title, one_liner=summary, expanded_summary=summary),
+        audience=Audience(),
+        market=Market(competitors=competitors, demand_signals=[f"Growing interest in {title}"], positioning="Niche"),
+        risks=Risks(top_risks=risks, mitigations=["Start with a pilot"]),
+        execution=Execution(),
+        recommendation=Recommendation(verdict=Verdict.PURSUE, confidence=0.7, rationale="Promising"),
+    )
+
+def test_bm25_ranks_matching_documents_and_evicts_oldest():
+    index = BM25Index(max_documents=2)
+    index.add("desks", "Book desks in coworking spaces for remote workers")
+    index.add("cameras", "Marketplace for renting camera gear", payload={"kind": "rental"})
+
+    (key, score, payload), = index.search("rent a camera for the weekend", k=1)
+    assert (key, payload) == ("cameras", {"kind": "rental"})
+    assert 0 < score < 1
+    assert index.search("quantum chemistry") == []
+
+    index.add("invoices", "Invoicing for freelancers")
+    assert len(index) == 2 and "desks" not in index
+    assert index.search("coworking desks") == []
+
+def test_related_findings_come_from_similar_reports_and_are_pinned(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    cowork = runs.create_run("Coworking desk booking for remote workers")
+    runs.save_report(cowork, make_report(cowork, "DeskHop", "Book coworking desks for remote workers by the hour", ["WeWork", "Regus"], ["Low occupancy"]))
+    cameras = runs.create_run("Camera gear rental")
+    runs.save_report(cameras, make_report(cameras, "LensLend", "Rent camera gear from local photographers", ["ShareGrid"], ["Damaged gear"]))
+
+    new = runs.create_run("A platform for remote workers to find coworking spaces")
+    findings = runs.get_related_findings(new, "A platform for remote workers to find coworking spaces")
+
+    assert [hit["run_id"] for hit in findings["market"]] == [cowork]
+    assert findings["market"][0]["competitors"] == ["WeWork", "Regus"]
+    assert findings["risks"][0]["top_risks"] == ["Low occupancy"]
+
+    # Reports saved later do not change what a resumed run is given
+    later = runs.create_run("Coworking passes")
+    runs.save_report(later, make_report(later, "PassHub", "Day passes to coworking spaces for remote workers", ["Deskpass"], ["Churn"]))
+    assert runs.get_related_findings(new, "A platform for remote workers to find coworking spaces") == findings
+
+def test_index_is_rebuilt_from_reports_and_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    run_id = runs.create_run("Camera gear rental")
+    runs.save_report(run_id, make_report(run_id, "LensLend", "Rent camera gear", ["ShareGrid"], ["Damaged gear"]))
+    runs._indexes.clear()
+    (tmp_path / ".index" / "reports.jsonl").unlink()
+
+    assert [hit["run_id"] for hit in runs._report_index().search("camera rental", "market")] == [run_id]
+
+    index = ReportIndex(tmp_path / "reports.jsonl", max_documents=3)
+    for i in range(10):
+        index.add(f"run-{i}", make_report(f"run-{i}", f"Idea {i}", "Rent camera gear", ["ShareGrid"], ["Damaged gear"]))
+
+    assert len(index) == 3
+    assert len((tmp_path / "reports.jsonl").read_text().splitlines()) <= 2 * 3 * 2
+    assert {hit["run_id"] for hit in index.search("camera gear", "market", k=5)} == {"run-7", "run-8", "run-9"}
+
+def test_search_takes_milliseconds(tmp_path):
+    rng = random.Random(0)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))) for _ in range(3000)]
+    index = ReportIndex(tmp_path / "reports.jsonl")
+    index.rebuild(
+        (f"run-{i}", make_report(f"run-{i}", " ".join(rng.sample(words, 3)), " ".join(rng.sample(words, 20)), rng.sample(words, 4), rng.sample(words, 4)))
+        for i in range(2000)
+    )
+    queries = [" ".join(rng.sample(words, 12)) for _ in range(100)]
+    index.search(queries[0], "market")
+
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, "market")
+
+    assert (time.perf_counter() - start) / len(queries) < 0.005
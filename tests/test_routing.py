@@ -0,0 +1,26 @@
+from unittest.mock import patch
+
+from src.agents.routing import low_certainty, model_route
+
+
+def test_model_route_is_disabled_in_fixed_mode():
+    assert model_route("PlannerAgent", ("a simple idea",)) is None
+
+def test_model_route_picks_tier_from_complexity():
+    long_input = ("word " * 200,)
+
+    with patch("src.agents.routing.ROUTING_MODE", "complexity"):
+        assert model_route("PlannerAgent", ("a simple idea",)) == [(0, "gpt-4o-mini")]
+        assert model_route("PlannerAgent", long_input) == [(1, "gpt-4o")]
+        assert model_route("InterviewerAgent", ("a simple idea",)) is None
+
+def test_model_route_cascades_upwards():
+    with patch("src.agents.routing.ROUTING_MODE", "cascade"):
+        assert model_route("MarketAgent", ("a simple idea",)) == [(0, "gpt-4o-mini"), (1, "gpt-4o")]
+
+def test_low_certainty_reads_models_and_dicts():
+    assert low_certainty({"certainty": 0.2}) is not None
+    assert low_certainty({"certainty": 0.9}) is None
+    assert low_certainty({"audience": {}}) is None
+    # The Judge's confidence scores the idea, not the output, and never escalates
+    assert low_certainty({"confidence": 0.2}) is None
@@ -0,0 +1,521 @@
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.contracts.clarity_report import (
+    AgentArtifact, Audience, ClarityReport, Execution, Idea, Interview, Market, Meta, Question, Recommendation, Risks, Verdict
+)
+from src.storage import file_store, retention, run_state, runs
+from src.storage.event_tail import EventTail
+from src.storage.run_index import RunIndex
+from src.storage.run_state import RunStates
+from src.storage.sqlite_store import SqliteRunStore, migrate_runs
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    monkeypatch.setattr(runs, "RUN_STORE", request.param)
+    monkeypatch.setattr(runs, "RUN_DB_PATH", tmp_path / "runs.sqlite")
+    runs._indexes.clear()
+    yield request.param
+    runs._indexes.clear()
+
+def make_report(run_id, title):
+    return ClarityReport(
+        meta=Meta(run_id=run_id, model="gpt-4o"),
+        idea=Idea(title=title, one_liner="Rent camera gear", expanded_summary="Rent camera gear"),
+        audience=Audience(),
+        market=Market(competitors=["ShareGrid"], positioning="Niche"),
+        risks=Risks(top_risks=["Damaged gear"]),
+        execution=Execution(),
+        recommendation=Recommendation(verdict=Verdict.PURSUE, confidence=0.7, rationale="Promising"),
+    )
+
+def make_artifact(agent_name, seconds=1.0):
+    started_at = datetime(2026, 1, 1)
+    return AgentArtifact(
+        agent_name=agent_name,
+        input_summary="Camera gear rental",
+        output_markdown="Done",
+        started_at=started_at,
+        finished_at=started_at + timedelta(seconds=seconds),
+    )
+
+def test_backends_share_the_storage_api(store):
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED"})
+    runs.save_interview(run_id, Interview(questions=[Question(id="q1", text="Who pays?")]))
+    runs.save_artifact(run_id, make_artifact("Idea Agent", 2.0))
+    runs.save_speculation(run_id, make_artifact("Market Agent"))
+    runs.update_run_status(run_id, "RUNNING")
+    runs.record_usage(run_id, 10, 5, 0.5)
+    runs.record_usage(run_id, 1, 1, 0.25)
+
+    run_data = runs.get_run(run_id)
+    assert run_data["status"] == "RUNNING"
+    assert run_data["usage"] == {"input_tokens": 11, "output_tokens": 6, "cost_usd": 0.75}
+    assert [event["type"] for event in run_data["events"]] == ["RUN_STARTED"]
+    assert [artifact["agent_name"] for artifact in run_data["artifacts"]] == ["Idea Agent"]
+    assert run_data["interview"]["questions"][0]["text"] == "Who pays?"
+    assert not run_data["has_report"] and runs.get_report(run_id) is None
+    assert runs.get_speculation(run_id, "Market Agent") is not None
+    assert runs.recent_agent_durations("Idea Agent") == [2.0]
+
+    runs.clear_speculation(run_id)
+    assert runs.get_speculation(run_id, "Market Agent") is None
+
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+    assert runs.get_run(run_id)["status"] == "COMPLETED"
+    assert runs.get_report(run_id).idea.title == "LensLend"
+    assert [run["run_id"] for run in runs.list_runs()] == [run_id]
+
+    fork_id = runs.fork_run(run_id)
+    assert runs.get_artifact(fork_id, "Idea Agent") is not None
+    assert runs.get_interview(fork_id) is not None
+
+def test_missing_runs_behave_alike(store):
+    assert runs.get_run("missing") is None
+    assert runs.record_usage("missing", 1, 2, 0.5) == {"input_tokens": 1, "output_tokens": 2, "cost_usd": 0.5}
+    runs.update_run_status("missing", "RUNNING")
+    with pytest.raises(ValueError):
+        runs.append_event("missing", {"type": "RUN_STARTED"})
+    with pytest.raises(ValueError):
+        runs.save_artifact("missing", make_artifact("Idea Agent"))
+
+def test_concurrent_usage_updates_are_not_lost(store):
+    run_id = runs.create_run("Camera gear rental")
+
+    def record():
+        for _ in range(25):
+            runs.record_usage(run_id, 1, 1, 0.0)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert runs.get_usage(run_id)["input_tokens"] == 100
+
+def test_migration_imports_run_directories(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    runs._indexes.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED"})
+    runs.save_artifact(run_id, make_artifact("Idea Agent"))
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+    (tmp_path / "runs" / "broken").mkdir()
+
+    store = SqliteRunStore(tmp_path / "runs.sqlite")
+    assert migrate_runs(tmp_path / "runs", store) == (1, 0)
+    # Re-running replaces rather than duplicates
+    assert migrate_runs(tmp_path / "runs", store) == (1, 0)
+
+    assert store.get_meta(run_id)["status"] == "COMPLETED"
+    assert [event["type"] for event in store.read_events(run_id)[0]] == ["RUN_STARTED"]
+    assert store.get_artifact(run_id, "Idea Agent") is not None
+    assert store.get_report(run_id).idea.title == "LensLend"
+    runs._indexes.clear()
+
+def test_indexes_belong_to_the_store_they_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    monkeypatch.setattr(runs, "RUN_DB_PATH", tmp_path / "runs.sqlite")
+    runs._indexes.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+
+    # Switching stores lists only the new store's runs, until runs are imported into it
+    monkeypatch.setattr(runs, "RUN_STORE", "sqlite")
+    assert runs.list_runs() == [] and runs.find_similar_runs("Camera gear rental") == []
+    migrate_runs(tmp_path / "runs", runs._store())
+    runs.rebuild_indexes()
+    assert [run["run_id"] for run in runs.list_runs()] == [run_id]
+    assert [run["run_id"] for run in runs.find_similar_runs("Camera gear rental")] == [run_id]
+    assert runs._report_index().search("ShareGrid", "market")
+    runs._indexes.clear()
+
+def test_listing_pages_by_cursor_and_status(store):
+    run_ids = [runs.create_run(f"Idea {i}") for i in range(5)]
+    runs.update_run_status(run_ids[1], "FAILED")
+    runs.update_run_status(run_ids[3], "FAILED")
+    runs.save_report(run_ids[4], make_report(run_ids[4], "LensLend"))
+
+    first, cursor = runs.list_run_page(limit=2)
+    second, cursor = runs.list_run_page(limit=2, cursor=cursor)
+    third, cursor = runs.list_run_page(limit=2, cursor=cursor)
+    assert [run["run_id"] for run in first + second + third] == run_ids[::-1]
+    assert cursor is None
+    assert first[0] == {
+        "run_id": run_ids[4], "idea_text": "Idea 4", "status": "COMPLETED",
+        "created_at": first[0]["created_at"], "has_report": True, "forked_from": None,
+    }
+
+    failed, cursor = runs.list_run_page(limit=5, statuses=["FAILED"])
+    assert [run["run_id"] for run in failed] == [run_ids[3], run_ids[1]] and cursor is None
+    mixed, _ = runs.list_run_page(limit=5, statuses=["FAILED", "COMPLETED"])
+    assert [run["run_id"] for run in mixed] == [run_ids[4], run_ids[3], run_ids[1]]
+
+    with pytest.raises(ValueError):
+        runs.list_run_page(cursor="not-a-cursor")
+
+def test_listing_index_is_rebuilt_and_shared(store, tmp_path):
+    run_id = runs.create_run("Camera gear rental")
+    runs._indexes.clear()
+    index_path = runs._store().index_dir / "runs.jsonl"
+    index_path.unlink()
+    assert [run["run_id"] for run in runs.list_runs()] == [run_id]
+
+    # Another process's index sees runs created through this one
+    other = RunIndex(index_path)
+    forked = runs.fork_run(run_id)
+    runs.update_run_status(forked, "RUNNING")
+    (summary, _), cursor = other.page(limit=5)
+    assert cursor is None
+    assert summary["run_id"] == forked and summary["status"] == "RUNNING" and summary["forked_from"] == run_id
+
+def test_listing_page_takes_milliseconds(tmp_path):
+    index = RunIndex(tmp_path / "runs.jsonl")
+    index.rebuild(
+        {"run_id": f"run-{i:06d}", "idea_text": "Idea", "status": ["COMPLETED", "FAILED"][i % 2], "created_at": f"2026-01-01T{i:09d}", "has_report": False}
+        for i in range(50000)
+    )
+    _, cursor = index.page(50)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        index.page(50, cursor, ["FAILED"])
+
+    assert (time.perf_counter() - start) / 100 < 0.005
+
+def test_recent_durations_come_from_the_newest_entries_of_the_log(store, monkeypatch):
+    monkeypatch.setattr(file_store, "DURATION_LOG_BYTES", 100)
+    for seconds in range(1, 31):
+        run_id = runs.create_run("Camera gear rental")
+        runs.save_artifact(run_id, make_artifact("Idea Agent", float(seconds)))
+    runs.save_speculation(run_id, make_artifact("Idea Agent", 99.0))
+
+    # Newest first, across a rotation of the file store's log
+    assert runs.recent_agent_durations("Idea Agent", limit=20) == [float(s) for s in range(30, 10, -1)]
+    assert runs.recent_agent_durations("Market Agent") == []
+
+def test_updates_return_only_what_changed_since_the_cursor(store):
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED"})
+    runs.save_artifact(run_id, make_artifact("Idea Agent"))
+    # Past the file system's timestamp granularity
+    time.sleep(0.02)
+    runs.save_artifact(run_id, make_artifact("Planner Agent"))
+    cursor = runs.get_run(run_id)["cursor"]
+
+    runs.append_event(run_id, {"type": "AGENT_STARTED", "agent": "Market Agent"})
+    runs.save_artifact(run_id, make_artifact("Market Agent"))
+    updates = runs.get_run_updates(run_id, cursor)
+    assert [event["type"] for event in updates["events"]] == ["AGENT_STARTED"]
+    # The newest artifact seen may come again; older ones do not
+    assert "Market Agent" in [artifact["agent_name"] for artifact in updates["artifacts"]]
+    assert "Idea Agent" not in [artifact["agent_name"] for artifact in updates["artifacts"]]
+
+    again = runs.get_run_updates(run_id, updates["cursor"])
+    assert again["events"] == [] and again["status"] == "STARTED"
+    assert [event["type"] for event in runs.get_run_updates(run_id)["events"]] == ["RUN_STARTED", "AGENT_STARTED"]
+    assert runs.get_run_updates("missing") is None
+    with pytest.raises(ValueError):
+        runs.get_run_updates(run_id, "not-a-cursor")
+
+def test_updates_of_active_runs_come_from_memory(store, monkeypatch):
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED"})
+    cursor = runs.get_run(run_id)["cursor"]
+    runs.append_event(run_id, {"type": "AGENT_STARTED"})
+
+    backend = type(runs._store())
+    read_events = backend.read_events
+    monkeypatch.setattr(backend, "read_events", lambda *args: pytest.fail("read the event log"))
+    assert [event["type"] for event in runs.get_run_updates(run_id, cursor)["events"]] == ["AGENT_STARTED"]
+
+    # An event written by another process is not in this one's tail, so the log is read
+    monkeypatch.setattr(backend, "read_events", read_events)
+    runs._store().append_event(run_id, {"type": "AGENT_FINISHED"})
+    assert [event["type"] for event in runs.get_run_updates(run_id, cursor)["events"]] == ["AGENT_STARTED", "AGENT_FINISHED"]
+
+def test_event_tail_stays_gap_free_and_bounded():
+    tail = EventTail(max_runs=2, max_events=3)
+    for position in range(1, 6):
+        tail.record("run", position - 1, position, {"n": position})
+
+    assert [event["n"] for event in tail.since("run", 3, 5)] == [4, 5]
+    assert tail.since("run", 1, 5) is None  # older than the tail
+    assert tail.since("run", 3, 6) is None  # the log has moved on without this process
+
+    tail.record("run", 7, 8, {"n": 8})  # after a gap the tail starts over
+    assert tail.since("run", 5, 8) is None and tail.since("run", 7, 8) == [{"n": 8}]
+
+    tail.record("other", 0, 1, {})
+    tail.record("third", 0, 1, {})
+    assert tail.since("run", 7, 8) is None
+
+def test_polling_a_long_run_takes_constant_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    runs._indexes.clear()
+    run_id = runs.create_run("Camera gear rental")
+    with open(tmp_path / run_id / "events.jsonl", "a") as f:
+        f.writelines('{"type": "AGENT_OUTPUT_DELTA", "delta": "..."}\n' for _ in range(50000))
+    cursor = runs.get_run(run_id)["cursor"]
+    runs._indexes.clear()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        runs.get_run_updates(run_id, cursor)
+
+    assert (time.perf_counter() - start) / 100 < 0.002
+
+def test_settled_runs_are_read_from_memory_until_written(store, monkeypatch):
+    monkeypatch.setattr(runs, "SETTLE_NS", 0)
+    runs._read_cache.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+    run_data, report, etag = runs.get_run(run_id), runs.get_report(run_id), runs.get_run_etag(run_id)
+
+    backend = type(runs._store())
+    get_meta, get_report = backend.get_meta, backend.get_report
+    monkeypatch.setattr(backend, "get_meta", lambda *args: pytest.fail("read the run"))
+    monkeypatch.setattr(backend, "get_report", lambda *args: pytest.fail("read the report"))
+    assert runs.get_run(run_id) == run_data and runs.get_report(run_id) is report
+    assert runs.get_run_etag(run_id) == etag
+
+    # Callers may add to the returned run without changing the cached one
+    runs.get_run(run_id)["report"] = {}
+    assert "report" not in runs.get_run(run_id)
+
+    monkeypatch.setattr(backend, "get_meta", get_meta)
+    runs.append_event(run_id, {"type": "RUN_COMPLETED"})
+    assert runs.get_run_etag(run_id) != etag
+    assert runs.get_run(run_id)["events"][-1]["type"] == "RUN_COMPLETED"
+
+def test_recently_written_runs_are_not_cached_or_tagged(store, monkeypatch):
+    monkeypatch.setattr(runs, "SETTLE_NS", 10**12 if store == "files" else 0)
+    runs._read_cache.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.get_run(run_id)
+
+    # SQLite counts writes, so its versions need no settling
+    assert (runs.get_run_etag(run_id) is None) == (store == "files")
+    assert runs.get_run_etag("missing") is None and runs.get_run("missing") is None
+
+def test_cached_report_reads_take_microseconds(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(runs, "SETTLE_NS", 0)
+    runs._indexes.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+    runs.get_report(run_id)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        runs.get_report(run_id)
+
+    assert (time.perf_counter() - start) / 1000 < 0.0002
+    runs._indexes.clear()
+
+@pytest.fixture
+def run_states(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    runs._indexes.clear()
+    writes = []
+    atomic_write = run_state.atomic_write
+    monkeypatch.setattr(run_state, "atomic_write", lambda path, *args: writes.append(path.name) or atomic_write(path, *args))
+
+    def use(durability):
+        states = RunStates(durability, flush_seconds=60)
+        monkeypatch.setattr(file_store, "_run_states", states)
+        return writes
+
+    yield use
+    runs._indexes.clear()
+
+def read_run_file(run_id):
+    with open(runs.DATA_DIR / run_id / "run.json") as f:
+        return json.load(f)
+
+def test_metadata_changes_are_written_behind_as_one(run_states):
+    writes = run_states("interval")
+    run_id = runs.create_run("Camera gear rental")
+    for status in ("RUNNING", "WAITING_FOR_FEEDBACK", "RUNNING"):
+        runs.update_run_status(run_id, status)
+        runs.record_usage(run_id, 10, 5, 0.5)
+
+    assert read_run_file(run_id)["status"] == "STARTED"
+    assert runs.get_usage(run_id)["input_tokens"] == 30
+    runs._store().flush()
+
+    assert read_run_file(run_id)["usage"]["input_tokens"] == 30
+    assert writes == ["run.json", "run.json"]
+    assert sorted(path.name for path in (runs.DATA_DIR / run_id).iterdir()) == ["artifacts", "events.jsonl", "run.json"]
+
+def test_reads_of_the_run_see_changes_not_yet_written(run_states):
+    run_states("interval")
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED"})
+    runs.update_run_status(run_id, "RUNNING")
+
+    assert runs.get_run(run_id)["status"] == "RUNNING"
+    assert runs.list_runs()[0]["status"] == "RUNNING"
+    assert read_run_file(run_id)["status"] == "RUNNING"
+
+def test_always_durability_writes_every_change(run_states):
+    writes = run_states("always")
+    run_id = runs.create_run("Camera gear rental")
+    runs.update_run_status(run_id, "RUNNING")
+
+    assert read_run_file(run_id)["status"] == "RUNNING"
+    assert writes == ["run.json", "run.json"]
+
+def test_concurrent_updates_never_lose_each_others_changes(run_states):
+    run_states("interval")
+    run_id = runs.create_run("Camera gear rental")
+
+    def record():
+        for _ in range(50):
+            runs.record_usage(run_id, 1, 1, 0.0)
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert runs.get_usage(run_id)["input_tokens"] == 400
+
+def test_run_files_replaced_by_another_process_are_reread(run_states):
+    run_states("interval")
+    run_id = runs.create_run("Camera gear rental")
+    run_data = runs._store().get_meta(run_id)
+
+    run_data["status"] = "FAILED"
+    run_state.atomic_write(runs.DATA_DIR / run_id / "run.json", json.dumps(run_data).encode(), False)
+
+    assert runs._store().get_meta(run_id)["status"] == "FAILED"
+
+def test_held_changes_are_applied_on_top_of_another_workers_write(tmp_path):
+    # Two workers' states of the same run directory
+    first, second = RunStates("interval", flush_seconds=60), RunStates("always")
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    first.create(run_dir, {"run_id": "run", "status": "STARTED"})
+
+    first.update_meta(run_dir, lambda data: data.update(usage={"input_tokens": 10}))
+    second.update_meta(run_dir, lambda data: data.update(status="RUNNING"))
+    assert first.read_meta(run_dir) == {"run_id": "run", "status": "RUNNING", "usage": {"input_tokens": 10}}
+    first.update_meta(run_dir, lambda data: data["usage"].update(input_tokens=data["usage"]["input_tokens"] + 5))
+    second.update_meta(run_dir, lambda data: data.update(status="WAITING_FOR_INPUT"))
+    first.flush()
+
+    with open(run_dir / "run.json") as f:
+        assert json.load(f) == {"run_id": "run", "status": "WAITING_FOR_INPUT", "usage": {"input_tokens": 15}}
+    first.close()
+    second.close()
+
+def test_failed_flushes_are_logged_and_retried_after_a_backoff(tmp_path, monkeypatch, caplog):
+    states = RunStates("interval", flush_seconds=0.01)
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    states.create(run_dir, {"run_id": "run", "status": "STARTED"})
+    attempts = []
+    atomic_write = run_state.atomic_write
+
+    def failing_write(path, *args):
+        attempts.append(time.monotonic())
+        if len(attempts) <= 2:
+            raise OSError("disk full")
+        atomic_write(path, *args)
+    monkeypatch.setattr(run_state, "atomic_write", failing_write)
+
+    states.update_meta(run_dir, lambda data: data.update(status="RUNNING"))
+    deadline = time.monotonic() + 5
+    while json.loads((run_dir / "run.json").read_text())["status"] != "RUNNING" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(attempts) == 3
+    assert [record.levelname for record in caplog.records if record.name == "src.storage.run_state"] == ["WARNING", "WARNING"]
+    # Waits double: 0.02s, then 0.04s
+    assert attempts[2] - attempts[1] >= 0.04 + 0.01
+    states.close()
+
+def test_finished_runs_are_archived_and_read_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    runs._indexes.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED"})
+    runs.save_interview(run_id, Interview(questions=[Question(id="q1", text="Who pays?")]))
+    runs.save_artifact(run_id, make_artifact("Idea Agent"))
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+    unfinished = runs.create_run("Drone rental")
+    run_data = runs.get_run(run_id)
+
+    counts = retention.compact_runs(archive_after_days=7, now=datetime.utcnow() + timedelta(days=8))
+
+    assert counts == {"archived": 1, "deleted": 0}
+    assert not (tmp_path / "runs" / run_id).exists() and (tmp_path / "runs" / unfinished).exists()
+    assert runs.get_run(run_id) == run_data
+    assert runs.get_report(run_id).idea.title == "LensLend"
+    assert runs.get_run_updates(run_id, run_data["cursor"])["events"] == []
+    assert [summary["run_id"] for summary in runs.list_runs()] == [unfinished, run_id]
+    assert migrate_runs(tmp_path / "runs", SqliteRunStore(tmp_path / "runs.sqlite")) == (2, 0)
+
+    # A write unpacks the run again
+    runs.append_event(run_id, {"type": "RUN_REVIEWED"})
+    assert (tmp_path / "runs" / run_id / "report.json").exists()
+    assert not any((tmp_path / "runs" / ".archive").iterdir())
+    assert [event["type"] for event in runs.get_run(run_id)["events"]] == ["RUN_STARTED", "RUN_REVIEWED"]
+    assert runs.get_run(run_id)["artifacts"] == run_data["artifacts"]
+    runs._indexes.clear()
+
+def test_retention_deletes_runs_past_their_time_to_live(store):
+    completed, failed, waiting = (runs.create_run(idea) for idea in ("Camera gear rental", "Drone rental", "Tent rental"))
+    runs.save_report(completed, make_report(completed, "LensLend"))
+    runs.update_run_status(failed, "FAILED")
+    runs.update_run_status(waiting, "WAITING_FOR_INPUT")
+    later = datetime.utcnow() + timedelta(days=2)
+    policy = {"archive_after_days": 0, "delete_failed_after_days": 1, "delete_unfinished_after_days": 3, "now": later}
+
+    assert retention.compact_runs(**policy, dry_run=True) == {"archived": 0, "deleted": 1}
+    assert runs.get_run(failed) is not None
+
+    assert retention.compact_runs(**policy) == {"archived": 0, "deleted": 1}
+    assert runs.get_run(failed) is None and runs.get_run_etag(failed) is None
+    assert [summary["run_id"] for summary in runs.list_runs()] == [waiting, completed]
+    assert runs.delete_run(failed) is False
+
+def test_compaction_skips_unfinished_runs_and_runs_another_process_is_compacting(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    runs._indexes.clear()
+    run_id = runs.create_run("Camera gear rental")
+    runs.save_report(run_id, make_report(run_id, "LensLend"))
+    later = datetime.utcnow() + timedelta(days=8)
+
+    with retention._compaction_lock():
+        assert retention.compact_runs(now=later) is None
+    # Reopened for answers since it was listed as completed
+    runs.update_run_status(run_id, "RUNNING")
+    assert runs._store().archive_run(run_id, runs.FINISHED_STATUSES) is False
+
+    runs.update_run_status(run_id, "COMPLETED")
+    assert retention.compact_runs(now=later) == {"archived": 1, "deleted": 0}
+    runs._indexes.clear()
+
+def test_event_log_is_reopened_after_the_run_was_moved(tmp_path):
+    states = RunStates("none")
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    states.append_event(run_dir, b'{"type": "RUN_STARTED"}\n')
+
+    # Archived and restored by another worker
+    (run_dir / "events.jsonl").unlink()
+    (run_dir / "events.jsonl").write_bytes(b'{"type": "RUN_STARTED"}\n')
+
+    assert states.append_event(run_dir, b'{"type": "RUN_REVIEWED"}\n') == (24, 49)
+    assert (run_dir / "events.jsonl").read_bytes().count(b"\n") == 2
+    states.close()
@@ -0,0 +1,107 @@
+import json
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.server import app, _stream_run
+from src.storage import runs
+from src.storage.run_bus import RunBus
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path)
+    runs._indexes.clear()
+    yield tmp_path
+    runs._indexes.clear()
+
+def parse(messages):
+    parsed = []
+    for message in messages:
+        fields = dict(line.split(": ", 1) for line in message.strip().splitlines() if not line.startswith(":"))
+        if fields:
+            parsed.append((fields["event"], json.loads(fields["data"]), fields.get("id")))
+    return parsed
+
+async def collect(run_id, cursor=None, write=None):
+    subscription = runs.subscribe_run(run_id)
+    updates = await asyncio.to_thread(runs.get_run_updates, run_id, cursor)
+    stream = _stream_run(run_id, subscription, updates)
+    messages = [await stream.__anext__()]
+    if write is not None:
+        await asyncio.to_thread(write)
+    async for message in stream:
+        messages.append(message)
+    return parse(messages)
+
+async def test_bus_fans_out_to_every_subscriber_and_flags_overflow():
+    bus = RunBus(max_pending=2)
+    first, second = bus.subscribe("run"), bus.subscribe("run")
+
+    for n in range(3):
+        await asyncio.to_thread(bus.publish, "run", {"n": n})
+    await asyncio.sleep(0)
+
+    assert [(await first.get(1))["n"] for _ in range(2)] == [0, 1]
+    assert first.overflowed and second.overflowed
+    second.resynced()
+    assert not second.overflowed and await second.get(0.01) is None
+
+    first.close()
+    second.close()
+    assert not bus.has_subscribers("run")
+
+async def test_stream_sends_live_progress_until_the_run_ends(data_dir):
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED", "status": "RUNNING"})
+
+    def write():
+        runs.append_event(run_id, {"type": "AGENT_STARTED", "agent": "PlannerAgent"})
+        runs.update_run_status(run_id, "COMPLETED")
+        runs.append_event(run_id, {"type": "RUN_COMPLETED", "status": "COMPLETED"})
+
+    messages = await collect(run_id, write=write)
+
+    assert [kind for kind, _, _ in messages] == ["update", "update", "update", "update", "end"]
+    assert [event["type"] for _, data, _ in messages[:-1] for event in data["events"]] == ["RUN_STARTED", "AGENT_STARTED", "RUN_COMPLETED"]
+    assert messages[-1][1]["status"] == "COMPLETED"
+    # Every update carries the cursor a reconnect resumes from
+    assert messages[-2][2] == messages[-2][1]["cursor"] == runs.get_run(run_id)["cursor"]
+
+async def test_stream_replays_from_the_cursor_and_catches_up_on_missed_events(data_dir):
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_STARTED", "status": "RUNNING"})
+    cursor = runs.get_run(run_id)["cursor"]
+    runs.append_event(run_id, {"type": "AGENT_STARTED", "agent": "PlannerAgent"})
+
+    def write():
+        # Written past this process's bus (as by another worker), then one published event
+        runs._store().append_event(run_id, {"type": "AGENT_FINISHED", "agent": "PlannerAgent"})
+        runs.append_event(run_id, {"type": "RUN_COMPLETED", "status": "COMPLETED"})
+
+    messages = await collect(run_id, cursor, write=write)
+
+    events = [event["type"] for _, data, _ in messages for event in data.get("events", [])]
+    assert events == ["AGENT_STARTED", "AGENT_FINISHED", "RUN_COMPLETED"]
+    assert messages[-1] == ("end", {"run_id": run_id, "status": "COMPLETED"}, None)
+
+def test_stream_endpoint_ends_at_once_for_finished_runs(data_dir):
+    run_id = runs.create_run("Camera gear rental")
+    runs.append_event(run_id, {"type": "RUN_FAILED", "status": "FAILED"})
+    runs.update_run_status(run_id, "FAILED")
+
+    response = client.get(f"/analysis/{run_id}/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = parse(response.text.split("\n\n")[:-1])
+    assert [kind for kind, _, _ in messages] == ["update", "end"]
+    assert messages[0][1]["events"] == [{"type": "RUN_FAILED", "status": "FAILED", "timestamp": messages[0][1]["events"][0]["timestamp"]}]
+
+def test_stream_endpoint_errors(data_dir):
+    assert client.get("/analysis/missing/stream").status_code == 404
+    run_id = runs.create_run("Camera gear rental")
+    assert client.get(f"/analysis/{run_id}/stream", headers={"Last-Event-ID": "bad"}).status_code == 400
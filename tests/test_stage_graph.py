@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.graph import Stage, StageGraph
+
+
+def test_stage_graph_passes_declared_inputs():
+    graph = StageGraph([
+        Stage(name="a", fn=lambda seed: seed + 1, inputs=["seed"]),
+        Stage(name="b", fn=lambda a: a * 2, inputs=["a"]),
+        Stage(name="c", fn=lambda a, b: a + b, inputs=["a", "b"]),
+    ])
+
+    results = graph.run({"seed": 1})
+
+    assert results == {"seed": 1, "a": 2, "b": 4, "c": 6}
+
+def test_stage_graph_runs_independent_stages_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def meet():
+        barrier.wait()
+        return True
+
+    graph = StageGraph([
+        Stage(name="left", fn=meet),
+        Stage(name="right", fn=meet),
+    ])
+
+    # Both stages must be in flight together for the barrier to release
+    assert graph.run(max_concurrency=2) == {"left": True, "right": True}
+
+def test_stage_graph_respects_concurrency_cap():
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def work():
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.pop()
+
+    graph = StageGraph([Stage(name=f"s{i}", fn=work) for i in range(6)])
+    graph.run(max_concurrency=2)
+
+    assert max(peak) <= 2
+
+def test_stage_graph_propagates_failure_and_skips_dependents():
+    called = []
+
+    def boom():
+        raise RuntimeError("stage failed")
+
+    graph = StageGraph([
+        Stage(name="a", fn=boom),
+        Stage(name="b", fn=lambda a: called.append("b"), inputs=["a"]),
+    ])
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        graph.run()
+    assert called == []
+
+def test_stage_graph_rejects_unknown_inputs_and_cycles():
+    with pytest.raises(ValueError, match="unknown input"):
+        StageGraph([Stage(name="a", fn=lambda missing: None, inputs=["missing"])]).run()
+
+    with pytest.raises(ValueError, match="Cycle"):
+        StageGraph([
+            Stage(name="a", fn=lambda b: None, inputs=["b"]),
+            Stage(name="b", fn=lambda a: None, inputs=["a"]),
+        ]).run()
+
+async def test_stage_graph_arun_runs_coroutine_stages():
+    async def double(seed):
+        await asyncio.sleep(0)
+        return seed * 2
+
+    async def add(a, b):
+        return a + b
+
+    graph = StageGraph([
+        Stage(name="a", fn=double, inputs=["seed"]),
+        Stage(name="b", fn=double, inputs=["seed"]),
+        Stage(name="c", fn=add, inputs=["a", "b"]),
+    ])
+
+    results = await graph.arun({"seed": 3}, max_concurrency=2)
+
+    assert results["c"] == 12
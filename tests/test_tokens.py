@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.agents.tokens import RunBudgetExceeded, TokenUsage, check_run_budget, count_tokens, estimate_cost, fit_context
+
+
+def test_fit_context_is_deterministic_and_within_budget():
+    text = " ".join(f"token{i}" for i in range(2000))
+
+    first = fit_context("PlannerAgent", text, "gpt-4o", budget=200)
+    second = fit_context("PlannerAgent", text, "gpt-4o", budget=200)
+
+    assert first == second
+    assert count_tokens(first, "gpt-4o") <= 210
+    assert first.startswith("token0 ")
+    assert first.rstrip().endswith("token1999")
+
+def test_fit_context_leaves_short_text_alone():
+    assert fit_context("PlannerAgent", "short idea", "gpt-4o", budget=200) == "short idea"
+
+def test_estimate_cost_uses_model_prices():
+    assert estimate_cost("gpt-4o", 1_000_000, 0) == 2.50
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
+    assert (TokenUsage(1, 2, 0.5) + TokenUsage(3, 4, 0.25)).total_tokens == 10
+
+def test_check_run_budget_enforces_ceilings():
+    with patch("src.agents.tokens.RUN_MAX_TOKENS", 100):
+        check_run_budget({"input_tokens": 50, "output_tokens": 10}, pending_tokens=40)
+        with pytest.raises(RunBudgetExceeded):
+            check_run_budget({"input_tokens": 50, "output_tokens": 10}, pending_tokens=41)
+
+    with patch("src.agents.tokens.RUN_MAX_COST", 1.0):
+        with pytest.raises(RunBudgetExceeded, match="cost budget"):
+            check_run_budget({"cost_usd": 1.5})
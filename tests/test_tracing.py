@@ -0,0 +1,124 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from src.agents import registry as registry_module
+from src.agents.pipeline import run_analysis
+from src.storage import runs
+from utils.graph import Stage, StageGraph
+from utils.telemetry import tracing
+from utils.telemetry.tracing import JsonlSpanExporter, OtlpJsonFileExporter, trace_tool_call, traced_run
+
+
+def _spans(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_spans_nest_and_export_as_jsonl(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path / "traces.jsonl"))
+
+    with tracing.tracer.span("run", run_id="r1"):
+        with tracing.tracer.span("stage PlannerAgent") as stage:
+            stage.set_attribute("model", "gpt-4o")
+
+    stage, run = _spans(tmp_path / "traces.jsonl")
+    assert stage["parent_id"] == run["span_id"]
+    assert stage["trace_id"] == run["trace_id"]
+    assert stage["attributes"] == {"model": "gpt-4o"}
+    assert run["parent_id"] is None
+    assert run["duration_ms"] >= stage["duration_ms"]
+
+def test_failed_span_is_marked_as_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path / "traces.jsonl"))
+
+    try:
+        with tracing.tracer.span("stage RiskAgent"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    (span,) = _spans(tmp_path / "traces.jsonl")
+    assert span["status"] == "ERROR"
+    assert span["error"] == "ValueError: boom"
+
+def test_failed_export_is_logged_without_failing_the_operation(tmp_path, monkeypatch, caplog):
+    # A directory in place of the trace file makes every export fail
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path))
+
+    with tracing.tracer.span("stage JudgeAgent"):
+        pass
+
+    assert "Could not export span stage JudgeAgent" in caplog.text
+
+def test_otlp_exporter_writes_export_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", OtlpJsonFileExporter(tmp_path / "traces.json"))
+
+    with tracing.tracer.span("model request", kind="client", model="gpt-4o", attempts=2):
+        pass
+
+    (request,) = _spans(tmp_path / "traces.json")
+    span = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["kind"] == 3
+    assert {"key": "attempts", "value": {"intValue": "2"}} in span["attributes"]
+    assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+
+def test_tool_hook_records_sync_and_async_calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path / "traces.jsonl"))
+
+    async def search(query):
+        return f"results for {query}"
+
+    assert trace_tool_call("google_search", lambda query: "hits", {"query": "camera rental"}) == "hits"
+    assert asyncio.run(trace_tool_call("duckduckgo_search", search, {"query": "x"})) == "results for x"
+
+    sync_span, async_span = _spans(tmp_path / "traces.jsonl")
+    assert sync_span["name"] == "tool google_search"
+    assert sync_span["attributes"]["arguments"] == '{"query": "camera rental"}'
+    assert async_span["name"] == "tool duckduckgo_search"
+
+def test_streamed_run_span_covers_the_stream(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path / "traces.jsonl"))
+
+    def stream():
+        with tracing.tracer.span("model request"):
+            yield "chunk"
+
+    assert list(traced_run("team Statergy Lead Team", stream)) == ["chunk"]
+
+    model, team = _spans(tmp_path / "traces.jsonl")
+    assert model["parent_id"] == team["span_id"]
+
+def test_stage_graph_threads_inherit_the_current_span(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path / "traces.jsonl"))
+
+    def stage(**inputs):
+        with tracing.tracer.span("stage"):
+            return 1
+
+    with tracing.tracer.span("run"):
+        StageGraph([Stage("a", stage), Stage("b", stage)]).run(max_concurrency=2)
+
+    spans = _spans(tmp_path / "traces.jsonl")
+    run = spans[-1]
+    assert [s["parent_id"] for s in spans[:-1]] == [run["span_id"], run["span_id"]]
+
+def test_pipeline_run_is_traced_down_to_model_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", JsonlSpanExporter(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(registry_module, "MODEL_BACKEND", "fake")
+    monkeypatch.setattr(registry_module, "_clients", None)
+    monkeypatch.setattr(runs, "DATA_DIR", tmp_path / "runs")
+    registry_module.registry.clear()
+    try:
+        with patch("src.agents.pipeline.get_response_cache", return_value=None):
+            run_id = runs.create_run("A marketplace for renting camera gear")
+            run_analysis(run_id, "A marketplace for renting camera gear")
+    finally:
+        registry_module.registry.clear()
+
+    spans = {span["span_id"]: span for span in _spans(tmp_path / "traces.jsonl")}
+    request = next(span for span in spans.values() if span["name"] == "model request")
+    agent = spans[request["parent_id"]]
+    run = spans[agent["parent_id"]]
+    assert agent["name"] == "agent InterviewerAgent"
+    assert run["name"] == "run"
+    assert run["attributes"]["status"] == "WAITING_FOR_INPUT"
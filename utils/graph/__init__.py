@@ -0,0 +1,3 @@
+from .stage_graph import Stage, StageGraph
+
+__all__ = ["Stage", "StageGraph"]
@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+@dataclass
+class Stage:
+    """
+    A unit of work in a StageGraph.
+
+    `fn` is called with one keyword argument per name in `inputs`; each name refers either
+    to another stage or to a seed value passed to `StageGraph.run`. The return value is
+    stored under `name` and becomes available to downstream stages.
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: List[str] = field(default_factory=list)
+
+class StageGraph:
+    """
+    A dependency graph of stages, executed so that every stage runs as soon as all of its
+    inputs are available, with at most `max_concurrency` stages in flight at once.
+    """
+
+    def __init__(self, stages: Optional[List[Stage]] = None):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages or []:
+            self.add(stage)
+
+    def add(self, stage: Stage) -> "StageGraph":
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicate stage: {stage.name}")
+        self.stages[stage.name] = stage
+        return self
+
+    def validate(self, seeds: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Checks that every input is satisfiable and the graph is acyclic.
+        Returns the stage names in a valid topological order.
+        """
+        available: Set[str] = set(seeds or {})
+        for stage in self.stages.values():
+            for name in stage.inputs:
+                if name not in self.stages and name not in available:
+                    raise ValueError(f"Stage {stage.name} depends on unknown input: {name}")
+
+        order: List[str] = []
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [
+                name for name, stage in remaining.items()
+                if all(dep in available for dep in stage.inputs)
+            ]
+            if not ready:
+                raise ValueError(f"Cycle detected among stages: {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                available.add(name)
+                del remaining[name]
+        return order
+
+    def run(self, seeds: Optional[Dict[str, Any]] = None, max_concurrency: int = 4) -> Dict[str, Any]:
+        """
+        Executes the graph and returns a dict of seed values plus every stage result.
+
+        If a stage raises, no further stages are started, in-flight stages are allowed to
+        finish, and the first exception is re-raised.
+        """
+        results: Dict[str, Any] = dict(seeds or {})
+        self.validate(results)
+
+        pending = dict(self.stages)
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            while pending or running:
+                if error is None:
+                    ready = [
+                        name for name, stage in pending.items()
+                        if all(dep in results for dep in stage.inputs)
+                    ]
+                    for name in ready:
+                        if len(running) >= max_concurrency:
+                            break
+                        stage = pending.pop(name)
+                        kwargs = {dep: results[dep] for dep in stage.inputs}
+                        # Stages run in the caller's context (e.g. its current trace span)
+                        running[pool.submit(contextvars.copy_context().run, stage.fn, **kwargs)] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        error = error or exc
+                    else:
+                        results[name] = future.result()
+
+        if error is not None:
+            raise error
+        return results
+
+    async def arun(self, seeds: Optional[Dict[str, Any]] = None, max_concurrency: int = 4) -> Dict[str, Any]:
+        """
+        Async counterpart of `run` for graphs whose stage functions are coroutine functions.
+        Stages are scheduled as tasks on the running event loop instead of worker threads.
+        """
+        results: Dict[str, Any] = dict(seeds or {})
+        self.validate(results)
+
+        pending = dict(self.stages)
+        running: Dict[asyncio.Task, str] = {}
+        error: Optional[BaseException] = None
+
+        while pending or running:
+            if error is None:
+                ready = [
+                    name for name, stage in pending.items()
+                    if all(dep in results for dep in stage.inputs)
+                ]
+                for name in ready:
+                    if len(running) >= max_concurrency:
+                        break
+                    stage = pending.pop(name)
+                    kwargs = {dep: results[dep] for dep in stage.inputs}
+                    running[asyncio.ensure_future(stage.fn(**kwargs))] = name
+
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                exc = task.exception()
+                if exc is not None:
+                    error = error or exc
+                else:
+                    results[name] = task.result()
+
+        if error is not None:
+            raise error
+        return results
@@ -0,0 +1,4 @@
+from .bm25 import BM25Index, terms
+from .minhash import MinHasher, MinHashLSH, shingles, similarity
+
+__all__ = ["BM25Index", "MinHasher", "MinHashLSH", "shingles", "similarity", "terms"]
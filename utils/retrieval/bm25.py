@@ -0,0 +1,97 @@
+import re
+import math
+import heapq
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from utils.retrieval.minhash import STOPWORDS
+
+def terms(text: str) -> List[str]:
+    """
+    Lower-cased alphanumeric words of `text`, without stopwords and single characters.
+    """
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 1 and w not in STOPWORDS]
+
+class BM25Index:
+    """
+    In-memory inverted index ranking documents against keyword queries with Okapi BM25.
+
+    Holds at most `max_documents` documents; adding one more evicts the oldest, which
+    bounds memory no matter how many documents pass through. Each document carries an
+    arbitrary payload that is returned with its search hits.
+    """
+
+    def __init__(self, max_documents: Optional[int] = None, k1: float = 1.2, b: float = 0.75):
+        self.max_documents = max_documents
+        self.k1 = k1
+        self.b = b
+        # key -> (payload, length, term frequencies), oldest first
+        self._documents: "OrderedDict[Hashable, Tuple[Any, int, Counter]]" = OrderedDict()
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._documents
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """
+        (key, payload) of every document, oldest first.
+        """
+        return [(key, payload) for key, (payload, _, _) in self._documents.items()]
+
+    def add(self, key: Hashable, text: str, payload: Any = None) -> None:
+        self.remove(key)
+        frequencies = Counter(terms(text))
+        length = sum(frequencies.values())
+        self._documents[key] = (payload, length, frequencies)
+        self._total_length += length
+        for term, count in frequencies.items():
+            self._postings.setdefault(term, {})[key] = count
+        while self.max_documents is not None and len(self._documents) > self.max_documents:
+            self.remove(next(iter(self._documents)))
+
+    def remove(self, key: Hashable) -> None:
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        _, length, frequencies = document
+        self._total_length -= length
+        for term in frequencies:
+            posting = self._postings[term]
+            del posting[key]
+            if not posting:
+                del self._postings[term]
+
+    def _idf(self, term: str) -> float:
+        frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._documents) - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[Hashable, float, Any]]:
+        """
+        The `k` best (key, score, payload) hits for `query`, best first. Scores are BM25
+        divided by the most any document could score on the query, so they fall in [0, 1)
+        and `min_score` means the same thing whatever the query.
+        """
+        query_terms = set(terms(query))
+        if not query_terms or not self._documents:
+            return []
+
+        average_length = self._total_length / len(self._documents) or 1.0
+        scores: Dict[Hashable, float] = {}
+        ceiling = 0.0
+        for term in query_terms:
+            posting = self._postings.get(term)
+            idf = self._idf(term)
+            ceiling += idf * (self.k1 + 1)
+            if not posting:
+                continue
+            for key, count in posting.items():
+                length = self._documents[key][1]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+
+        hits = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(key, score / ceiling, self._documents[key][0]) for key, score in hits if score / ceiling >= min_score]
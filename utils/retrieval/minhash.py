@@ -0,0 +1,149 @@
+import re
+import hashlib
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Dropped before shingling so that rewordings differing only in filler words still match
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its my of on or our that the their "
+    "this to which who with your".split()
+)
+
+Signature = Tuple[int, ...]
+
+# Signature of a text with no shingles
+EMPTY = (1 << 64) - 1
+
+def shingles(text: str, size: int = 4) -> Set[str]:
+    """
+    Character `size`-grams of the lower-cased text with punctuation and stopwords removed.
+    Character shingles tolerate the small edits typical of a resubmitted idea (plurals,
+    "co-working" vs "coworking") better than word shingles on such short texts.
+    """
+    normalized = " ".join(w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+class MinHasher:
+    """
+    Computes MinHash signatures whose fraction of equal positions in two signatures
+    estimates the Jaccard similarity of their shingle sets.
+
+    Uses one-permutation hashing: each shingle is hashed once and the hash picks one of
+    `num_perm` bins, which keeps its minimum. Bins no shingle fell into borrow the minimum
+    of the next filled bin, offset by the distance (rotation densification). Signing a
+    one-line idea costs one 64-bit hash per shingle instead of `num_perm`.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        self.seed = seed
+        self._key = seed.to_bytes(8, "big")
+        self._offset = (1 << 64) // num_perm
+
+    def signature(self, text: str) -> Signature:
+        bins: List[Optional[int]] = [None] * self.num_perm
+        for shingle in shingles(text):
+            digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8, key=self._key).digest()
+            value, index = divmod(int.from_bytes(digest, "little"), self.num_perm)
+            current = bins[index]
+            if current is None or value < current:
+                bins[index] = value
+        filled = [index for index, value in enumerate(bins) if value is not None]
+        if not filled:
+            return (EMPTY,) * self.num_perm
+
+        signature = list(bins)
+        following = filled[0] + self.num_perm
+        for index in range(self.num_perm - 1, -1, -1):
+            if bins[index] is not None:
+                following = index
+            else:
+                signature[index] = bins[following % self.num_perm] + (following - index) * self._offset
+        return tuple(signature)
+
+def similarity(a: Signature, b: Signature) -> float:
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    return sum(x == y for x, y in zip(a, b)) / len(a) if a else 0.0
+
+class MinHashLSH:
+    """
+    Locality-sensitive hashing over MinHash signatures. Signatures are split into `bands`
+    bands; items sharing any whole band with a query are candidates, which are then ranked
+    by estimated similarity. With r rows per band, pairs above roughly (1/bands)^(1/r)
+    similarity are very likely to become candidates.
+
+    Buckets are keyed by the hash of a band and hold a bare key until a second item lands
+    in them, which keeps loading a large index cheap. A hash collision only adds a
+    candidate, and candidates are re-scored against their full signature anyway.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.signatures: Dict[Hashable, Signature] = {}
+        self._buckets: List[Dict[int, Any]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.signatures
+
+    def _band_hashes(self, signature: Signature) -> Iterable[Tuple[Dict[int, Any], int]]:
+        rows = self.rows
+        for band, bucket in enumerate(self._buckets):
+            yield bucket, hash(signature[band * rows:(band + 1) * rows])
+
+    def add(self, key: Hashable, signature: Signature) -> None:
+        if len(signature) != self.num_perm:
+            raise ValueError(f"Expected a signature of {self.num_perm} values, got {len(signature)}")
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = signature
+        for bucket, band_hash in self._band_hashes(signature):
+            existing = bucket.get(band_hash)
+            if existing is None:
+                bucket[band_hash] = key
+            elif type(existing) is list:
+                existing.append(key)
+            else:
+                bucket[band_hash] = [existing, key]
+
+    def remove(self, key: Hashable) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket, band_hash in self._band_hashes(signature):
+            existing = bucket.get(band_hash)
+            if type(existing) is list:
+                if key in existing:
+                    existing.remove(key)
+                if len(existing) == 1:
+                    bucket[band_hash] = existing[0]
+            elif existing == key:
+                del bucket[band_hash]
+
+    def query(self, signature: Signature, threshold: float = 0.0, limit: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Items whose estimated similarity to `signature` is at least `threshold`, most
+        similar first.
+        """
+        candidates: Set[Hashable] = set()
+        for bucket, band_hash in self._band_hashes(signature):
+            existing = bucket.get(band_hash)
+            if existing is None:
+                continue
+            if type(existing) is list:
+                candidates.update(existing)
+            else:
+                candidates.add(existing)
+        scored = [(key, similarity(signature, self.signatures[key])) for key in candidates]
+        scored = [(key, score) for key, score in scored if score >= threshold]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit] if limit is not None else scored
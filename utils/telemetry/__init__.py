@@ -0,0 +1,7 @@
+from .metrics import Counter, Gauge, Histogram, MetricsRegistry, REGISTRY
+from .tracing import Span, Tracer, current_span, trace_tool_call, traced_run, tracer
+
+__all__ = [
+    "Counter", "Gauge", "Histogram", "MetricsRegistry", "REGISTRY",
+    "Span", "Tracer", "current_span", "trace_tool_call", "traced_run", "tracer",
+]
@@ -0,0 +1,426 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import fcntl
+import logging
+import threading
+from contextlib import ContextDecorator, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Directory shared by all worker processes (e.g. every uvicorn worker). Each process writes
+# its own snapshot there and a scrape merges them; unset keeps metrics per-process.
+METRICS_DIR = os.getenv("CLARITY_METRICS_DIR", "")
+# Seconds between snapshot writes while metrics are being updated
+METRICS_FLUSH_INTERVAL = float(os.getenv("CLARITY_METRICS_FLUSH_INTERVAL", "1"))
+
+# Counters and histograms of exited processes, folded together in the shared directory
+AGGREGATE_SNAPSHOT = "aggregate.json"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+logger = logging.getLogger(__name__)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class Metric:
+    """
+    A named family of samples, one per combination of label values, in the Prometheus
+    data model.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+        self._registry = registry if registry is not None else REGISTRY
+        self._registry.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return value
+
+    def merge(self, total: Any, value: Any) -> Any:
+        return (total or 0.0) + value
+
+    def samples(self, key: LabelValues, value: Any) -> List[Tuple[str, str, float]]:
+        return [(self.name, _format_labels(self.labelnames, key), value)]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self._registry.changed()
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Across processes the per-process values are summed, and
+    values of processes that have exited are dropped.
+    """
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+        self._registry.changed()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self._registry.changed()
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def track(self, **labels: Any) -> "_Tracker":
+        """
+        Context manager (or decorator) that holds the gauge one higher while it is active.
+        """
+        return _Tracker(self, labels)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional["MetricsRegistry"] = None,
+    ):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["buckets"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+        self._registry.changed()
+
+    def time(self, **labels: Any) -> "_Timer":
+        """
+        Context manager (or decorator) that observes its duration in seconds.
+        """
+        return _Timer(self, labels)
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]}
+
+    def merge(self, total: Any, value: Any) -> Any:
+        if total is None:
+            return self._copy(value)
+        if len(value["buckets"]) != len(total["buckets"]):
+            return total  # written with different buckets by an older process
+        total["buckets"] = [a + b for a, b in zip(total["buckets"], value["buckets"])]
+        total["sum"] += value["sum"]
+        total["count"] += value["count"]
+        return total
+
+    def samples(self, key: LabelValues, value: Any) -> List[Tuple[str, str, float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value["buckets"]):
+            cumulative += count
+            labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+            samples.append((f"{self.name}_bucket", labels, cumulative))
+        labels = _format_labels(self.labelnames, key)
+        samples.append((f"{self.name}_sum", labels, value["sum"]))
+        samples.append((f"{self.name}_count", labels, value["count"]))
+        return samples
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+        self._starts = threading.local()
+
+    def __enter__(self) -> "_Timer":
+        # Thread-local so the same decorator can time concurrent calls
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        start = self._starts.stack.pop()
+        self.histogram.observe(time.perf_counter() - start, **self.labels)
+
+class _Tracker(ContextDecorator):
+    def __init__(self, gauge: Gauge, labels: Dict[str, Any]):
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self) -> "_Tracker":
+        self.gauge.inc(**self.labels)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.gauge.dec(**self.labels)
+
+class MetricsRegistry:
+    """
+    Holds this process's metrics and renders the Prometheus text exposition format.
+
+    With a shared `directory`, each process writes a JSON snapshot of its values to
+    `<directory>/<pid>-<start>.json` from a background thread, at most every
+    `flush_interval` seconds while metrics change, and `render()` merges the snapshots of
+    every process: counters and histograms are summed and gauges are summed over live
+    processes only. A process starting up folds the counters and histograms of exited
+    processes into `<directory>/aggregate.json` and deletes their snapshots, so totals never
+    go backwards (not even across restarts) and the directory does not grow.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.metrics: Dict[str, Metric] = {}
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self._snapshot_name = f"{os.getpid()}-{int(time.time() * 1000)}.json"
+        self._snapshot_pid = os.getpid()
+        # The process whose stale snapshots were folded and the one running the flusher;
+        # both are redone in a forked worker
+        self._folded_pid: Optional[int] = None
+        self._flusher_pid: Optional[int] = None
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def changed(self) -> None:
+        # Snapshots are written by a background thread, never by the code updating a metric
+        if self.directory is None:
+            return
+        if self._flusher_pid != os.getpid():
+            with self._flusher_lock:
+                if self._flusher_pid != os.getpid():
+                    self._flusher_pid = os.getpid()
+                    self._wake = threading.Event()
+                    threading.Thread(target=self._run_flusher, args=(self._wake,), name="metrics-flusher", daemon=True).start()
+        self._wake.set()
+
+    def _run_flusher(self, wake: threading.Event) -> None:
+        while True:
+            wake.wait()
+            wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Could not write metrics snapshot: %s", e)
+            time.sleep(self.flush_interval)
+
+    @contextmanager
+    def _aggregate_lock(self, operation: int) -> Iterator[None]:
+        # Held exclusively while folding and shared while scraping, so a scrape never counts
+        # a snapshot both in the aggregate and on its own
+        with open(self.directory / "aggregate.lock", "a") as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    @staticmethod
+    def _write_snapshot(path: Path, snapshot: Dict[str, Any]) -> None:
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def _fold_stale_snapshots(self) -> None:
+        with self._aggregate_lock(fcntl.LOCK_EX):
+            stale = []
+            for path in self.directory.iterdir():
+                pid = path.name.split("-", 1)[0]
+                if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                    stale.append(path)
+            if not stale:
+                return
+
+            aggregate_path = self.directory / AGGREGATE_SNAPSHOT
+            aggregate = self._read_snapshot(aggregate_path) or {}
+            totals = {
+                name: {tuple(key): value for key, value in values}
+                for name, values in aggregate.get("metrics", {}).items()
+            }
+            for path in stale:
+                snapshot = self._read_snapshot(path) if path.suffix == ".json" else None
+                for name, values in (snapshot or {}).get("metrics", {}).items():
+                    metric = self.metrics.get(name)
+                    # Gauges of an exited process no longer hold
+                    if metric is None or metric.kind == "gauge":
+                        continue
+                    metric_totals = totals.setdefault(name, {})
+                    for key, value in values:
+                        key = tuple(key)
+                        metric_totals[key] = metric.merge(metric_totals.get(key), value)
+            self._write_snapshot(aggregate_path, {
+                "metrics": {name: [[list(key), value] for key, value in values.items()] for name, values in totals.items()}
+            })
+            for path in stale:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _snapshot_path(self) -> Path:
+        # A forked worker must not overwrite its parent's snapshot
+        if os.getpid() != self._snapshot_pid:
+            self._snapshot_pid = os.getpid()
+            self._snapshot_name = f"{os.getpid()}-{int(time.time() * 1000)}.json"
+        return self.directory / self._snapshot_name
+
+    def flush(self) -> None:
+        """
+        Writes this process's snapshot to the shared directory.
+        """
+        if self.directory is None:
+            return
+        with self._flush_lock:
+            snapshot = {
+                name: [[list(key), value] for key, value in metric.snapshot()]
+                for name, metric in self.metrics.items()
+            }
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self._folded_pid != os.getpid():
+                self._folded_pid = os.getpid()
+                self._fold_stale_snapshots()
+            self._write_snapshot(self._snapshot_path(), {"pid": os.getpid(), "metrics": snapshot})
+
+    def _collect(self) -> Dict[str, Dict[LabelValues, Any]]:
+        if self.directory is None:
+            return {name: dict(metric.snapshot()) for name, metric in self.metrics.items()}
+
+        self.flush()
+        merged: Dict[str, Dict[LabelValues, Any]] = {name: {} for name in self.metrics}
+        with self._aggregate_lock(fcntl.LOCK_SH):
+            snapshots = [self._read_snapshot(path) for path in self.directory.glob("*.json")]
+        for snapshot in snapshots:
+            if snapshot is None:
+                continue
+            # The aggregate has no pid, and holds no gauges
+            alive = "pid" in snapshot and _pid_alive(snapshot["pid"])
+            for name, values in snapshot.get("metrics", {}).items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                for key, value in values:
+                    key = tuple(key)
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        collected = self._collect()
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(collected[name].items()):
+                for sample_name, labels, sample_value in metric.samples(key, value):
+                    lines.append(f"{sample_name}{labels} {_format_value(sample_value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+atexit.register(REGISTRY.flush)
+
+# --- ClarityAI metrics ---
+
+AGENT_LATENCY = Histogram(
+    "clarity_agent_duration_seconds",
+    "Wall-clock duration of a pipeline stage's agent call(s)",
+    ["agent", "model"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+AGENT_TOKENS = Histogram(
+    "clarity_agent_tokens",
+    "Tokens per pipeline stage, by direction",
+    ["agent", "direction"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+RUN_OUTCOMES = Counter(
+    "clarity_runs_total",
+    "Analysis runs that reached an outcome (COMPLETED, FAILED or WAITING_FOR_INPUT)",
+    ["status"],
+)
+RUNS_IN_FLIGHT = Gauge("clarity_runs_in_flight", "Analyses currently executing")
+QUEUE_DEPTH = Gauge("clarity_background_queue_depth", "Scheduled analyses waiting to start")
+STORAGE_LATENCY = Histogram(
+    "clarity_storage_operation_seconds",
+    "Latency of run storage operations",
+    ["operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+READ_CACHE_LOOKUPS = Counter(
+    "clarity_read_cache_lookups_total",
+    "Run and report reads, by whether the in-memory read cache served them (hit or miss)",
+    ["kind", "result"],
+)
+RUNS_COMPACTED = Counter(
+    "clarity_runs_compacted_total",
+    "Runs handled by retention compaction, by action (archived or deleted)",
+    ["action"],
+)
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import inspect
+import logging
+import secrets
+import threading
+from collections.abc import Iterator as IteratorABC
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+# "jsonl" writes one flat JSON object per span, "otlp" one OTLP/JSON export request per
+# span (readable by the OpenTelemetry collector's otlpjsonfile receiver); empty disables tracing
+TRACE_EXPORTER = os.getenv("CLARITY_TRACE_EXPORTER", "")
+TRACE_FILE = os.getenv("CLARITY_TRACE_FILE", "data/traces.jsonl")
+SERVICE_NAME = os.getenv("CLARITY_SERVICE_NAME", "clarityai")
+# Longest string kept in a span attribute (tool arguments, results)
+MAX_ATTRIBUTE_LENGTH = int(os.getenv("CLARITY_TRACE_MAX_ATTRIBUTE", "500"))
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+logger = logging.getLogger(__name__)
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text if len(text) <= MAX_ATTRIBUTE_LENGTH else text[:MAX_ATTRIBUTE_LENGTH] + "..."
+
+def _iso(ns: int) -> str:
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).isoformat()
+
+class Span:
+    """
+    A timed operation within a trace. Spans opened while another span is current become
+    its children.
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str = "internal", parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = {key: _clip(value) for key, value in (attributes or {}).items()}
+        self.status = "OK"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = _clip(value)
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.export(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": _iso(self.start_ns),
+            "end": _iso(self.end_ns or time.time_ns()),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """
+    Stands in for a span while tracing is disabled.
+    """
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("clarity_current_span", default=None)
+
+def current_span() -> Any:
+    """
+    The innermost open span of the calling context, or a no-op span.
+    """
+    return _current_span.get() or NOOP_SPAN
+
+class JsonlSpanExporter:
+    """
+    Appends finished spans to a file, one JSON object per line.
+    """
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def format(self, span: Span) -> Dict[str, Any]:
+        return span.to_dict()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(self.format(span), default=str) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class OtlpJsonFileExporter(JsonlSpanExporter):
+    """
+    Appends finished spans as OTLP/JSON ExportTraceServiceRequest lines.
+    """
+
+    def format(self, span: Span) -> Dict[str, Any]:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": SPAN_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": 2, "message": span.error} if span.status == "ERROR" else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "clarityai"}, "spans": [otlp_span]}],
+        }]}
+
+EXPORTERS = {"jsonl": JsonlSpanExporter, "otlp": OtlpJsonFileExporter}
+
+class Tracer:
+    """
+    Opens spans and hands finished ones to the exporter. Without an exporter every span is
+    a no-op, so instrumented code costs next to nothing when tracing is off.
+    """
+
+    def __init__(self, exporter: Any = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, kind: str = "internal", **attributes: Any) -> Any:
+        """
+        Opens a child of the current span without making it current; call `end()` on it.
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(self, name, kind, _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Any]:
+        """
+        Opens a span that is current for the duration of the block. An exception escaping
+        the block marks the span as failed.
+        """
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        span = Span(self, name, kind, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def export(self, span: Span) -> None:
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(span)
+        except OSError as e:
+            # Tracing must never fail the traced operation
+            logger.warning("Could not export span %s: %s", span.name, e)
+
+def _exporter_from_env() -> Any:
+    if not TRACE_EXPORTER:
+        return None
+    if TRACE_EXPORTER not in EXPORTERS:
+        raise ValueError(f"Unknown trace exporter: {TRACE_EXPORTER}")
+    return EXPORTERS[TRACE_EXPORTER](TRACE_FILE)
+
+tracer = Tracer(_exporter_from_env())
+
+async def _finish_async(span: Span, result: Awaitable[Any]) -> Any:
+    try:
+        value = await result
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.end()
+    return value
+
+def trace_tool_call(function_name: str, function_call: Callable[..., Any], arguments: Dict[str, Any]) -> Any:
+    """
+    agno tool hook (`tool_hooks=[trace_tool_call]`) that records a span per tool call, with
+    the tool's name and (clipped) arguments. Works in both agno's sync and async chains.
+    """
+    if not tracer.enabled:
+        return function_call(**arguments)
+
+    span = Span(tracer, f"tool {function_name}", "client", _current_span.get(), {"tool": function_name, "arguments": arguments})
+    token = _current_span.set(span)
+    try:
+        result = function_call(**arguments)
+    except BaseException as e:
+        span.record_error(e)
+        span.end()
+        raise
+    finally:
+        _current_span.reset(token)
+
+    # In agno's async chain the next step is a coroutine that the caller awaits
+    if inspect.isawaitable(result):
+        return _finish_async(span, result)
+    span.end()
+    return result
+
+def _traced_stream(span: Span, iterator: Iterator[Any]) -> Iterator[Any]:
+    # The span is current only while the stream is advanced, so work done to produce each
+    # item (model and tool calls) nests under it
+    try:
+        while True:
+            token = _current_span.set(span)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current_span.reset(token)
+            yield item
+    except GeneratorExit:
+        raise  # the consumer stopped early
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.end()
+
+def traced_run(name: str, run: Callable[[], Any], **attributes: Any) -> Any:
+    """
+    Calls `run()` (typically an agno agent or team run) in a span. When it returns an
+    iterator, as streamed runs do, the span stays open until the iterator is exhausted.
+    """
+    if not tracer.enabled:
+        return run()
+
+    span = Span(tracer, name, "internal", _current_span.get(), attributes)
+    token = _current_span.set(span)
+    try:
+        result = run()
+    except BaseException as e:
+        span.record_error(e)
+        span.end()
+        raise
+    finally:
+        _current_span.reset(token)
+
+    if isinstance(result, IteratorABC):
+        return _traced_stream(span, result)
+    span.end()
+    return result